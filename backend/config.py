@@ -7,8 +7,171 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-2.0-flash-exp"
     DATABASE_URL: str = "sqlite:///./skillpick.db"
+    # Migrate on boot when the schema version is behind; turn off when
+    # `python manage.py migrate` runs as a separate deploy step.
+    SCHEMA_AUTO_MIGRATE: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # State shared across worker processes (caches, job claims, rate limits).
+    # "memory" is per-process and fine for a single worker; multi-worker
+    # deployments need "database".
+    SHARED_STATE_BACKEND: str = "memory"  # memory | database
+    GENERATION_CLAIM_TTL_SECONDS: int = 900
+    NARRATIVE_CLAIM_TTL_SECONDS: int = 120  # one narrative_summary_agent call per evaluation at a time
+    SHARED_STATE_SWEEP_SECONDS: int = 60  # how often expired keys (rate-limit buckets, claims) are deleted
     BACKEND_CORS_ORIGINS: str = "http://localhost:5173"
 
+    # Background work (JD analysis + question generation for new processes)
+    BACKGROUND_WORKERS: int = 2
+    PROCESS_NOT_READY_RETRY_AFTER_SECONDS: int = 10
+
+    # Compiled per-process context (JD analysis, question set, answer key, scoring)
+    PROCESS_CONTEXT_CACHE_SIZE: int = 256
+    PROCESS_CONTEXT_TTL_SECONDS: int = 300
+
+    # Question bank: reuse previously generated questions across processes
+    QUESTION_BANK_ENABLED: bool = True
+    QUESTION_BANK_MIN_COVERAGE: float = 0.5
+
+    # Sharded question generation
+    QUESTION_GEN_SHARDED: bool = True
+    QUESTION_GEN_MCQ_BATCH_SIZE: int = 10
+    QUESTION_GEN_MAX_WORKERS: int = 6
+    QUESTION_GEN_MAX_RETRIES: int = 2
+
+    # Local embeddings / similarity index (no network)
+    EMBEDDING_BACKEND: str = "hashing"  # hashing | sentence_transformers
+    EMBEDDING_MODEL: str = ""  # local path for sentence_transformers
+    EMBEDDING_DIM: int = 512
+    SIMILARITY_INDEX_MODE: str = "brute"  # brute | ivf
+    SIMILARITY_IVF_LISTS: int = 64
+    SIMILARITY_IVF_PROBES: int = 8
+
+    # Sandboxed execution of coding answers against generated tests
+    CODE_EXEC_ENABLED: bool = True
+    CODE_EXEC_WORKERS: int = 4
+    CODE_EXEC_TIMEOUT_SECONDS: float = 5.0
+    CODE_EXEC_MEMORY_MB: int = 256
+    CODE_EXEC_WEIGHT: float = 0.7  # share of a coding score taken from test pass rate
+    # Isolation needs root on Linux (network/mount/pid namespaces, then a uid
+    # drop); without it nothing is executed and the agent grades alone
+    # Each run leases its own unprivileged uid (and gid) from
+    # CODE_EXEC_UID_BASE..+CODE_EXEC_UID_COUNT-1 through lock files shared by
+    # all workers on the host; keep the pool >= web workers x CODE_EXEC_WORKERS
+    CODE_EXEC_UID_BASE: int = 200000
+    CODE_EXEC_UID_COUNT: int = 64
+    CODE_EXEC_LOCK_DIR: str = ""  # uid lease lock files; defaults to the system temp dir
+    CODE_EXEC_MAX_PROCESSES: int = 8  # RLIMIT_NPROC per run
+    CODE_EXEC_HIDDEN_PATHS: str = ""  # comma-separated, hidden in addition to the app directory
+    CODE_EXEC_PYTHON: str = ""  # interpreter for submissions; must be readable by the pool uids
+
+    # Answer grading: one prompt per section, or one prompt per question
+    EVAL_MODE: str = "per_question"  # batch | per_question
+    EVAL_FANOUT_MAX_WORKERS: int = 8
+    EVAL_MAX_RETRIES: int = 2
+
+    # Local overall score: weighted mean of section scores (renormalized over
+    # the sections a process actually has) and verdict cut-offs
+    SCORE_WEIGHT_RESUME: float = 0.15
+    SCORE_WEIGHT_MCQ: float = 0.25
+    SCORE_WEIGHT_CODING: float = 0.35
+    SCORE_WEIGHT_THEORY: float = 0.25
+    VERDICT_STRONG_HIRE_MIN: float = 80.0
+    VERDICT_HIRE_MIN: float = 65.0
+    VERDICT_BORDERLINE_MIN: float = 50.0
+
+    # Per-question grading memo for repeated answers
+    GRADING_MEMO_ENABLED: bool = True
+    GRADING_MEMO_NEAR_DUP: bool = False  # theory answers only; reuses a grade for similar, not equal, text
+    GRADING_MEMO_NEAR_DUP_MAX_BITS: int = 3
+
+    # Local first pass over theory answers, against the generated reference
+    # answer and key points; only scores between the two cut-offs reach the LLM
+    THEORY_LOCAL_GRADING: bool = True
+    THEORY_LOCAL_FAIL_BELOW: float = 25.0
+    THEORY_LOCAL_FAIL_MAX_WORDS: int = 25  # longer answers are never failed locally
+    THEORY_LOCAL_PASS_ABOVE: float = 75.0
+    THEORY_LOCAL_PASS_MIN_WORDS: int = 40  # short answers are never passed locally
+    THEORY_LOCAL_KEY_POINT_WEIGHT: float = 0.7  # rest of the score is similarity to the reference
+    THEORY_LOCAL_KEY_POINT_MATCH: float = 0.6  # word recall or sentence cosine that covers a key point
+    THEORY_LOCAL_REFERENCE_MATCH: float = 0.5  # cosine to the reference that earns full credit
+
+    # LLM scheduler: concurrent Gemini calls, ordered by priority class and
+    # shared between hiring processes by weight. The concurrency limits are
+    # for the whole deployment and split evenly across WEB_WORKERS (at least
+    # one slot each); scheduling and adaptation happen per worker on its share
+    WEB_WORKERS: int = 1  # set by gunicorn.conf.py
+    LLM_MAX_CONCURRENCY: int = 8  # ceiling for the adaptive limit
+    LLM_ADAPTIVE_CONCURRENCY: bool = True  # AIMD on provider latency, 429s and timeouts
+    LLM_INITIAL_CONCURRENCY: int = 4
+    LLM_MIN_CONCURRENCY: int = 1
+    LLM_ADAPTIVE_BACKOFF: float = 0.5  # multiplicative cut on throttling
+    LLM_ADAPTIVE_LATENCY_TOLERANCE: float = 2.0  # x baseline latency before backing off
+    LLM_ADAPTIVE_COOLDOWN_SECONDS: float = 2.0
+    LLM_THROTTLE_RETRIES: int = 2
+    LLM_MAX_WAITING: int = 32  # queued interactive calls before new interactive work is shed
+    LLM_INTERACTIVE_DEADLINE_SECONDS: float = 20.0  # a candidate is waiting on the response
+    LLM_INTERACTIVE_RESERVE: int = 2  # slots batch work never takes
+    LLM_AGING_SECONDS: float = 30.0  # queued batch work is promoted after this long
+
+    # Token buckets in front of the LLM-backed candidate routes
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LINK_PER_MINUTE: float = 30.0
+    RATE_LIMIT_LINK_BURST: float = 20.0
+    RATE_LIMIT_IP_PER_MINUTE: float = 20.0  # generous: test centres share an address
+    RATE_LIMIT_IP_BURST: float = 10.0
+    # Take the client address from X-Forwarded-For only behind a proxy that
+    # appends to it; the client is the entry FORWARDED_FOR_PROXY_HOPS from the
+    # right, since anything further left is whatever the client sent
+    TRUST_FORWARDED_FOR: bool = False
+    FORWARDED_FOR_PROXY_HOPS: int = 1  # Render adds one hop
+
+    # Extracted resume text kept in memory per worker, keyed by file hash
+    RESUME_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Near-duplicate resumes (MinHash over word 3-shingles), checked before screening
+    RESUME_DEDUP_POLICY: str = "flag"  # off | flag | reuse | reject
+    RESUME_DEDUP_SCOPE: str = "process"  # process | global
+    RESUME_DEDUP_THRESHOLD: float = 0.8  # estimated shingle Jaccard similarity
+    RESUME_DEDUP_MAX_CANDIDATES: int = 200  # bucket matches compared per lookup
+
+    # Compressed storage for resume text and raw agent responses
+    COMPRESSION_LEVEL: int = 6  # zlib 1-9
+    COMPRESSION_MIN_BYTES: int = 64  # smaller values are stored as-is
+    COMPRESSION_CHUNK_SIZE: int = 500  # rows per transaction when recompressing
+
+    # Streaming candidate export
+    EXPORT_BATCH_SIZE: int = 1000  # rows fetched per round trip
+    EXPORT_CHUNK_BYTES: int = 64 * 1024  # response chunk size
+
+    # Cross-candidate code similarity (winnowing fingerprints per coding question)
+    PLAGIARISM_ENABLED: bool = True
+    PLAGIARISM_KGRAM: int = 10  # normalized tokens per hashed k-gram
+    PLAGIARISM_WINDOW: int = 5  # shared runs of KGRAM + WINDOW - 1 tokens are always caught
+    PLAGIARISM_MIN_FINGERPRINTS: int = 8  # shorter answers are too generic to compare
+    PLAGIARISM_MIN_SIMILARITY: float = 0.6  # share of the smaller answer's fingerprints
+    # Fingerprints in more than BOILERPLATE_SHARE of the answers, and in at
+    # least BOILERPLATE_MIN_ANSWERS of them, are boilerplate and ignored; a
+    # small process has no boilerplate, so a ring of copies there still shows
+    PLAGIARISM_BOILERPLATE_SHARE: float = 0.3
+    PLAGIARISM_BOILERPLATE_MIN_ANSWERS: int = 20
+    PLAGIARISM_TOP_MATCHES: int = 5
+
+    # Leaderboard percentiles from per-process t-digests of each section score
+    SCORE_SKETCH_COMPRESSION: int = 100  # ~centroids kept; ranks exact below this many scores
+
+    # Candidate full-text search
+    SEARCH_MAX_TERMS: int = 16
+    SEARCH_SNIPPET_TOKENS: int = 16
+
+    # Two-tier resume screening
+    SCREENING_TIER1: str = "model"  # model | local | off
+    GEMINI_SCREENING_MODEL: str = "gemini-2.0-flash-lite"
+    SCREENING_ALLOW_THRESHOLD: float = 40.0
+    SCREENING_ESCALATION_BAND: float = 10.0
+    SCREENING_TIER1_COST_PER_1K_TOKENS: float = 0.000075
+    SCREENING_TIER2_COST_PER_1K_TOKENS: float = 0.0003
+
     class Config:
         env_file = ".env"
 
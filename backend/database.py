@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
 
@@ -12,10 +14,199 @@ engine = create_engine(
     DATABASE_URL, connect_args=connect_args, future=True, echo=False
 )
 
+if DATABASE_URL.startswith("sqlite"):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers in other worker processes proceed during a write;
+        # busy_timeout makes concurrent writers wait instead of failing.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
 Base = declarative_base()
 
+logger = logging.getLogger("skillpick.database")
+
+# Bump whenever a model, ADDED_COLUMNS or ADDED_INDEXES changes. Boot compares
+# it with the version recorded by the last migrate run.
+SCHEMA_VERSION = 9
+
+
+# Columns added after a table was first created. create_all() never alters
+# existing tables, so these are added in place on startup.
+ADDED_COLUMNS = {
+    "hiring_processes": {
+        "status": "VARCHAR(32) NOT NULL DEFAULT 'ready'",
+        "status_detail": "TEXT",
+        "llm_share_weight": "FLOAT NOT NULL DEFAULT 1.0",
+    },
+    "question_sets": {
+        "candidate_payload": "BLOB",
+    },
+    "candidates": {
+        "resume_document_id": "INTEGER REFERENCES resume_documents(id)",
+        "duplicate_of_candidate_id": "INTEGER REFERENCES candidates(id)",
+        "duplicate_similarity": "FLOAT",
+    },
+    "screening_decisions": {
+        "resume_document_id": "INTEGER REFERENCES resume_documents(id)",
+        "result": "JSON",
+        "duplicate_of_document_id": "INTEGER REFERENCES resume_documents(id)",
+        "duplicate_similarity": "FLOAT",
+    },
+    "resume_documents": {
+        "minhash": "BLOB",
+    },
+    "evaluations": {
+        "process_id": "INTEGER REFERENCES hiring_processes(id)",
+    },
+}
+
+# Indexes added after a table was first created, as (index name, table, columns).
+ADDED_INDEXES = [
+    ("ix_candidates_process_id", "candidates", "process_id"),
+    ("ix_evaluations_candidate_id", "evaluations", "candidate_id"),
+    ("ix_candidates_resume_document_id", "candidates", "resume_document_id"),
+    ("ix_screening_decisions_resume_document_id", "screening_decisions", "resume_document_id"),
+    ("ix_evaluations_process_overall", "evaluations", "process_id, overall_score"),
+]
+
+
+def add_missing_columns():
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+        for index, table, columns in ADDED_INDEXES:
+            if not inspector.has_table(table):
+                continue
+            if index not in {i["name"] for i in inspector.get_indexes(table)}:
+                conn.execute(text(f"CREATE INDEX {index} ON {table} ({columns})"))
+
+
+def move_resume_text_to_documents(chunk_size: int = 500):
+    """
+    Candidates used to store their own copy of the resume text. Move each
+    distinct text into resume_documents and point the candidates at it,
+    chunk_size candidates per transaction, so an interrupted run resumes
+    where it stopped. The legacy column is left in place, emptied.
+    """
+    import hashlib
+
+    inspector = inspect(engine)
+    if "resume_text" not in {c["name"] for c in inspector.get_columns("candidates")}:
+        return
+    last_id, moved = 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, resume_text FROM candidates "
+                    "WHERE id > :last AND resume_text IS NOT NULL AND resume_document_id IS NULL "
+                    "ORDER BY id LIMIT :n"
+                ),
+                {"last": last_id, "n": chunk_size},
+            ).all()
+            if not rows:
+                break
+            for candidate_id, resume_text in rows:
+                key = "text:" + hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+                doc_id = conn.execute(text("SELECT id FROM resume_documents WHERE sha256 = :k"), {"k": key}).scalar()
+                if doc_id is None:
+                    doc_id = conn.execute(
+                        text(
+                            "INSERT INTO resume_documents (sha256, text, created_at) "
+                            "VALUES (:k, :t, CURRENT_TIMESTAMP) RETURNING id"
+                        ),
+                        {"k": key, "t": resume_text},
+                    ).scalar()
+                conn.execute(
+                    text("UPDATE candidates SET resume_document_id = :d, resume_text = NULL WHERE id = :c"),
+                    {"d": doc_id, "c": candidate_id},
+                )
+        last_id = rows[-1][0]
+        moved += len(rows)
+    if moved:
+        logger.info("Moved resume text of %s candidates into resume_documents", moved)
+
+
+def get_schema_version() -> int | None:
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                text("SELECT value FROM schema_meta WHERE key = 'schema_version'")
+            ).first()
+    except Exception:  # noqa: BLE001 - table missing on a fresh or pre-versioning DB
+        return None
+    return int(row[0]) if row else None
+
+
+def migrate() -> None:
+    """
+    Create missing tables, columns and indexes, then record SCHEMA_VERSION.
+    """
+    import models  # noqa: F401 - registers every table on Base.metadata
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    move_resume_text_to_documents()
+
+    from services.compression_service import convert_column_types, recompress_columns
+
+    convert_column_types()
+    recompress_columns()
+
+    from services.search_service import ensure_search_index
+
+    ensure_search_index()
+
+    from services.resume_dedup_service import index_missing_signatures
+
+    index_missing_signatures()
+
+    from services.plagiarism_service import index_missing_submissions
+
+    index_missing_submissions()
+
+    from services.leaderboard_service import index_missing_evaluations
+
+    index_missing_evaluations()
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_meta (key VARCHAR(64) PRIMARY KEY, value TEXT)"))
+        conn.execute(text("DELETE FROM schema_meta WHERE key = 'schema_version'"))
+        conn.execute(
+            text("INSERT INTO schema_meta (key, value) VALUES ('schema_version', :v)"),
+            {"v": str(SCHEMA_VERSION)},
+        )
+    logger.info("Database schema migrated to version %s", SCHEMA_VERSION)
+
+
+def ensure_schema() -> None:
+    """
+    Boot-time check: a single SELECT when the schema is current. Otherwise
+    migrate in place, or refuse to start if SCHEMA_AUTO_MIGRATE is off.
+    """
+    current = get_schema_version()
+    if current == SCHEMA_VERSION:
+        return
+    if not settings.SCHEMA_AUTO_MIGRATE:
+        raise RuntimeError(
+            f"Database schema is at version {current}, expected {SCHEMA_VERSION}. "
+            "Run `python manage.py migrate`."
+        )
+    logger.warning("Database schema at version %s, expected %s; migrating", current, SCHEMA_VERSION)
+    migrate()
+
 
 def get_db():
     from sqlalchemy.orm import Session
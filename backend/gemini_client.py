@@ -1,24 +1,39 @@
 import os
 import json
 import logging
+import threading
 from typing import Any, Dict
 
-import google.generativeai as genai
-
 from config import settings
+from utils import llm_gate
 
 logger = logging.getLogger("skillpick.gemini")
 
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-else:
-    logger.warning("GEMINI_API_KEY is not set. Gemini calls will fail.")
-
 MODEL_NAME = settings.GEMINI_MODEL
 
+# The SDK takes the better part of a second to import, so it is loaded and
+# configured on the first Gemini call rather than at boot.
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def _get_genai():
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
 
-def _get_model():
-    return genai.GenerativeModel(MODEL_NAME)
+                if settings.GEMINI_API_KEY:
+                    genai.configure(api_key=settings.GEMINI_API_KEY)
+                else:
+                    logger.warning("GEMINI_API_KEY is not set. Gemini calls will fail.")
+                _genai = genai
+    return _genai
+
+
+def _get_model(model_name: str | None = None):
+    return _get_genai().GenerativeModel(model_name or MODEL_NAME)
 
 
 def _extract_json(text: str) -> Dict[str, Any]:
@@ -38,21 +53,30 @@ def _extract_json(text: str) -> Dict[str, Any]:
     raise ValueError("Gemini response is not valid JSON")
 
 
-def _call_gemini_json(prompt: str) -> Dict[str, Any]:
-    logger.info("Calling Gemini model=%s", MODEL_NAME)
-    model = _get_model()
-    response = model.generate_content(
-        [
-            {
-                "role": "user",
-                "parts": [
-                    {
-                        "text": prompt,
-                    }
-                ],
-            }
-        ]
-    )
+def _call_gemini_json(prompt: str, model_name: str | None = None) -> Dict[str, Any]:
+    logger.info("Calling Gemini model=%s", model_name or MODEL_NAME)
+    model = _get_model(model_name)
+    contents = [
+        {
+            "role": "user",
+            "parts": [
+                {
+                    "text": prompt,
+                }
+            ],
+        }
+    ]
+    # Every call waits for a slot, shared fairly between hiring processes. A
+    # throttled call has already lowered the limit, so retrying queues it
+    # behind the calls the provider can take.
+    for attempt in range(settings.LLM_THROTTLE_RETRIES + 1):
+        try:
+            response = llm_gate.call(lambda: model.generate_content(contents))
+            break
+        except Exception as e:  # noqa: BLE001
+            if attempt == settings.LLM_THROTTLE_RETRIES or llm_gate.classify_error(e) != "throttled":
+                raise
+            logger.warning("Gemini throttled the call, retrying (attempt %s)", attempt + 1)
     text = response.text or ""
     logger.debug("Gemini raw response: %s", text[:1000])
     return _extract_json(text)
@@ -97,6 +121,7 @@ def resume_agent_match(
     job_description: str,
     jd_analysis: Dict[str, Any],
     resume_text: str,
+    model_name: str | None = None,
 ) -> Dict[str, Any]:
     prompt = f"""
 You are the Resume Screening Agent in SkillPick AI.
@@ -113,7 +138,7 @@ Output ONLY JSON in this exact format:
 }}
 
 Guidelines:
-- "decision" = "allow" for match_score >= 40, else "reject".
+- "decision" = "allow" for match_score >= {settings.SCREENING_ALLOW_THRESHOLD:g}, else "reject".
 - Be strict but fair.
 
 JOB DESCRIPTION:
@@ -125,7 +150,7 @@ JD ANALYSIS (JSON):
 RESUME TEXT:
 \"\"\"{resume_text}\"\"\"
 """
-    return _call_gemini_json(prompt)
+    return _call_gemini_json(prompt, model_name=model_name)
 
 
 # -------- Question Generator Agent ---------
@@ -163,14 +188,20 @@ Return ONLY JSON in this EXACT structure:
       "description": "Detailed description of the task",
       "difficulty": "easy | medium | hard",
       "expected_time_minutes": 20,
-      "skill": "Data Structures"
+      "skill": "Data Structures",
+      "function_name": "solve",
+      "test_cases": [
+        {{"input": [[3, 1, 2]], "expected": [1, 2, 3]}}
+      ]
     }}
   ],
   "theory": [
     {{
       "id": "theory1",
       "question": "Explain concept Y",
-      "skill": "System Design"
+      "skill": "System Design",
+      "reference_answer": "A model answer in 3-6 sentences",
+      "key_points": ["Point a strong answer must make", "Another point"]
     }}
   ]
 }}
@@ -180,6 +211,11 @@ Constraints:
 - Generate EXACTLY {num_coding} coding questions.
 - Generate EXACTLY {num_theory} theory questions.
 - MCQs should be single-correct-answer.
+- Every theory question needs a "reference_answer" and 3-6 "key_points":
+  short, distinct phrases naming what a strong answer must cover.
+- Coding questions must be solvable as a single Python function named by
+  "function_name". "test_cases" must have 3-8 cases; "input" is the list of
+  positional arguments and "expected" the JSON return value.
 - Make questions aligned with the JD skills and tech stack.
 
 JOB DESCRIPTION:
@@ -194,18 +230,108 @@ EXTRA CONTEXT FOR QUESTION STYLE:
     return _call_gemini_json(prompt)
 
 
+def question_shard_generator_agent(
+    job_description: str,
+    jd_analysis: Dict[str, Any],
+    extra_context: str | None,
+    section: str,
+    count: int,
+    skills: Dict[str, int],
+    avoid: list[str] | None = None,
+) -> Dict[str, Any]:
+    ctx = extra_context or ""
+    formats = {
+        "mcq": """{
+      "id": "mcq1",
+      "question": "Question text",
+      "options": ["A", "B", "C", "D"],
+      "correct_index": 0,
+      "skill": "Python"
+    }""",
+        "coding": """{
+      "id": "code1",
+      "title": "Implement X",
+      "description": "Detailed description of the task",
+      "difficulty": "easy | medium | hard",
+      "expected_time_minutes": 20,
+      "skill": "Data Structures",
+      "function_name": "solve",
+      "test_cases": [
+        {"input": [[3, 1, 2]], "expected": [1, 2, 3]}
+      ]
+    }""",
+        "theory": """{
+      "id": "theory1",
+      "question": "Explain concept Y",
+      "skill": "System Design",
+      "reference_answer": "A model answer in 3-6 sentences",
+      "key_points": ["Point a strong answer must make", "Another point"]
+    }""",
+    }
+    rules = {
+        "mcq": "- MCQs should be single-correct-answer with exactly 4 options.",
+        "coding": """- Coding questions must be solvable as a single Python function named by
+  "function_name". "test_cases" must have 3-8 cases; "input" is the list of
+  positional arguments and "expected" the JSON return value.""",
+        "theory": """- Theory questions should be open-ended and answerable in a few paragraphs.
+- Every question needs a "reference_answer" and 3-6 "key_points": short,
+  distinct phrases naming what a strong answer must cover.""",
+    }
+    prompt = f"""
+You are the Question Generator Agent in SkillPick AI.
+
+Generate ONLY {section.upper()} questions for a technical assessment based on
+the JD and JD analysis. Return ONLY JSON in this EXACT structure:
+
+{{
+  "{section}": [
+    {formats[section]}
+  ]
+}}
+
+Constraints:
+- Generate EXACTLY {count} {section} questions.
+- Cover these skills with the given number of questions each: {json.dumps(skills)}
+{rules[section]}
+- Do NOT repeat or paraphrase any of these existing questions:
+{json.dumps(avoid or [])}
+
+JOB DESCRIPTION:
+\"\"\"{job_description}\"\"\"
+
+JD ANALYSIS (JSON):
+{json.dumps(jd_analysis)}
+
+EXTRA CONTEXT FOR QUESTION STYLE:
+\"\"\"{ctx}\"\"\"
+"""
+    return _call_gemini_json(prompt)
+
+
 # -------- Code Evaluation Agent ---------
 
 
 def code_evaluation_agent(
     coding_questions: Dict[str, Any],
     candidate_code_answers: Dict[str, str],
+    execution_results: Dict[str, Any] | None = None,
 ) -> Dict[str, Any]:
+    if execution_results:
+        focus = f"""Correctness has ALREADY been measured by running the code against tests.
+Do NOT re-judge correctness for questions listed below; score them on
+QUALITY, READABILITY and EFFICIENCY only. For any other question, also
+evaluate CORRECTNESS.
+
+TEST EXECUTION RESULTS (JSON MAP question_id -> result):
+{json.dumps(execution_results)}"""
+    else:
+        focus = "Evaluate QUALITY, READABILITY, CORRECTNESS, and EFFICIENCY."
+
     prompt = f"""
 You are the Code Evaluation Agent for SkillPick AI.
 
 You will receive coding questions and the candidate's submitted code.
-Evaluate QUALITY, READABILITY, CORRECTNESS, and EFFICIENCY.
+{focus}
 
 Return ONLY JSON in this format:
 
@@ -241,6 +367,7 @@ def theory_evaluation_agent(
 You are the Theory Evaluation Agent for SkillPick AI.
 
 You will receive open-ended theory questions and candidate's answers.
+Where a question has a reference answer and key points, grade against them.
 
 Return ONLY JSON in this format:
 
@@ -265,6 +392,73 @@ CANDIDATE THEORY ANSWERS (JSON MAP question_id -> answer):
     return _call_gemini_json(prompt)
 
 
+# -------- Per-question Evaluation Agents ---------
+
+
+def code_question_evaluation_agent(
+    coding_question: Dict[str, Any],
+    candidate_code: str,
+    execution_result: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    if execution_result:
+        focus = f"""Correctness has ALREADY been measured by running the code against tests.
+Score QUALITY, READABILITY and EFFICIENCY only.
+
+TEST EXECUTION RESULT (JSON):
+{json.dumps(execution_result)}"""
+    else:
+        focus = "Evaluate QUALITY, READABILITY, CORRECTNESS, and EFFICIENCY."
+
+    prompt = f"""
+You are the Code Evaluation Agent for SkillPick AI.
+
+You will receive ONE coding question and the candidate's submitted code.
+{focus}
+
+Return ONLY JSON in this format:
+
+{{
+  "question_id": "{coding_question.get('id', '')}",
+  "score": 0-100,
+  "feedback": "short feedback"
+}}
+
+CODING QUESTION (JSON):
+{json.dumps(coding_question)}
+
+CANDIDATE CODE:
+\"\"\"{candidate_code}\"\"\"
+"""
+    return _call_gemini_json(prompt)
+
+
+def theory_question_evaluation_agent(
+    theory_question: Dict[str, Any],
+    candidate_answer: str,
+) -> Dict[str, Any]:
+    prompt = f"""
+You are the Theory Evaluation Agent for SkillPick AI.
+
+You will receive ONE open-ended theory question and the candidate's answer.
+Where the question has a reference answer and key points, grade against them.
+
+Return ONLY JSON in this format:
+
+{{
+  "question_id": "{theory_question.get('id', '')}",
+  "score": 0-100,
+  "feedback": "short feedback"
+}}
+
+THEORY QUESTION (JSON):
+{json.dumps(theory_question)}
+
+CANDIDATE ANSWER:
+\"\"\"{candidate_answer}\"\"\"
+"""
+    return _call_gemini_json(prompt)
+
+
 # -------- Summary Agent ---------
 
 
@@ -308,3 +502,53 @@ THEORY EVAL RESULT:
 {json.dumps(theory_eval_result)}
 """
     return _call_gemini_json(prompt)
+
+
+# -------- Narrative Summary Agent ---------
+
+
+def narrative_summary_agent(
+    jd_analysis: Dict[str, Any],
+    resume_result: Dict[str, Any],
+    section_scores: Dict[str, float],
+    overall_score: float,
+    verdict: str,
+    code_eval_result: Dict[str, Any],
+    theory_eval_result: Dict[str, Any],
+) -> Dict[str, Any]:
+    prompt = f"""
+You are the Final Summary Agent for SkillPick AI.
+
+The candidate's overall score and verdict have ALREADY been computed.
+Explain the candidate's performance across RESUME, MCQ, CODING, and THEORY
+in a way that is consistent with that score and verdict.
+
+Return ONLY JSON in this EXACT format:
+
+{{
+  "strengths": ["point1", "point2"],
+  "weaknesses": ["point1", "point2"],
+  "explanation": "3-6 sentences summarizing the candidate"
+}}
+
+Reference Data:
+
+JD ANALYSIS:
+{json.dumps(jd_analysis)}
+
+RESUME RESULT:
+{json.dumps(resume_result)}
+
+SECTION SCORES (0-100):
+{json.dumps(section_scores)}
+
+OVERALL SCORE: {overall_score:.1f}
+VERDICT: {verdict}
+
+CODE EVAL RESULT:
+{json.dumps(code_eval_result)}
+
+THEORY EVAL RESULT:
+{json.dumps(theory_eval_result)}
+"""
+    return _call_gemini_json(prompt)
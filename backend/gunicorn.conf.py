@@ -0,0 +1,27 @@
+# Multi-worker mode: gunicorn managing uvicorn workers, started by
+# render_start.sh when WEB_CONCURRENCY is set above 1 (or to "auto").
+import multiprocessing
+import os
+
+_concurrency = os.environ.get("WEB_CONCURRENCY", "auto")
+workers = multiprocessing.cpu_count() if _concurrency == "auto" else int(_concurrency)
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# LLM-backed requests can legitimately take a while
+timeout = int(os.environ.get("WORKER_TIMEOUT", "180"))
+graceful_timeout = 30
+keepalive = 5
+
+# Workers must agree on caches, claims and rate limits, and split the LLM
+# concurrency limits between them
+raw_env = ["SHARED_STATE_BACKEND=database", f"WEB_WORKERS={workers}"]
+
+
+def on_starting(server):
+    # Migrate once in the master, before any worker boots and checks the version.
+    from database import engine, ensure_schema
+
+    ensure_schema()
+    # Forked workers must not inherit the master's pooled connections.
+    engine.dispose()
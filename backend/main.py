@@ -1,13 +1,15 @@
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import Base, engine
+from database import ensure_schema
 from config import get_cors_origins
 from routes.process_routes import router as process_router
 from routes.candidate_routes import router as candidate_router
 from routes.analytics_routes import router as analytics_router
+from utils.llm_gate import LLMOverloaded
+from utils.responses import ORJSONResponse
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,12 +17,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger("skillpick.main")
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Schema changes are applied by `python manage.py migrate`; boot only checks the version
+ensure_schema()
 
 app = FastAPI(
     title="SkillPick AI — Autonomous Hiring & Assessment Agent",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS
@@ -34,6 +37,16 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(LLMOverloaded)
+def llm_overloaded_handler(request: Request, exc: LLMOverloaded):
+    logger.warning("Shedding %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": "The assessment service is busy. Please try again shortly."},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
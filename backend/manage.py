@@ -0,0 +1,132 @@
+"""
+Maintenance commands for SkillPick AI.
+
+Usage:
+    python manage.py migrate
+    python manage.py narratives --limit 200
+    python manage.py train-dictionary agent_json --samples 2000
+    python manage.py recompress --chunk-size 500 --vacuum
+    python manage.py reindex-search
+    python manage.py reindex-resumes --rebuild
+    python manage.py rebuild-sketches --process-id 12
+"""
+import argparse
+import logging
+
+from database import SessionLocal
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+)
+logger = logging.getLogger("skillpick.manage")
+
+
+def cmd_migrate(args: argparse.Namespace) -> None:
+    from database import migrate
+
+    migrate()
+
+
+def cmd_narratives(args: argparse.Namespace) -> None:
+    from services.evaluation_service import generate_pending_narratives
+    from utils.llm_gate import llm_scope
+
+    db = SessionLocal()
+    try:
+        with llm_scope(None, priority="batch"):
+            generate_pending_narratives(db, limit=args.limit)
+    finally:
+        db.close()
+
+
+def cmd_train_dictionary(args: argparse.Namespace) -> None:
+    from services.compression_service import train_column_dictionary
+
+    train_column_dictionary(args.name, samples=args.samples)
+
+
+def cmd_recompress(args: argparse.Namespace) -> None:
+    from sqlalchemy import text
+
+    from database import engine
+    from services.compression_service import recompress_columns
+
+    logger.info("Rewrote %s", recompress_columns(args.chunk_size))
+    if args.vacuum and engine.dialect.name == "sqlite":
+        # Space freed by smaller rows is only returned to the OS by VACUUM
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+
+
+def cmd_reindex_search(args: argparse.Namespace) -> None:
+    from services.search_service import ensure_search_index
+
+    ensure_search_index(force_rebuild=True)
+
+
+def cmd_reindex_resumes(args: argparse.Namespace) -> None:
+    from services.resume_dedup_service import index_missing_signatures
+
+    index_missing_signatures(rebuild=args.rebuild)
+
+
+def cmd_rebuild_sketches(args: argparse.Namespace) -> None:
+    from sqlalchemy import select
+
+    from database import engine
+    from models import Evaluation
+    from services.leaderboard_service import rebuild_sketches
+
+    with engine.begin() as conn:
+        if args.process_id is not None:
+            process_ids = [args.process_id]
+        else:
+            process_ids = [
+                row[0]
+                for row in conn.execute(
+                    select(Evaluation.process_id).where(Evaluation.process_id.isnot(None)).distinct()
+                )
+            ]
+        for process_id in process_ids:
+            logger.info("Process %s: sketched %s evaluations", process_id, rebuild_sketches(conn, process_id))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SkillPick AI maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate = sub.add_parser("migrate", help="Create or update the database schema")
+    migrate.set_defaults(func=cmd_migrate)
+
+    narratives = sub.add_parser("narratives", help="Generate pending evaluation narratives")
+    narratives.add_argument("--limit", type=int, default=100)
+    narratives.set_defaults(func=cmd_narratives)
+
+    train = sub.add_parser("train-dictionary", help="Train a compression dictionary from stored rows")
+    train.add_argument("name", help="dictionary name used by the column type, e.g. agent_json")
+    train.add_argument("--samples", type=int, default=2000)
+    train.set_defaults(func=cmd_train_dictionary)
+
+    recompress = sub.add_parser("recompress", help="Recompress stored rows with the current dictionaries")
+    recompress.add_argument("--chunk-size", type=int, default=None)
+    recompress.add_argument("--vacuum", action="store_true", help="SQLite: reclaim freed space afterwards")
+    recompress.set_defaults(func=cmd_recompress)
+
+    reindex = sub.add_parser("reindex-search", help="Rebuild the candidate full-text search index")
+    reindex.set_defaults(func=cmd_reindex_search)
+
+    resumes = sub.add_parser("reindex-resumes", help="Compute missing resume MinHash signatures")
+    resumes.add_argument("--rebuild", action="store_true", help="recompute every signature")
+    resumes.set_defaults(func=cmd_reindex_resumes)
+
+    sketches = sub.add_parser("rebuild-sketches", help="Recompute leaderboard score sketches")
+    sketches.add_argument("--process-id", type=int, default=None, help="only this process")
+    sketches.set_defaults(func=cmd_rebuild_sketches)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
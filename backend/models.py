@@ -1,5 +1,7 @@
 from sqlalchemy import (
+    BigInteger,
     Column,
+    Index,
     Integer,
     String,
     Text,
@@ -7,11 +9,15 @@ from sqlalchemy import (
     ForeignKey,
     Float,
     JSON,
+    Boolean,
+    LargeBinary,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from database import Base
+from utils.compression import CompressedJSON, CompressedText
 
 
 class HiringProcess(Base):
@@ -32,6 +38,18 @@ class HiringProcess(Base):
     jd_tech_stack = Column(JSON, nullable=True)
     jd_experience_expectations = Column(Text, nullable=True)
 
+    status = Column(
+        String(32),
+        nullable=False,
+        default="ready",
+        server_default="ready",
+        comment="generating | ready | failed",
+    )
+    status_detail = Column(Text, nullable=True)
+
+    # Relative share of LLM capacity when several processes compete for it
+    llm_share_weight = Column(Float, nullable=False, default=1.0, server_default="1.0")
+
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     question_set = relationship(
@@ -40,6 +58,9 @@ class HiringProcess(Base):
     candidates = relationship(
         "Candidate", back_populates="process", cascade="all, delete-orphan"
     )
+    scoring_profile = relationship(
+        "ScoringProfile", back_populates="process", uselist=False, cascade="all, delete-orphan"
+    )
 
 
 class QuestionSet(Base):
@@ -52,6 +73,9 @@ class QuestionSet(Base):
     coding_questions = Column(JSON, nullable=False)
     theory_questions = Column(JSON, nullable=False)
 
+    # Candidate-facing questions (answers stripped) pre-rendered as JSON bytes
+    candidate_payload = Column(LargeBinary, nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     process = relationship("HiringProcess", back_populates="question_set")
@@ -61,12 +85,13 @@ class Candidate(Base):
     __tablename__ = "candidates"
 
     id = Column(Integer, primary_key=True, index=True)
-    process_id = Column(Integer, ForeignKey("hiring_processes.id"), nullable=False)
+    process_id = Column(Integer, ForeignKey("hiring_processes.id"), nullable=False, index=True)
 
     name = Column(String(255), nullable=False)
     email = Column(String(255), nullable=False)
 
-    resume_text = Column(Text, nullable=True)
+    # Extracted resume, shared by every candidate who uploaded the same file
+    resume_document_id = Column(Integer, ForeignKey("resume_documents.id"), nullable=True, index=True)
 
     resume_match_score = Column(Float, nullable=True)
     resume_skill_overlap = Column(JSON, nullable=True)
@@ -74,6 +99,11 @@ class Candidate(Base):
     resume_decision = Column(String(32), nullable=True)
     resume_summary = Column(Text, nullable=True)
 
+    # Earlier candidate whose resume this one nearly duplicates (MinHash
+    # estimate of shingle overlap), for recruiters to review
+    duplicate_of_candidate_id = Column(Integer, ForeignKey("candidates.id"), nullable=True)
+    duplicate_similarity = Column(Float, nullable=True)
+
     status = Column(
         String(32),
         nullable=False,
@@ -90,6 +120,11 @@ class Candidate(Base):
     evaluation = relationship(
         "Evaluation", uselist=False, back_populates="candidate"
     )
+    resume_document = relationship("ResumeDocument")
+
+    @property
+    def resume_text(self) -> str | None:
+        return self.resume_document.text if self.resume_document is not None else None
 
 
 class CandidateResponse(Base):
@@ -109,9 +144,16 @@ class CandidateResponse(Base):
 
 class Evaluation(Base):
     __tablename__ = "evaluations"
+    __table_args__ = (
+        # Leaderboard: top-k of a process straight off the index
+        Index("ix_evaluations_process_overall", "process_id", "overall_score"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    candidate_id = Column(Integer, ForeignKey("candidates.id"), nullable=False)
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), nullable=False, index=True)
+    # The candidate's process, on their latest evaluation only; cleared on
+    # evaluations superseded by a resubmission so each candidate ranks once
+    process_id = Column(Integer, ForeignKey("hiring_processes.id"), nullable=True)
 
     mcq_score = Column(Float, nullable=True)
     coding_score = Column(Float, nullable=True)
@@ -125,7 +167,245 @@ class Evaluation(Base):
     final_verdict = Column(String(64), nullable=True)
     summary = Column(Text, nullable=True)
 
-    raw_agent_responses = Column(JSON, nullable=True)
+    raw_agent_responses = Column(CompressedJSON(dictionary="agent_json"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     candidate = relationship("Candidate", back_populates="evaluation")
+
+
+class QuestionBankItem(Base):
+    __tablename__ = "question_bank_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(16), nullable=False, index=True, comment="mcq | coding | theory")
+    skill = Column(String(128), nullable=False, index=True)
+    role_level = Column(String(64), nullable=False, index=True)
+    difficulty = Column(String(32), nullable=True)
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)
+
+    payload = Column(JSON, nullable=False)
+    source_process_id = Column(Integer, ForeignKey("hiring_processes.id"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ScreeningDecision(Base):
+    __tablename__ = "screening_decisions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    process_id = Column(Integer, ForeignKey("hiring_processes.id"), nullable=False, index=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), nullable=True)
+
+    tier1_mode = Column(String(16), nullable=False, comment="model | local | off | duplicate")
+    tier1_model = Column(String(64), nullable=True)
+    tier1_score = Column(Float, nullable=True)
+    tier1_latency_ms = Column(Float, nullable=True)
+    tier1_cost = Column(Float, nullable=True)
+
+    escalated = Column(Boolean, nullable=False, default=False)
+    tier2_model = Column(String(64), nullable=True)
+    tier2_score = Column(Float, nullable=True)
+    tier2_latency_ms = Column(Float, nullable=True)
+    tier2_cost = Column(Float, nullable=True)
+
+    final_score = Column(Float, nullable=False)
+    final_decision = Column(String(16), nullable=False)
+
+    # Screened resume and the agent result, so a near-duplicate resume sent
+    # to the same process can reuse it (tier1_mode "duplicate")
+    resume_document_id = Column(Integer, ForeignKey("resume_documents.id"), nullable=True, index=True)
+    result = Column(JSON, nullable=True)
+    duplicate_of_document_id = Column(Integer, ForeignKey("resume_documents.id"), nullable=True)
+    duplicate_similarity = Column(Float, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class GradingMemo(Base):
+    __tablename__ = "grading_memo"
+    __table_args__ = (
+        UniqueConstraint("question_set_id", "question_id", "answer_hash", name="uq_grading_memo_answer"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_set_id = Column(Integer, ForeignKey("question_sets.id"), nullable=False, index=True)
+    question_id = Column(String(64), nullable=False)
+    question_hash = Column(String(64), nullable=False)
+    answer_hash = Column(String(64), nullable=False)
+
+    # 64-bit simhash of the answer split into four 16-bit bands for near-duplicate lookup
+    simhash_b0 = Column(Integer, nullable=True, index=True)
+    simhash_b1 = Column(Integer, nullable=True, index=True)
+    simhash_b2 = Column(Integer, nullable=True, index=True)
+    simhash_b3 = Column(Integer, nullable=True, index=True)
+
+    score = Column(Float, nullable=False)
+    feedback = Column(Text, nullable=True)
+    hits = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ScoringProfile(Base):
+    __tablename__ = "scoring_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    process_id = Column(Integer, ForeignKey("hiring_processes.id"), nullable=False, unique=True)
+
+    # Section weights (resume/mcq/coding/theory) and verdict cut-offs
+    # (strong_hire/hire/borderline); missing keys fall back to the settings.
+    weights = Column(JSON, nullable=True)
+    thresholds = Column(JSON, nullable=True)
+    version = Column(Integer, nullable=False, default=1)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    process = relationship("HiringProcess", back_populates="scoring_profile")
+
+
+class SharedStateEntry(Base):
+    """
+    Key/value rows shared by every worker process: counters, job claims,
+    rate-limit buckets and cache epochs (see services/shared_state_service.py).
+    """
+
+    __tablename__ = "shared_state"
+
+    key = Column(String(255), primary_key=True)
+    value = Column(Text, nullable=True)
+    expires_at = Column(Float, nullable=True, index=True)
+
+
+class ResumeDocument(Base):
+    """
+    Text extracted from an uploaded resume, stored once per distinct file
+    (see services/resume_document_service.py).
+    """
+
+    __tablename__ = "resume_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # SHA-256 of the uploaded bytes. Documents moved out of candidates.resume_text
+    # by the migration have no bytes and are keyed "text:" + SHA-256 of the text.
+    sha256 = Column(String(80), unique=True, index=True, nullable=False)
+    size_bytes = Column(Integer, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    text = Column(CompressedText(), nullable=False, default="")
+    extract_ms = Column(Float, nullable=True)
+    # MinHash signature of the text (uint32 values); empty when the text has
+    # no words, NULL until computed (see resume_dedup_service)
+    minhash = Column(LargeBinary, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ResumeLSHBucket(Base):
+    """
+    LSH buckets of resume MinHash signatures: one row per (document, band).
+    Documents sharing a bucket in any band are near-duplicate candidates.
+    """
+
+    __tablename__ = "resume_lsh_buckets"
+    __table_args__ = (
+        UniqueConstraint("document_id", "band", name="uq_resume_lsh_document_band"),
+        Index("ix_resume_lsh_band_bucket", "band", "bucket"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("resume_documents.id"), nullable=False)
+    band = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+
+
+class CodeFingerprintSet(Base):
+    """
+    One candidate's answer to one coding question, fingerprinted for
+    cross-candidate similarity (see services/plagiarism_service.py).
+    """
+
+    __tablename__ = "code_fingerprint_sets"
+    __table_args__ = (
+        UniqueConstraint("question_set_id", "question_id", "candidate_id", name="uq_code_fingerprint_set"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_set_id = Column(Integer, ForeignKey("question_sets.id"), nullable=False)
+    question_id = Column(String(64), nullable=False)
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), nullable=False, index=True)
+    size = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CodeFingerprint(Base):
+    """Winnowing fingerprints of a CodeFingerprintSet, indexed per question."""
+
+    __tablename__ = "code_fingerprints"
+    __table_args__ = (
+        Index("ix_code_fingerprints_question_hash", "question_set_id", "question_id", "hash"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    set_id = Column(Integer, ForeignKey("code_fingerprint_sets.id", ondelete="CASCADE"), nullable=False, index=True)
+    question_set_id = Column(Integer, nullable=False)
+    question_id = Column(String(64), nullable=False)
+    hash = Column(BigInteger, nullable=False)
+
+
+class CodeSimilarity(Base):
+    """
+    A pair of answers to the same coding question sharing at least
+    PLAGIARISM_MIN_SIMILARITY of their fingerprints. Stored once per pair,
+    candidate_id being the submission that found it.
+    """
+
+    __tablename__ = "code_similarities"
+    __table_args__ = (
+        Index("ix_code_similarities_question", "question_set_id", "question_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    question_set_id = Column(Integer, ForeignKey("question_sets.id"), nullable=False)
+    question_id = Column(String(64), nullable=False)
+    candidate_id = Column(Integer, ForeignKey("candidates.id"), nullable=False, index=True)
+    other_candidate_id = Column(Integer, ForeignKey("candidates.id"), nullable=False, index=True)
+    similarity = Column(Float, nullable=False)
+    shared = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ScoreSketch(Base):
+    """
+    t-digest of one section score (or the overall score) over a process's
+    evaluations, updated as each evaluation is stored, for percentile ranks
+    without reading the evaluations.
+    """
+
+    __tablename__ = "score_sketches"
+    __table_args__ = (UniqueConstraint("process_id", "section", name="uq_score_sketches_process_section"),)
+
+    id = Column(Integer, primary_key=True)
+    process_id = Column(Integer, ForeignKey("hiring_processes.id"), nullable=False)
+    section = Column(String(16), nullable=False, comment="overall | resume | mcq | coding | theory")
+    count = Column(Integer, nullable=False, default=0)
+    digest = Column(LargeBinary, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class CompressionDictionary(Base):
+    """
+    Trained zlib preset dictionaries for compressed columns (see
+    utils/compression.py). Rows are never changed once written: compressed
+    values refer to their dictionary by id.
+    """
+
+    __tablename__ = "compression_dictionaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(64), nullable=False, index=True)
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1 +1,5 @@
+if [ "${WEB_CONCURRENCY:-1}" = "auto" ] || [ "${WEB_CONCURRENCY:-1}" -gt 1 ]; then
+    exec gunicorn -c gunicorn.conf.py main:app
+fi
+
 uvicorn main:app --host 0.0.0.0 --port $PORT
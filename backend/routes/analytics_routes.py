@@ -1,14 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from database import get_db
-from services import process_service
+from services import (
+    export_service,
+    grading_memo_service,
+    leaderboard_service,
+    plagiarism_service,
+    process_service,
+    resume_document_service,
+    screening_service,
+    theory_grading_service,
+)
 from schemas import (
     ProcessAnalyticsResponse,
     ProcessAnalyticsOverview,
     CandidateAnalyticsItem,
+    CandidatePercentiles,
+    CodeSimilarityReport,
+    ScreeningStats,
+    GradingMemoStats,
+    LeaderboardResponse,
+    LLMGateStats,
+    ResumeCacheStats,
+    TheoryGradingStats,
 )
+from utils.llm_gate import gate as llm_gate
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
@@ -35,6 +54,8 @@ def get_process_analytics(process_id: int, db: Session = Depends(get_db)):
     )
 
     eval_by_candidate = {e.candidate_id: e for e in evals}
+    code_similarity = plagiarism_service.max_similarity_by_candidate(db, candidate_ids)
+    overall_sketch = leaderboard_service.load_sketches(db, process_id).get("overall")
 
     items: list[CandidateAnalyticsItem] = []
     total_overall = 0.0
@@ -62,6 +83,12 @@ def get_process_analytics(process_id: int, db: Session = Depends(get_db)):
                     theory_score=e.theory_score or 0.0,
                     overall_score=overall,
                     final_verdict=e.final_verdict or "borderline",
+                    duplicate_of_candidate_id=c.duplicate_of_candidate_id,
+                    duplicate_similarity=c.duplicate_similarity,
+                    max_code_similarity=code_similarity.get(c.id),
+                    overall_percentile=(
+                        round(100.0 * overall_sketch.cdf(overall), 1) if overall_sketch is not None else None
+                    ),
                 )
             )
         else:
@@ -76,6 +103,9 @@ def get_process_analytics(process_id: int, db: Session = Depends(get_db)):
                     theory_score=0.0,
                     overall_score=0.0,
                     final_verdict=c.status,
+                    duplicate_of_candidate_id=c.duplicate_of_candidate_id,
+                    duplicate_similarity=c.duplicate_similarity,
+                    max_code_similarity=code_similarity.get(c.id),
                 )
             )
 
@@ -93,3 +123,101 @@ def get_process_analytics(process_id: int, db: Session = Depends(get_db)):
     )
 
     return ProcessAnalyticsResponse(overview=overview, candidates=items)
+
+
+@router.get("/process/{process_id}/leaderboard", response_model=LeaderboardResponse)
+def get_leaderboard(
+    process_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Candidates ranked by overall score, with per-section percentiles.
+    Cost depends on limit + offset, not on the number of candidates.
+    """
+    process = process_service.get_process_by_id(db, process_id)
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+    return LeaderboardResponse(**leaderboard_service.get_leaderboard(db, process_id, limit=limit, offset=offset))
+
+
+@router.get("/candidate/{candidate_id}/percentiles", response_model=CandidatePercentiles)
+def get_candidate_percentiles(candidate_id: int, db: Session = Depends(get_db)):
+    result = leaderboard_service.get_candidate_percentiles(db, candidate_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return CandidatePercentiles(**result)
+
+
+@router.get("/process/{process_id}/code-similarity", response_model=CodeSimilarityReport)
+def get_code_similarity(process_id: int, db: Session = Depends(get_db)):
+    """
+    Groups of candidates with closely matching coding answers, per
+    question, and each flagged candidate's closest matches.
+    """
+    process = process_service.get_process_by_id(db, process_id)
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+    return CodeSimilarityReport(**plagiarism_service.get_process_report(db, process_id))
+
+
+@router.get("/process/{process_id}/export")
+def export_process_candidates(
+    process_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = Query(False),
+    columns: str | None = Query(None, description="Comma-separated; defaults to all but long text"),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream every candidate of a process with scores and per-question
+    feedback, for import into an ATS. Rows are read and written in batches,
+    so memory use does not grow with the number of candidates.
+    """
+    process = process_service.get_process_by_id(db, process_id)
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+    try:
+        selected = export_service.parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"process-{process_id}-candidates.{format}" + (".gz" if gzip else "")
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_service.stream_export(process_id, format, selected, gzip=gzip),
+        media_type="application/gzip" if gzip else media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/screening", response_model=ScreeningStats)
+def get_screening_stats(
+    process_id: int | None = Query(None),
+    db: Session = Depends(get_db),
+):
+    return ScreeningStats(**screening_service.get_screening_stats(db, process_id))
+
+
+@router.get("/grading-memo", response_model=GradingMemoStats)
+def get_grading_memo_stats(db: Session = Depends(get_db)):
+    return GradingMemoStats(**grading_memo_service.get_memo_stats(db))
+
+
+@router.get("/theory-grading", response_model=TheoryGradingStats)
+def get_theory_grading_stats():
+    # Per worker: how many theory answers were graded without the LLM
+    return TheoryGradingStats(**theory_grading_service.get_stats())
+
+
+@router.get("/resume-cache", response_model=ResumeCacheStats)
+def get_resume_cache_stats(db: Session = Depends(get_db)):
+    # Hit counts and cache size are per worker; documents is the shared table
+    return ResumeCacheStats(**resume_document_service.get_cache_stats(db))
+
+
+@router.get("/llm-gate", response_model=LLMGateStats)
+def get_llm_gate_stats():
+    # Per worker: each worker process has its own gate
+    return LLMGateStats(**llm_gate.stats())
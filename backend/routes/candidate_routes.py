@@ -1,31 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from sqlalchemy.orm import Session
 
+from config import settings
 from database import get_db
-from models import HiringProcess, Candidate, CandidateResponse, Evaluation  # ✔ matches your models
+from models import HiringProcess, Candidate, Evaluation
 from schemas import (
     CandidateRegisterResponse,
+    CandidateSearchResponse,
     CandidateTestSubmission,
     EvaluationOut
 )
-from utils.pdf_reader import extract_text_from_pdf_bytes as extract_text_from_pdf
-from gemini_client import (
-    resume_agent_match,
-    question_generator_agent,
-    code_evaluation_agent,
-    theory_evaluation_agent,
-    summary_agent
+from services import (
+    admission_service,
+    candidate_service,
+    evaluation_service,
+    process_context_service,
+    question_bank_service,
+    resume_document_service,
+    screening_service,
+    search_service,
+    similarity_service,
 )
-
-import json
+from utils.llm_gate import llm_scope
+from utils.responses import json_with_raw_fields
 
 
 router = APIRouter(prefix="/api/candidates", tags=["candidates"])
 
 
 
-@router.post("/register/{public_token}", response_model=CandidateRegisterResponse)
-async def register_candidate(
+@router.get("/search", response_model=CandidateSearchResponse)
+def search_candidates(
+    q: str = Query(..., min_length=1, max_length=500),
+    process_id: int | None = Query(None),
+    verdict: str | None = Query(None),
+    match: str = Query("all", pattern="^(all|any)$"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """Full-text search over past applicants' resumes and summaries."""
+    return search_service.search_candidates(
+        db, q, process_id=process_id, verdict=verdict, match_all=match == "all", limit=limit, offset=offset
+    )
+
+
+# Sync handlers: PDF parsing and LLM calls block, so they run in the
+# threadpool instead of stalling the event loop.
+@router.post(
+    "/register/{public_token}",
+    response_model=CandidateRegisterResponse,
+    dependencies=[Depends(admission_service.limit_registration)],
+)
+def register_candidate(
     public_token: str,
     name: str = Form(...),
     email: str = Form(...),
@@ -33,27 +60,25 @@ async def register_candidate(
     db: Session = Depends(get_db)
 ):
     # Validate process
-    process = db.query(HiringProcess).filter(HiringProcess.public_token == public_token).first()
-    if not process:
+    ctx = process_context_service.get_context_by_token(db, public_token)
+    if not ctx:
         raise HTTPException(status_code=404, detail="Invalid or expired test link")
+    if ctx.status == "generating":
+        raise HTTPException(
+            status_code=503,
+            detail="This assessment is still being prepared. Please try again in a few seconds.",
+            headers={"Retry-After": str(settings.PROCESS_NOT_READY_RETRY_AFTER_SECONDS)},
+        )
+    if ctx.status == "failed":
+        raise HTTPException(status_code=409, detail="This assessment is currently unavailable.")
 
-    # Extract resume text
-    resume_bytes = await resume.read()
-    resume_text = extract_text_from_pdf(resume_bytes)
-
-    # Run resume agent
-    jd_analysis = {
-        "skills": process.jd_skills or [],
-        "role_level": process.jd_role_level or "",
-        "tech_stack": process.jd_tech_stack or [],
-        "experience_expectations": process.jd_experience_expectations or ""
-    }
-
-    resume_result = resume_agent_match(
-        job_description=process.description,
-        jd_analysis=jd_analysis,
-        resume_text=resume_text
-    )
+    # Extract resume text, reusing an earlier upload of the same file
+    document = resume_document_service.get_or_extract(db, resume.file.read())
+    resume_text = document.text
+
+    # Run resume agent within this process's share of LLM capacity
+    with llm_scope(ctx.process_id, ctx.llm_share_weight, "interactive", settings.LLM_INTERACTIVE_DEADLINE_SECONDS):
+        resume_result, screening = screening_service.screen_resume(db, ctx, resume_text, document.document_id)
 
     # Reject candidate
     if resume_result["decision"] == "reject":
@@ -68,33 +93,36 @@ async def register_candidate(
     candidate = Candidate(
         name=name,
         email=email,
-        process_id=process.id,
-        resume_text=resume_text,
+        process_id=ctx.process_id,
+        resume_document_id=document.document_id,
         resume_match_score=resume_result["match_score"],
         resume_skill_overlap=resume_result.get("skill_overlap", []),
         resume_experience_relevance=resume_result.get("experience_relevance", ""),
         resume_decision="accepted",
         resume_summary=resume_result.get("summary", ""),
+        duplicate_of_candidate_id=resume_result.get("duplicate_of_candidate_id"),
+        duplicate_similarity=resume_result.get("duplicate_similarity"),
         status="accepted"
     )
 
     db.add(candidate)
     db.commit()
     db.refresh(candidate)
+    screening_service.attach_candidate(db, screening, candidate.id)
+    similarity_service.add_candidate(candidate.id, ctx.process_id, resume_text)
 
-    # Generate questions
-    qs = question_generator_agent(
-        job_description=process.description,
-        jd_analysis=jd_analysis,
-        extra_context=process.extra_context,
-        num_mcq=process.num_mcq,
-        num_coding=process.num_coding,
-        num_theory=process.num_theory
-    )
-
-    # Store questions in DB (linked to process)
-    if not process.question_set:
+    # Questions are generated once per process; build them only if missing
+    if ctx.questions_payload is None:
         from models import QuestionSet
+        process = db.query(HiringProcess).filter(HiringProcess.id == ctx.process_id).first()
+        try:
+            with llm_scope(ctx.process_id, ctx.llm_share_weight, "interactive", settings.LLM_INTERACTIVE_DEADLINE_SECONDS):
+                qs = question_bank_service.build_question_set_payload(db, process)
+        except question_bank_service.IncompleteQuestionSet as e:
+            process.status = "failed"
+            process.status_detail = str(e)
+            db.commit()
+            raise HTTPException(status_code=409, detail="This assessment is currently unavailable.")
         qset = QuestionSet(
             process_id=process.id,
             mcq_questions=qs["mcq"],
@@ -103,20 +131,28 @@ async def register_candidate(
         )
         db.add(qset)
         db.commit()
-
-    return CandidateRegisterResponse(
-        status="accepted",
-        message="Resume approved! Test unlocked.",
-        candidate_id=candidate.id,
-        resume_match_score=resume_result["match_score"],
-        resume_summary=resume_result["summary"],
-        questions=qs
+        ctx = process_context_service.get_context(db, process.id)
+
+    # Questions are spliced in pre-rendered (see render_candidate_payload)
+    return json_with_raw_fields(
+        {
+            "status": "accepted",
+            "candidate_id": candidate.id,
+            "message": "Resume approved! Test unlocked.",
+            "resume_match_score": resume_result["match_score"],
+            "resume_summary": resume_result["summary"],
+        },
+        questions=ctx.questions_payload,
     )
 
 
 
-@router.post("/{candidate_id}/submit", response_model=EvaluationOut)
-async def submit_answers(
+@router.post(
+    "/{candidate_id}/submit",
+    response_model=EvaluationOut,
+    dependencies=[Depends(admission_service.limit_submission)],
+)
+def submit_answers(
     candidate_id: int,
     payload: CandidateTestSubmission,
     db: Session = Depends(get_db)
@@ -125,115 +161,29 @@ async def submit_answers(
     if not candidate:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
-    process = candidate.process
-    qset = process.question_set
+    ctx = process_context_service.get_context(db, candidate.process_id)
+    if not ctx or ctx.question_set_id is None:
+        raise HTTPException(status_code=404, detail="Question set not found")
 
-    # Save raw candidate answers
-    response = CandidateResponse(
-        candidate_id=candidate.id,
-        mcq_answers=payload.mcq_answers,
-        coding_answers=payload.coding_answers,
-        theory_answers=payload.theory_answers
-    )
-    db.add(response)
-    db.commit()
-
-   
-    mcq_score = 0
-    for q in qset.mcq_questions:
-        qid = q["id"]
-        correct = q["correct_index"]
-        candidate_ans = payload.mcq_answers.get(qid)
-        if candidate_ans == correct:
-            mcq_score += 1
-
-    total_mcq = max(len(qset.mcq_questions), 1)
-    mcq_score = (mcq_score / total_mcq) * 100
-
-   
-    code_eval = code_evaluation_agent(
-        qset.coding_questions,
-        payload.coding_answers
-    )
-
-   
-    theory_eval = theory_evaluation_agent(
-        qset.theory_questions,
-        payload.theory_answers
-    )
-
-    jd_analysis = {
-        "skills": process.jd_skills or [],
-        "role_level": process.jd_role_level or "",
-        "tech_stack": process.jd_tech_stack or [],
-        "experience_expectations": process.jd_experience_expectations or ""
-    }
-
-    resume_result = {
-        "match_score": candidate.resume_match_score,
-        "summary": candidate.resume_summary
-    }
-
-    final_summary = summary_agent(
-        jd_analysis=jd_analysis,
-        resume_result=resume_result,
-        mcq_score=mcq_score,
-        code_eval_result=code_eval,
-        theory_eval_result=theory_eval
-    )
-
-    # Store evaluation
-    evaluation = Evaluation(
-        candidate_id=candidate.id,
-        mcq_score=mcq_score,
-        coding_score=code_eval["total_score"],
-        theory_score=theory_eval["total_score"],
-        resume_match_score=candidate.resume_match_score,
-        overall_score=final_summary["overall_score"],
-        strengths=final_summary["strengths"],
-        weaknesses=final_summary["weaknesses"],
-        final_verdict=final_summary["verdict"],
-        summary=final_summary["explanation"],
-        raw_agent_responses={
-            "code": code_eval,
-            "theory": theory_eval,
-            "summary": final_summary
-        }
-    )
-
-    db.add(evaluation)
-    candidate.status = "completed"
-    db.commit()
-
-    return EvaluationOut(
-        mcq_score=mcq_score,
-        coding_score=code_eval["total_score"],
-        theory_score=theory_eval["total_score"],
-        resume_match_score=candidate.resume_match_score,
-        overall_score=final_summary["overall_score"],
-        strengths=final_summary["strengths"],
-        weaknesses=final_summary["weaknesses"],
-        summary=final_summary["explanation"],
-        final_verdict=final_summary["verdict"]
-    )
+    # Save raw candidate answers, then grade them
+    candidate_service.store_candidate_submission(db, candidate, payload)
+    with llm_scope(ctx.process_id, ctx.llm_share_weight, "interactive", settings.LLM_INTERACTIVE_DEADLINE_SECONDS):
+        return evaluation_service.evaluate_candidate(db, candidate, ctx, payload)
 
 
 
 @router.get("/{candidate_id}/result", response_model=EvaluationOut)
-async def get_result(candidate_id: int, db: Session = Depends(get_db)):
+def get_result(candidate_id: int, db: Session = Depends(get_db)):
     evaluation = db.query(Evaluation).filter(Evaluation.candidate_id == candidate_id).first()
 
     if not evaluation:
         raise HTTPException(status_code=404, detail="Result not found")
 
-    return EvaluationOut(
-        mcq_score=evaluation.mcq_score,
-        coding_score=evaluation.coding_score,
-        theory_score=evaluation.theory_score,
-        resume_match_score=evaluation.resume_match_score,
-        overall_score=evaluation.overall_score,
-        strengths=evaluation.strengths or [],
-        weaknesses=evaluation.weaknesses or [],
-        summary=evaluation.summary or "",
-        final_verdict=evaluation.final_verdict or ""
-    )
+    # The written summary is generated on first view
+    with llm_scope(
+        evaluation.candidate.process_id,
+        priority="interactive",
+        deadline_seconds=settings.LLM_INTERACTIVE_DEADLINE_SECONDS,
+    ):
+        evaluation = evaluation_service.ensure_narrative(db, evaluation)
+    return evaluation_service.to_evaluation_out(evaluation)
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from database import get_db
-from services import process_service
+from services import process_context_service, process_service, scoring_service, similarity_service
 from schemas import (
+    CandidateRankingResponse,
+    CandidateSimilarityItem,
     HiringProcessCreate,
     HiringProcessOut,
     JDAnalysis,
     PublicProcessInfo,
+    ScoreRecomputeReport,
+    ScoringProfileOut,
+    ScoringProfileUpdate,
 )
 
 router = APIRouter(prefix="/api/processes", tags=["processes"])
@@ -20,12 +25,7 @@ router = APIRouter(prefix="/api/processes", tags=["processes"])
 def create_process(payload: HiringProcessCreate, db: Session = Depends(get_db)):
     process = process_service.create_hiring_process(db, payload)
 
-    jd = JDAnalysis(
-        skills=process.jd_skills or [],
-        role_level=process.jd_role_level or "unknown",
-        tech_stack=process.jd_tech_stack or [],
-        experience_expectations=process.jd_experience_expectations or "",
-    )
+    jd = JDAnalysis(**process_context_service.jd_analysis_for(process))
 
     return HiringProcessOut(
         id=process.id,
@@ -37,6 +37,8 @@ def create_process(payload: HiringProcessCreate, db: Session = Depends(get_db)):
         num_theory=process.num_theory,
         extra_context=process.extra_context,
         jd_analysis=jd,
+        status=process.status,
+        status_detail=process.status_detail,
     )
 
 
@@ -49,12 +51,7 @@ def get_process(process_id: int, db: Session = Depends(get_db)):
     if not process:
         raise HTTPException(status_code=404, detail="Process not found")
 
-    jd = JDAnalysis(
-        skills=process.jd_skills or [],
-        role_level=process.jd_role_level or "unknown",
-        tech_stack=process.jd_tech_stack or [],
-        experience_expectations=process.jd_experience_expectations or "",
-    )
+    jd = JDAnalysis(**process_context_service.jd_analysis_for(process))
 
     return HiringProcessOut(
         id=process.id,
@@ -66,25 +63,108 @@ def get_process(process_id: int, db: Session = Depends(get_db)):
         num_theory=process.num_theory,
         extra_context=process.extra_context,
         jd_analysis=jd,
+        status=process.status,
+        status_detail=process.status_detail,
     )
 
 
+# ---------------------------------------------
+# RETRY FAILED OR STALLED QUESTION GENERATION (Recruiter)
+# ---------------------------------------------
+@router.post("/{process_id}/retry-generation", response_model=HiringProcessOut)
+def retry_generation(process_id: int, db: Session = Depends(get_db)):
+    process = process_service.get_process_by_id(db, process_id)
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+    if not process_service.can_retry_generation(process):
+        if process.status == "generating":
+            raise HTTPException(status_code=409, detail="Questions are still being generated")
+        raise HTTPException(status_code=409, detail=f"Process is {process.status}, not failed")
+
+    process = process_service.retry_generation(db, process)
+    return get_process(process.id, db)
+
+
+# ---------------------------------------------
+# RANK CANDIDATES BY RESUME SIMILARITY (Recruiter)
+# ---------------------------------------------
+@router.get("/{process_id}/candidate-ranking", response_model=CandidateRankingResponse)
+def rank_candidates(
+    process_id: int,
+    limit: int = Query(50, ge=1, le=1000),
+    same_process_only: bool = False,
+    db: Session = Depends(get_db),
+):
+    process = process_service.get_process_by_id(db, process_id)
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+
+    ranked = similarity_service.rank_candidates_for_process(
+        db, process, limit=limit, same_process_only=same_process_only
+    )
+    return CandidateRankingResponse(
+        process_id=process.id,
+        candidates=[CandidateSimilarityItem(**r) for r in ranked],
+    )
+
+
+# ---------------------------------------------
+# SCORING PROFILE (Recruiter)
+# ---------------------------------------------
+@router.get("/{process_id}/scoring-profile", response_model=ScoringProfileOut)
+def get_scoring_profile(process_id: int, db: Session = Depends(get_db)):
+    process = process_service.get_process_by_id(db, process_id)
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+
+    weights, thresholds = scoring_service.resolve_profile(process)
+    return ScoringProfileOut(
+        process_id=process.id,
+        version=process.scoring_profile.version if process.scoring_profile else 0,
+        weights=weights,
+        thresholds=thresholds,
+    )
+
+
+@router.put("/{process_id}/scoring-profile", response_model=ScoreRecomputeReport)
+def update_scoring_profile(
+    process_id: int,
+    payload: ScoringProfileUpdate,
+    db: Session = Depends(get_db),
+):
+    process = process_service.get_process_by_id(db, process_id)
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+
+    try:
+        scoring_service.save_profile(db, process, payload.weights, payload.thresholds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Existing evaluations are rescored under the new profile straight away
+    return scoring_service.recompute_process_scores(db, process)
+
+
+@router.post("/{process_id}/recompute-scores", response_model=ScoreRecomputeReport)
+def recompute_scores(process_id: int, db: Session = Depends(get_db)):
+    process = process_service.get_process_by_id(db, process_id)
+    if not process:
+        raise HTTPException(status_code=404, detail="Process not found")
+
+    return scoring_service.recompute_process_scores(db, process)
+
+
 # ---------------------------------------------
 # PUBLIC ENDPOINT — CANDIDATE OPENS TEST LINK
 # (Used by frontend: /api/processes/public/<token>)
 # ---------------------------------------------
 @router.get("/public/{public_token}", response_model=PublicProcessInfo)
 def get_public_process_info(public_token: str, db: Session = Depends(get_db)):
-    process = process_service.get_process_by_token(db, public_token)
-    if not process:
+    ctx = process_context_service.get_context_by_token(db, public_token)
+    if not ctx:
         raise HTTPException(status_code=404, detail="Process not found")
 
-    jd = JDAnalysis(
-        skills=process.jd_skills or [],
-        role_level=process.jd_role_level or "unknown",
-        tech_stack=process.jd_tech_stack or [],
-        experience_expectations=process.jd_experience_expectations or "",
-    )
+    jd = JDAnalysis(**ctx.jd_analysis)
 
     instructions = (
         "Welcome to SkillPick AI! Upload your resume to begin. "
@@ -93,11 +173,12 @@ def get_public_process_info(public_token: str, db: Session = Depends(get_db)):
     )
 
     return PublicProcessInfo(
-        title=process.title,
-        description=process.description,
+        title=ctx.title,
+        description=ctx.description,
         jd_analysis=jd,
         instructions=instructions,
-        num_mcq=process.num_mcq,
-        num_coding=process.num_coding,
-        num_theory=process.num_theory,
+        status=ctx.status,
+        num_mcq=ctx.num_mcq,
+        num_coding=ctx.num_coding,
+        num_theory=ctx.num_theory,
     )
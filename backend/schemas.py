@@ -33,6 +33,8 @@ class HiringProcessOut(BaseModel):
     num_theory: int
     extra_context: Optional[str]
     jd_analysis: JDAnalysis
+    status: str = "ready"
+    status_detail: Optional[str] = None
 
 
 class PublicProcessInfo(BaseModel):
@@ -40,6 +42,40 @@ class PublicProcessInfo(BaseModel):
     description: str
     jd_analysis: JDAnalysis
     instructions: str
+    status: str = "ready"
+
+
+class CandidateSimilarityItem(BaseModel):
+    candidate_id: int
+    process_id: Optional[int] = None
+    name: str
+    email: str
+    status: str
+    similarity: float
+    matched_skills: List[str] = []
+
+
+class CandidateRankingResponse(BaseModel):
+    process_id: int
+    candidates: List[CandidateSimilarityItem]
+
+
+class CandidateSearchHit(BaseModel):
+    candidate_id: int
+    process_id: int
+    name: str
+    email: str
+    status: str
+    overall_score: Optional[float] = None
+    final_verdict: Optional[str] = None
+    score: float
+    snippet: str  # HTML-escaped, matches wrapped in <mark>
+
+
+class CandidateSearchResponse(BaseModel):
+    query: str
+    hits: List[CandidateSearchHit]
+    took_ms: float
 
 
 # ---------- Questions / Candidate ----------
@@ -49,7 +85,7 @@ class MCQQuestion(BaseModel):
     id: str
     question: str
     options: List[str]
-    correct_index: int
+    correct_index: Optional[int] = None  # never sent to candidates
     skill: Optional[str] = None
 
 
@@ -60,12 +96,16 @@ class CodingQuestion(BaseModel):
     difficulty: str
     expected_time_minutes: int
     skill: Optional[str] = None
+    function_name: Optional[str] = None
 
 
 class TheoryQuestion(BaseModel):
     id: str
     question: str
     skill: Optional[str] = None
+    # Used for local grading; never sent to candidates
+    reference_answer: Optional[str] = None
+    key_points: List[str] = []
 
 
 class QuestionSetOut(BaseModel):
@@ -134,6 +174,7 @@ class EvaluationOut(BaseModel):
     weaknesses: List[str]
     final_verdict: str
     summary: str
+    narrative_ready: bool = True
 
 
 class CandidateAnalyticsItem(BaseModel):
@@ -146,6 +187,49 @@ class CandidateAnalyticsItem(BaseModel):
     theory_score: float
     overall_score: float
     final_verdict: str
+    duplicate_of_candidate_id: Optional[int] = None
+    duplicate_similarity: Optional[float] = None
+    # Highest fingerprint overlap of a coding answer with another candidate's
+    max_code_similarity: Optional[float] = None
+    overall_percentile: Optional[float] = None
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    candidate_id: int
+    name: str
+    email: str
+    final_verdict: str
+    overall_score: float
+    resume_match_score: float
+    mcq_score: float
+    coding_score: float
+    theory_score: float
+    # Section -> percentile within the process (0-100), from the score sketches
+    percentiles: Dict[str, float]
+
+
+class ScoreDistribution(BaseModel):
+    count: int
+    p25: float
+    p50: float
+    p75: float
+    p90: float
+
+
+class LeaderboardResponse(BaseModel):
+    process_id: int
+    evaluated: int
+    entries: List[LeaderboardEntry]
+    distribution: Dict[str, ScoreDistribution]
+
+
+class CandidatePercentiles(BaseModel):
+    candidate_id: int
+    process_id: int
+    evaluated: int
+    overall_score: float
+    percentiles: Dict[str, float]
 
 
 class ProcessAnalyticsOverview(BaseModel):
@@ -161,3 +245,146 @@ class ProcessAnalyticsOverview(BaseModel):
 class ProcessAnalyticsResponse(BaseModel):
     overview: ProcessAnalyticsOverview
     candidates: List[CandidateAnalyticsItem]
+
+
+class CodeSimilarityCluster(BaseModel):
+    candidate_ids: List[int]
+    max_similarity: float
+
+
+class CodeQuestionSimilarity(BaseModel):
+    question_id: str
+    submissions: int
+    clusters: List[CodeSimilarityCluster]
+
+
+class CodeSimilarityMatch(BaseModel):
+    candidate_id: int
+    question_id: str
+    similarity: float
+
+
+class CandidateCodeSimilarity(BaseModel):
+    candidate_id: int
+    top_matches: List[CodeSimilarityMatch]
+
+
+class CodeSimilarityReport(BaseModel):
+    process_id: int
+    questions: List[CodeQuestionSimilarity]
+    candidates: List[CandidateCodeSimilarity]
+
+
+class ScreeningStats(BaseModel):
+    process_id: Optional[int] = None
+    total_screened: int
+    escalated: int
+    escalation_rate: float
+    allowed: int
+    avg_tier1_latency_ms: float
+    avg_tier2_latency_ms: float
+    tier1_cost: float
+    tier2_cost: float
+    allow_threshold: float
+    escalation_band: float
+    # Near-duplicate resumes found, and those settled without an agent call
+    duplicates: int = 0
+    duplicates_unscreened: int = 0
+    dedup_policy: str = "off"
+
+
+class LLMPriorityStats(BaseModel):
+    in_flight: int
+    waiting: int
+    admitted: int
+    queued: int
+    deadline_misses: int
+    shed: int
+    wait_p50_ms: float
+    wait_p95_ms: float
+
+
+class LLMLimitChange(BaseModel):
+    at: float
+    old: int
+    new: int
+    reason: str  # probe | latency | throttled | timeout
+
+
+class LLMGateStats(BaseModel):
+    capacity: int
+    adaptive: bool
+    in_flight: int
+    waiting: int
+    latency_ewma_ms: float
+    classes: Dict[str, LLMPriorityStats]
+    in_flight_by_process: Dict[str, int]
+    # Adaptive limit only
+    limit: Optional[int] = None
+    limit_min: Optional[int] = None
+    limit_max: Optional[int] = None
+    baseline_latency_ms: Optional[float] = None
+    recent_latency_ms: Optional[float] = None
+    limit_changes: Dict[str, int] = {}
+    recent_limit_changes: List[LLMLimitChange] = []
+
+
+class ResumeCacheStats(BaseModel):
+    memory_hits: int
+    db_hits: int
+    extractions: int
+    hit_rate: float
+    entries: int
+    bytes: int
+    evictions: int
+    documents: int
+
+
+class GradingMemoStats(BaseModel):
+    exact_hits: int
+    near_hits: int
+    misses: int
+    stores: int
+    invalidations: int
+    hit_rate: float
+    entries: int
+
+
+class TheoryGradingStats(BaseModel):
+    local_pass: int
+    local_fail: int
+    escalated: int
+    no_reference: int
+    local_rate: float
+
+
+# ---------- Scoring ----------
+
+
+class ScoringProfileUpdate(BaseModel):
+    weights: Optional[Dict[str, float]] = None
+    thresholds: Optional[Dict[str, float]] = None
+
+
+class ScoringProfileOut(BaseModel):
+    process_id: int
+    version: int
+    weights: Dict[str, float]
+    thresholds: Dict[str, float]
+
+
+class VerdictTransition(BaseModel):
+    from_verdict: str
+    to_verdict: str
+    count: int
+
+
+class ScoreRecomputeReport(BaseModel):
+    process_id: int
+    profile_version: int
+    weights: Dict[str, float]
+    thresholds: Dict[str, float]
+    updated: int
+    changed: int
+    transitions: List[VerdictTransition]
+    duration_ms: float
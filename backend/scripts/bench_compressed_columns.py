@@ -0,0 +1,185 @@
+"""
+DB size, read latency and write latency for the compressed columns
+(resume_documents.text and evaluations.raw_agent_responses) in three
+states: plain legacy rows, zlib after the recompress migration, and zlib
+with a dictionary trained on the stored agent responses.
+
+Runs against a throwaway SQLite database filled with synthetic rows shaped
+like real resumes and agent responses, or against a copy of a real
+database with --db.
+
+Usage (from backend/):
+    python scripts/bench_compressed_columns.py --rows 2000
+    python scripts/bench_compressed_columns.py --db skillpick.db
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=2000)
+parser.add_argument("--db", help="copy this SQLite database and benchmark the copy")
+args = parser.parse_args()
+
+workdir = tempfile.mkdtemp(prefix="skillpick-bench-")
+db_path = os.path.join(workdir, "bench.db")
+if args.db:
+    shutil.copy(args.db, db_path)
+os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+import models  # noqa: E402,F401 - registers every table on Base.metadata
+from database import Base, engine  # noqa: E402
+from services.compression_service import (  # noqa: E402
+    compressed_columns,
+    recompress_columns,
+    train_column_dictionary,
+)
+
+_WORDS = (
+    "python java sql design api service team data pipeline cloud aws docker kubernetes react testing "
+    "performance scalable built led improved reduced latency customers platform migration architecture "
+    "the a of and to in for with on by handles correctly misses edge case complexity readable clear"
+).split()
+
+
+def _sentence(n: int) -> str:
+    return " ".join(random.choices(_WORDS, k=n)).capitalize() + "."
+
+
+def _resume() -> str:
+    return "\n".join(_sentence(random.randint(8, 20)) for _ in range(random.randint(60, 140)))
+
+
+def _agent_json() -> str:
+    per_q = lambda prefix, n: [  # noqa: E731
+        {"question_id": f"{prefix}{i}", "score": random.randint(0, 100), "feedback": _sentence(random.randint(10, 25))}
+        for i in range(1, n + 1)
+    ]
+    return json.dumps(
+        {
+            "code_eval": {"per_question": per_q("code", 3), "total_score": random.randint(0, 100), "summary": _sentence(40)},
+            "code_execution": {
+                f"code{i}": {"passed": 3, "total": 5, "pass_rate": 0.6, "runtime_ms": random.random() * 900, "error": None}
+                for i in range(1, 4)
+            },
+            "theory_eval": {"per_question": per_q("theory", 5), "total_score": random.randint(0, 100), "summary": _sentence(40)},
+            "scoring": {"weights": {"resume": 0.2, "mcq": 0.2, "coding": 0.4, "theory": 0.2}},
+        }
+    )
+
+
+def _fill(rows: int) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO hiring_processes (id, title, description, public_token, num_mcq, num_coding, num_theory, status, llm_share_weight, created_at) VALUES (1, 't', 'd', 'tok', 0, 0, 0, 'ready', 1.0, CURRENT_TIMESTAMP)"))
+    with engine.begin() as conn:
+        for i in range(1, rows + 1):
+            resume, raw = _resume(), _agent_json()
+            conn.execute(
+                text("INSERT INTO resume_documents (id, sha256, text, created_at) VALUES (:i, :h, :t, CURRENT_TIMESTAMP)"),
+                {"i": i, "h": f"bench{i}", "t": resume},
+            )
+            conn.execute(
+                text("INSERT INTO candidates (id, process_id, name, email, resume_document_id, status, created_at) VALUES (:i, 1, 'n', 'e', :i, 'completed', CURRENT_TIMESTAMP)"),
+                {"i": i},
+            )
+            conn.execute(
+                text("INSERT INTO evaluations (id, candidate_id, raw_agent_responses, created_at) VALUES (:i, :i, :r, CURRENT_TIMESTAMP)"),
+                {"i": i, "r": raw},
+            )
+
+
+def _size() -> int:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        conn.execute(text("VACUUM"))
+    return os.path.getsize(db_path)
+
+
+def _avg_bytes() -> str:
+    parts = []
+    with engine.connect() as conn:
+        for table, column in compressed_columns():
+            avg = conn.execute(text(f"SELECT AVG(LENGTH(CAST({column.name} AS BLOB))) FROM {table}")).scalar()
+            parts.append(f"{table}.{column.name}={avg or 0:.0f}B")
+    return "  ".join(parts)
+
+
+def _read_ms() -> float:
+    """Mean time to load and decode one row of each compressed column."""
+    columns = compressed_columns()
+    with engine.connect() as conn:
+        ids = [r[0] for r in conn.execute(text("SELECT id FROM evaluations ORDER BY id")).all()]
+        sample = random.sample(ids, min(500, len(ids)))
+        start = time.perf_counter()
+        for i in sample:
+            for table, column in columns:
+                stored = conn.execute(text(f"SELECT {column.name} FROM {table} WHERE id = :i"), {"i": i}).scalar()
+                column.type.process_result_value(stored, engine.dialect)
+    return (time.perf_counter() - start) * 1000.0 / max(len(sample), 1)
+
+
+def _write_ms(plain: bool = False) -> float:
+    """Mean time to encode and insert one row of each compressed column."""
+    columns = dict((t, c) for t, c in compressed_columns())
+    values = [(_resume(), json.loads(_agent_json())) for _ in range(200)]
+
+    def encode(table, value):
+        if plain:
+            return value if isinstance(value, str) else json.dumps(value)
+        return columns[table].type.process_bind_param(value, engine.dialect)
+
+    with engine.begin() as conn:
+        start = time.perf_counter()
+        for n, (resume, raw) in enumerate(values):
+            conn.execute(
+                text("INSERT INTO resume_documents (sha256, text, created_at) VALUES (:h, :t, CURRENT_TIMESTAMP)"),
+                {"h": f"write{n}", "t": encode("resume_documents", resume)},
+            )
+            conn.execute(
+                text("INSERT INTO evaluations (candidate_id, raw_agent_responses, created_at) VALUES (1, :r, CURRENT_TIMESTAMP)"),
+                {"r": encode("evaluations", raw)},
+            )
+        elapsed = time.perf_counter() - start
+        conn.rollback()
+    return elapsed * 1000.0 / len(values)
+
+
+def main() -> None:
+    random.seed(0)
+    if args.db:
+        # Bring an older copy up to the current tables without recompressing
+        from database import add_missing_columns, move_resume_text_to_documents
+
+        Base.metadata.create_all(engine)
+        add_missing_columns()
+        move_resume_text_to_documents()
+        print(f"Benchmarking a copy of {args.db}")
+    else:
+        _fill(args.rows)
+        print(f"Synthetic database with {args.rows} candidates")
+
+    print(f"{'state':<22}{'db size':>12}{'read ms/row':>14}{'write ms/row':>15}  avg stored size")
+    print(f"{'plain':<22}{_size() / 1e6:>10.2f}MB{_read_ms():>14.3f}{_write_ms(plain=True):>15.3f}  {_avg_bytes()}")
+
+    recompress_columns()
+    print(f"{'zlib':<22}{_size() / 1e6:>10.2f}MB{_read_ms():>14.3f}{_write_ms():>15.3f}  {_avg_bytes()}")
+
+    train_column_dictionary("agent_json")
+    recompress_columns()
+    print(f"{'zlib + agent_json dict':<22}{_size() / 1e6:>10.2f}MB{_read_ms():>14.3f}{_write_ms():>15.3f}  {_avg_bytes()}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
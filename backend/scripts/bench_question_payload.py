@@ -0,0 +1,95 @@
+"""
+Per-request cost of serving a candidate question set: building pydantic
+objects and serializing them (the old register path) versus splicing in the
+payload pre-rendered when the question set was stored.
+
+Usage (from backend/):
+    python scripts/bench_question_payload.py --mcq 25 --coding 3 --theory 5
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from models import QuestionSet  # noqa: E402
+from schemas import CandidateRegisterResponse  # noqa: E402
+from services.process_service import render_candidate_payload, to_question_set_out  # noqa: E402
+from utils.responses import json_with_raw_fields  # noqa: E402
+
+
+def _question_set(num_mcq: int, num_coding: int, num_theory: int) -> QuestionSet:
+    return QuestionSet(
+        mcq_questions=[
+            {
+                "id": f"mcq{i}",
+                "question": f"Which statement about topic {i} is correct? " * 3,
+                "options": [f"Option {k} for question {i}" for k in range(4)],
+                "correct_index": i % 4,
+                "skill": "Python",
+            }
+            for i in range(1, num_mcq + 1)
+        ],
+        coding_questions=[
+            {
+                "id": f"code{i}",
+                "title": f"Problem {i}",
+                "description": "Implement the function described below. " * 20,
+                "difficulty": "medium",
+                "expected_time_minutes": 20,
+                "skill": "Python",
+                "function_name": f"solve_{i}",
+                "test_cases": [{"input": [k, k + 1], "expected": 2 * k + 1} for k in range(5)],
+            }
+            for i in range(1, num_coding + 1)
+        ],
+        theory_questions=[
+            {"id": f"theory{i}", "question": f"Explain concept {i} in detail. " * 4, "skill": "SQL"}
+            for i in range(1, num_theory + 1)
+        ],
+    )
+
+
+def _fields() -> dict:
+    return {
+        "status": "accepted",
+        "candidate_id": 1,
+        "message": "Resume approved! Test unlocked.",
+        "resume_match_score": 72.0,
+        "resume_summary": "Strong backend profile.",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mcq", type=int, default=25)
+    parser.add_argument("--coding", type=int, default=3)
+    parser.add_argument("--theory", type=int, default=5)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    qset = _question_set(args.mcq, args.coding, args.theory)
+    payload = render_candidate_payload(qset)
+
+    def per_request_models() -> bytes:
+        # What FastAPI did per registration: build, validate, encode, dump.
+        response = CandidateRegisterResponse(**_fields(), questions=to_question_set_out(qset))
+        validated = CandidateRegisterResponse.model_validate(response.model_dump())
+        return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+    def pre_rendered() -> bytes:
+        return json_with_raw_fields(_fields(), questions=payload).body
+
+    assert json.loads(pre_rendered())["questions"]["mcq"][0].get("correct_index") is None
+
+    for name, fn in (("pydantic per request", per_request_models), ("pre-rendered", pre_rendered)):
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=3))
+        print(f"{name:>22}: {seconds / args.number * 1e6:8.1f} us/request ({len(fn())} bytes)")
+
+
+if __name__ == "__main__":
+    main()
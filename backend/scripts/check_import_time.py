@@ -0,0 +1,69 @@
+"""
+Cold-start budget check: imports the app under `python -X importtime` in a
+fresh interpreter, prints the slowest modules and fails if the total import
+time exceeds the budget or if a module that should load lazily shows up.
+
+Usage (from backend/):
+    python scripts/check_import_time.py --budget-ms 1200
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy modules that must only load on first use.
+LAZY_MODULES = ("google.generativeai",)
+
+
+def measure(module: str) -> list[tuple[str, int, int]]:
+    """Returns (module, self_us, cumulative_us) for every import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"import {module} failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check app import time against a budget")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1200.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_ms = next(c for name, _, c in rows if name == args.module) / 1000.0
+
+    print(f"Slowest imports (cumulative) for `import {args.module}`:")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[: args.top]:
+        print(f"  {cumulative_us / 1000.0:8.1f} ms  (self {self_us / 1000.0:6.1f} ms)  {name}")
+    print(f"Total: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    eager = sorted({name for name, _, _ in rows for lazy in LAZY_MODULES if name == lazy or name.startswith(lazy + ".")})
+    if eager:
+        failures.append(f"modules expected to load lazily were imported at boot: {', '.join(eager[:5])}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Drive the LLM gate against a local fake Gemini backend whose hidden
+concurrency quota changes mid-run, and check that the adaptive limit
+follows it. For comparison, the same load also runs against a fixed limit
+set to the configured ceiling.
+
+The fake backend answers in --latency-ms while it has no more than --quota
+calls in flight. Above that it slows down, and above quota + 2 it rejects
+calls with ResourceExhausted (HTTP 429), as Gemini does. After
+--seconds / 2 the quota changes to --quota-after.
+
+Usage (from backend/):
+    python scripts/simulate_llm_limiter.py --quota 6 --quota-after 3 --seconds 12
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "16")
+os.environ.setdefault("LLM_ADAPTIVE_COOLDOWN_SECONDS", "0.5")
+
+import gemini_client  # noqa: E402
+from utils import llm_gate  # noqa: E402
+
+
+class ResourceExhausted(Exception):
+    """Same name as google.api_core.exceptions.ResourceExhausted."""
+
+    code = 429
+
+
+class FakeBackend:
+    def __init__(self, quota: int, latency_s: float) -> None:
+        self.quota = quota
+        self.latency_s = latency_s
+        self.in_flight = 0
+        self.ok = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents):
+        with self._lock:
+            self.in_flight += 1
+            load = self.in_flight
+        try:
+            if load > self.quota + 2:
+                time.sleep(self.latency_s * 0.2)
+                with self._lock:
+                    self.throttled += 1
+                raise ResourceExhausted("429 Resource has been exhausted")
+            overload = max(0, load - self.quota)
+            time.sleep(self.latency_s * (1 + overload))
+            with self._lock:
+                self.ok += 1
+            return type("Response", (), {"text": json.dumps({"ok": True})})()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def run(backend: FakeBackend, clients: int, seconds: float, quota_after: int) -> list:
+    stop = time.monotonic() + seconds
+    switch = time.monotonic() + seconds / 2
+    timeline = []
+
+    def client() -> None:
+        while time.monotonic() < stop:
+            try:
+                gemini_client._call_gemini_json("simulated prompt")
+            except ResourceExhausted:
+                pass
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    while time.monotonic() < stop:
+        if time.monotonic() >= switch:
+            backend.quota = quota_after
+        timeline.append((backend.quota, llm_gate.gate.capacity, backend.ok, backend.throttled))
+        time.sleep(0.25)
+    for t in threads:
+        t.join()
+    return timeline
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quota", type=int, default=6)
+    parser.add_argument("--quota-after", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--clients", type=int, default=24)
+    parser.add_argument("--seconds", type=float, default=12.0)
+    args = parser.parse_args()
+
+    gemini_client.logger.disabled = True
+    llm_gate.logger.disabled = True
+    ceiling = llm_gate.gate.capacity if llm_gate.gate.limiter is None else llm_gate.gate.limiter.maximum
+    limiter = llm_gate.gate.limiter
+    if limiter is None:
+        print("LLM_ADAPTIVE_CONCURRENCY is off; nothing to simulate")
+        return 1
+
+    results = {}
+    for mode in ("fixed", "adaptive"):
+        backend = FakeBackend(args.quota, args.latency_ms / 1000.0)
+        gemini_client._get_model = lambda model_name=None, backend=backend: backend
+        if mode == "fixed":
+            llm_gate.gate.capacity = ceiling
+        else:
+            llm_gate.gate.limiter = limiter
+        timeline = run(backend, args.clients, args.seconds, args.quota_after)
+        results[mode] = (backend, timeline)
+
+        print(f"\n{mode} limit (ceiling {ceiling})")
+        print(" t(s)  quota  limit      ok  throttled")
+        for i, (quota, limit, ok, throttled) in enumerate(timeline):
+            if i % 4 == 0:
+                print(f"{i * 0.25:5.1f}  {quota:5d}  {limit:5d}  {ok:6d}  {throttled:9d}")
+        print(f"ok={backend.ok} throttled={backend.throttled}")
+
+    stats = llm_gate.gate.stats()
+    print("\nlimit changes by reason:", stats["limit_changes"])
+
+    fixed, adaptive = results["fixed"][0], results["adaptive"][0]
+    timeline = results["adaptive"][1]
+    # AIMD saws around the quota, so compare phase averages, skipping the
+    # first second of each phase while the limit moves.
+    before = [limit for quota, limit, _, _ in timeline[4 : len(timeline) // 2]]
+    after = [limit for quota, limit, _, _ in timeline[len(timeline) // 2 + 4 :]]
+    mean_before, mean_after = sum(before) / len(before), sum(after) / len(after)
+    print(f"mean limit: {mean_before:.1f} at quota {args.quota}, {mean_after:.1f} at quota {args.quota_after}")
+    checks = {
+        "fewer 429s than the fixed limit": adaptive.throttled < fixed.throttled / 2,
+        "throughput within 25% of the fixed limit": adaptive.ok >= 0.75 * fixed.ok,
+        "limit follows the quota": mean_after < mean_before and mean_after <= args.quota_after + 3,
+    }
+    for name, passed in checks.items():
+        print(("PASS " if passed else "FAIL ") + name)
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
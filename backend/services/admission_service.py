@@ -0,0 +1,66 @@
+import logging
+import math
+
+from fastapi import HTTPException, Request
+
+from config import settings
+from services import shared_state_service
+from utils.llm_gate import gate
+
+logger = logging.getLogger("skillpick.admission")
+
+
+def client_ip(request: Request) -> str:
+    if settings.TRUST_FORWARDED_FOR:
+        # Each trusted proxy appends the address it saw; entries to the left
+        # of theirs come from the client and cannot be trusted
+        hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        depth = max(settings.FORWARDED_FOR_PROXY_HOPS, 1)
+        if len(hops) >= depth:
+            return hops[-depth]
+    return request.client.host if request.client else "unknown"
+
+
+def _enforce(key: str, per_minute: float, burst: float, detail: str) -> None:
+    allowed, retry_after = shared_state_service.take_tokens(
+        f"rate:{key}", rate=per_minute / 60.0, capacity=burst
+    )
+    if not allowed:
+        logger.info("Rate limited %s (retry in %.1fs)", key, retry_after)
+        raise HTTPException(
+            status_code=429,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def limit_registration(request: Request, public_token: str) -> None:
+    """
+    Dependency for the registration route: per-IP and per-link token
+    buckets, then an early shed if the LLM queue is already full.
+    """
+    if settings.RATE_LIMIT_ENABLED:
+        _enforce(
+            f"ip:{client_ip(request)}",
+            settings.RATE_LIMIT_IP_PER_MINUTE,
+            settings.RATE_LIMIT_IP_BURST,
+            "Too many requests from this address. Please try again shortly.",
+        )
+        _enforce(
+            f"link:{public_token}",
+            settings.RATE_LIMIT_LINK_PER_MINUTE,
+            settings.RATE_LIMIT_LINK_BURST,
+            "This assessment link is receiving too many requests. Please try again shortly.",
+        )
+    gate.check_admission()
+
+
+def limit_submission(request: Request) -> None:
+    if settings.RATE_LIMIT_ENABLED:
+        _enforce(
+            f"ip:{client_ip(request)}",
+            settings.RATE_LIMIT_IP_PER_MINUTE,
+            settings.RATE_LIMIT_IP_BURST,
+            "Too many requests from this address. Please try again shortly.",
+        )
+    gate.check_admission()
@@ -6,8 +6,7 @@ from schemas import (
     CandidateRegisterResponse,
     CandidateTestSubmission,
 )
-from utils.pdf_reader import extract_text_from_pdf_bytes
-from gemini_client import resume_agent_match
+from services import process_context_service, resume_document_service, screening_service
 
 logger = logging.getLogger("skillpick.candidate")
 
@@ -22,20 +21,12 @@ def register_candidate_and_screen(
 ) -> CandidateRegisterResponse:
     logger.info("Registering candidate name=%s email=%s process_id=%s", name, email, process.id)
 
-    resume_text = extract_text_from_pdf_bytes(resume_bytes)
+    document = resume_document_service.get_or_extract(db, resume_bytes)
+    resume_text = document.text
     logger.info("Extracted resume text length=%s", len(resume_text))
 
-    jd_analysis_dict = {
-        "skills": process.jd_skills,
-        "role_level": process.jd_role_level,
-        "tech_stack": process.jd_tech_stack,
-        "experience_expectations": process.jd_experience_expectations,
-    }
-
-    resume_result = resume_agent_match(
-        job_description=process.description,
-        jd_analysis=jd_analysis_dict,
-        resume_text=resume_text,
+    resume_result, screening = screening_service.screen_resume(
+        db, process_context_service.get_context(db, process.id), resume_text, document.document_id
     )
 
     match_score = float(resume_result.get("match_score", 0.0))
@@ -50,17 +41,20 @@ def register_candidate_and_screen(
         process_id=process.id,
         name=name,
         email=email,
-        resume_text=resume_text,
+        resume_document_id=document.document_id,
         resume_match_score=match_score,
         resume_skill_overlap=skill_overlap,
         resume_experience_relevance=experience_relevance,
         resume_decision=decision,
         resume_summary=summary,
+        duplicate_of_candidate_id=resume_result.get("duplicate_of_candidate_id"),
+        duplicate_similarity=resume_result.get("duplicate_similarity"),
         status=status if status == "accepted" else "rejected",
     )
     db.add(candidate)
     db.commit()
     db.refresh(candidate)
+    screening_service.attach_candidate(db, screening, candidate.id)
 
     if status == "rejected":
         logger.info("Candidate %s rejected at resume screening.", candidate.id)
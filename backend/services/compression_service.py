@@ -0,0 +1,143 @@
+import logging
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Column, inspect, text
+
+from config import settings
+from database import Base, engine
+from utils.compression import CompressedJSON, CompressedText, registry, serialize_json, train_dictionary
+
+logger = logging.getLogger("skillpick.compression")
+
+
+def compressed_columns() -> List[Tuple[str, Column]]:
+    """(table name, column) for every column declared with a compressed type."""
+    import models  # noqa: F401 - registers every table on Base.metadata
+
+    return [
+        (table.name, column)
+        for table in Base.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, (CompressedText, CompressedJSON))
+    ]
+
+
+def convert_column_types() -> None:
+    """
+    SQLite stores blobs in any column, but on PostgreSQL the TEXT/JSON
+    columns that became compressed have to be turned into BYTEA first.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column in compressed_columns():
+            if not inspector.has_table(table):
+                continue
+            current = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+            if column.name in current and current[column.name].__class__.__name__ != "BYTEA":
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table} ALTER COLUMN {column.name} TYPE BYTEA "
+                        f"USING convert_to({column.name}::text, 'UTF8')"
+                    )
+                )
+                logger.info("Converted %s.%s to BYTEA", table, column.name)
+
+
+def recompress_columns(chunk_size: int | None = None) -> Dict[str, int]:
+    """
+    Rewrite every compressed column in id order, chunk_size rows per
+    transaction: legacy plain values get compressed, and values written with
+    an older dictionary move to the current one. Rows already encoded the
+    current way are left alone, so the run can be interrupted and repeated.
+    Returns the number of rewritten rows per column.
+    """
+    chunk_size = chunk_size or settings.COMPRESSION_CHUNK_SIZE
+    dialect = engine.dialect
+    inspector = inspect(engine)
+    rewritten: Dict[str, int] = {}
+
+    for table, column in compressed_columns():
+        if not inspector.has_table(table):
+            continue
+        key = f"{table}.{column.name}"
+        rewritten[key] = 0
+        start = time.perf_counter()
+        last_id = 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    text(
+                        f"SELECT id, {column.name} FROM {table} "
+                        f"WHERE id > :last AND {column.name} IS NOT NULL ORDER BY id LIMIT :n"
+                    ),
+                    {"last": last_id, "n": chunk_size},
+                ).all()
+                if not rows:
+                    break
+                for row_id, stored in rows:
+                    stored_bytes = stored.encode("utf-8") if isinstance(stored, str) else bytes(stored)
+                    value = column.type.process_result_value(stored, dialect)
+                    encoded = column.type.process_bind_param(value, dialect)
+                    if encoded != stored_bytes:
+                        conn.execute(
+                            text(f"UPDATE {table} SET {column.name} = :v WHERE id = :id"),
+                            {"v": encoded, "id": row_id},
+                        )
+                        rewritten[key] += 1
+                last_id = rows[-1][0]
+        if rewritten[key]:
+            logger.info(
+                "Recompressed %s rows of %s in %.1fs", rewritten[key], key, time.perf_counter() - start
+            )
+    return rewritten
+
+
+def train_column_dictionary(name: str, samples: int = 2000) -> int | None:
+    """
+    Train a new preset dictionary from the newest values of the columns that
+    use dictionary `name`, store it, and return its id. Rows written from
+    now on use it; run recompress_columns() to move existing rows over.
+    """
+    columns = [(t, c) for t, c in compressed_columns() if c.type.dictionary == name]
+    if not columns:
+        raise ValueError(f"No compressed column uses dictionary '{name}'")
+
+    values: List[bytes] = []
+    with engine.connect() as conn:
+        for table, column in columns:
+            rows = conn.execute(
+                text(
+                    f"SELECT {column.name} FROM {table} WHERE {column.name} IS NOT NULL "
+                    f"ORDER BY id DESC LIMIT :n"
+                ),
+                {"n": samples},
+            ).all()
+            for (stored,) in rows:
+                value = column.type.process_result_value(stored, engine.dialect)
+                if isinstance(column.type, CompressedJSON):
+                    values.append(serialize_json(value))
+                else:
+                    values.append(value.encode("utf-8"))
+
+    zdict = train_dictionary(values)
+    if not zdict:
+        logger.warning("No samples to train compression dictionary '%s'", name)
+        return None
+    with engine.begin() as conn:
+        dict_id = conn.execute(
+            text(
+                "INSERT INTO compression_dictionaries (name, data, sample_count, created_at) "
+                "VALUES (:name, :data, :n, CURRENT_TIMESTAMP) RETURNING id"
+            ),
+            {"name": name, "data": zdict, "n": len(values)},
+        ).scalar()
+    registry.reload()
+    logger.info(
+        "Trained compression dictionary '%s' (id %s, %s bytes) from %s samples",
+        name, dict_id, len(zdict), len(values),
+    )
+    return dict_id
+
@@ -1,126 +1,428 @@
 import logging
-from typing import Dict, Any
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Mapping, Tuple
 from sqlalchemy.orm import Session
 
-from models import Candidate, QuestionSet, Evaluation
+from models import Candidate, Evaluation
 from schemas import (
     CandidateTestSubmission,
     EvaluationOut,
 )
+from config import settings
+from services import grading_memo_service, plagiarism_service, scoring_service, shared_state_service, theory_grading_service
+from services import leaderboard_service  # noqa: F401 - keeps the score sketches in sync
+from services import search_service  # noqa: F401 - keeps the candidate search index in sync
+from services.process_context_service import ProcessContext, get_context
+from utils.llm_gate import LLMOverloaded, bind_scope
+from utils.sandbox import run_coding_tests
 from gemini_client import (
     code_evaluation_agent,
     theory_evaluation_agent,
-    summary_agent,
+    code_question_evaluation_agent,
+    theory_question_evaluation_agent,
+    narrative_summary_agent,
 )
 
 logger = logging.getLogger("skillpick.evaluation")
 
 
-def _evaluate_mcq(mcq_questions: list[dict], mcq_answers: Dict[str, int]) -> float:
-    if not mcq_questions:
+def _evaluate_mcq(answer_key: Mapping[str, int], mcq_answers: Dict[str, int]) -> float:
+    if not answer_key:
         return 0.0
-    total = len(mcq_questions)
-    correct = 0
-    for q in mcq_questions:
+    correct = sum(1 for qid, index in answer_key.items() if qid in mcq_answers and mcq_answers[qid] == index)
+    return (correct / len(answer_key)) * 100.0
+
+
+def _strip_test_cases(coding_questions: list[dict]) -> list[dict]:
+    return [{k: v for k, v in q.items() if k != "test_cases"} for q in coding_questions]
+
+
+def _combine_code_scores(
+    coding_questions: list[dict],
+    code_eval_raw: Dict[str, Any],
+    execution: Dict[str, Dict[str, Any]],
+) -> float:
+    """
+    Blend test pass rates with the agent's per-question scores. Questions
+    without test results, or whose tests the sandbox failed to run, keep the
+    agent score. Annotates per_question in place.
+    """
+    if not execution:
+        return float(code_eval_raw.get("total_score", 0.0))
+
+    per_question = {p.get("question_id"): p for p in code_eval_raw.get("per_question", []) or []}
+    weight = settings.CODE_EXEC_WEIGHT
+    scores = []
+    for q in coding_questions:
         qid = q.get("id")
-        if qid in mcq_answers:
-            selected = mcq_answers[qid]
-            if selected == q.get("correct_index"):
-                correct += 1
-    return (correct / total) * 100.0
+        entry = per_question.get(qid)
+        agent_score = None
+        if entry and not entry.get("grading_failed"):
+            agent_score = float(entry.get("score", 0.0))
+        run = execution.get(qid)
+        if run is not None and not run.get("sandbox_failed"):
+            test_score = run["pass_rate"] * 100.0
+            score = test_score if agent_score is None else weight * test_score + (1 - weight) * agent_score
+            if entry is None:
+                entry = {"question_id": qid, "score": score, "feedback": run.get("error") or ""}
+                code_eval_raw.setdefault("per_question", []).append(entry)
+            entry["score"] = score
+            entry["test_pass_rate"] = run["pass_rate"]
+        elif agent_score is None:
+            continue
+        scores.append(entry["score"])
+
+    total = sum(scores) / len(scores) if scores else 0.0
+    code_eval_raw["total_score"] = total
+    return total
+
+
+def _grade_fan_out(
+    jobs: Dict[Tuple[str, str], Callable[[], Dict[str, Any]]],
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Run one grading call per question with bounded concurrency. Only the
+    questions whose reply failed or was malformed are retried; questions that
+    still fail after EVAL_MAX_RETRIES get a zero score flagged grading_failed.
+    A call that cannot get LLM capacity in time raises LLMOverloaded for the
+    whole submission, since that is not a verdict on the answer.
+    """
+    results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    pending = dict(jobs)
+    if not pending:
+        return results
+
+    workers = max(1, min(settings.EVAL_FANOUT_MAX_WORKERS, len(pending)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grader") as pool:
+        for attempt in range(settings.EVAL_MAX_RETRIES + 1):
+            futures = {key: pool.submit(bind_scope(fn)) for key, fn in pending.items()}
+            failed = {}
+            for key, fut in futures.items():
+                try:
+                    raw = fut.result()
+                    score = min(max(float(raw["score"]), 0.0), 100.0)
+                    results[key] = {
+                        "question_id": key[1],
+                        "score": score,
+                        "feedback": str(raw.get("feedback", "")),
+                    }
+                except LLMOverloaded:
+                    for other in futures.values():
+                        other.cancel()
+                    raise
+                except Exception as e:  # noqa: BLE001
+                    logger.warning("Grading %s/%s failed (attempt %s): %s", key[0], key[1], attempt + 1, e)
+                    failed[key] = pending[key]
+            pending = failed
+            if not pending:
+                break
+
+    for key in pending:
+        results[key] = {
+            "question_id": key[1],
+            "score": 0.0,
+            "feedback": "Automatic grading failed for this question.",
+            "grading_failed": True,
+        }
+    return results
+
+
+def _section_result(questions: list[dict], graded: Dict[str, Dict[str, Any]], label: str) -> Dict[str, Any]:
+    per_question = [graded[q.get("id")] for q in questions if q.get("id") in graded]
+    total = sum(p["score"] for p in per_question) / len(per_question) if per_question else 0.0
+    return {
+        "per_question": per_question,
+        "total_score": total,
+        "summary": f"{label}: {len(per_question)} question(s) graded individually.",
+    }
+
+
+def _evaluate_per_question(
+    db: Session,
+    ctx: ProcessContext,
+    submission: CandidateTestSubmission,
+    execution: Dict[str, Dict[str, Any]],
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Grade every coding and theory question as its own agent call, all in one
+    bounded fan-out, and aggregate section totals locally. Answers already
+    graded for the same question are served from the grading memo, and
+    clear theory passes and fails are graded locally.
+    """
+    coding_questions = list(ctx.coding_questions)
+    theory_questions = list(ctx.theory_questions)
+    graded: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    jobs: Dict[Tuple[str, str], Callable[[], Dict[str, Any]]] = {}
+    to_memo: Dict[Tuple[str, str], Tuple[Dict[str, Any], str]] = {}
+
+    for q, q_public in zip(coding_questions, _strip_test_cases(coding_questions)):
+        qid = q.get("id")
+        code = submission.coding_answers.get(qid) or ""
+        if not code.strip():
+            graded[("code", qid)] = {"question_id": qid, "score": 0.0, "feedback": "No answer submitted."}
+            continue
+        memo = grading_memo_service.lookup(db, ctx.question_set_id, "code", q, code)
+        if memo is not None:
+            graded[("code", qid)] = memo
+            continue
+        run = execution.get(qid)
+        run_summary = (
+            {k: run[k] for k in ("passed", "total", "error")} if run and not run.get("sandbox_failed") else None
+        )
+        jobs[("code", qid)] = lambda q=q_public, code=code, run_summary=run_summary: code_question_evaluation_agent(
+            q, code, run_summary
+        )
+        to_memo[("code", qid)] = (q, code)
+
+    for q in theory_questions:
+        qid = q.get("id")
+        answer = submission.theory_answers.get(qid) or ""
+        if not answer.strip():
+            graded[("theory", qid)] = {"question_id": qid, "score": 0.0, "feedback": "No answer submitted."}
+            continue
+        memo = grading_memo_service.lookup(db, ctx.question_set_id, "theory", q, answer)
+        if memo is not None:
+            graded[("theory", qid)] = memo
+            continue
+        local = theory_grading_service.grade_or_escalate(q, answer)
+        if local is not None:
+            graded[("theory", qid)] = local
+            continue
+        jobs[("theory", qid)] = lambda q=q, answer=answer: theory_question_evaluation_agent(q, answer)
+        to_memo[("theory", qid)] = (q, answer)
+
+    fresh = _grade_fan_out(jobs)
+    for key, result in fresh.items():
+        q, answer = to_memo[key]
+        grading_memo_service.store(db, ctx.question_set_id, key[0], q, answer, result)
+    grading_memo_service.flush_hits(db)
+    graded.update(fresh)
+
+    code_graded = {qid: r for (section, qid), r in graded.items() if section == "code"}
+    theory_graded = {qid: r for (section, qid), r in graded.items() if section == "theory"}
+    return (
+        _section_result(coding_questions, code_graded, "Coding"),
+        _section_result(theory_questions, theory_graded, "Theory"),
+    )
+
+
+def _evaluate_theory_batch(theory_questions: list[dict], answers: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Batch-mode theory grading: clear passes and fails are graded locally and
+    only the remaining answers go to the agent, in one prompt.
+    """
+    local: Dict[str, Dict[str, Any]] = {}
+    for q in theory_questions:
+        answer = answers.get(q.get("id")) or ""
+        if answer.strip():
+            result = theory_grading_service.grade_or_escalate(q, answer)
+            if result is not None:
+                local[q.get("id")] = result
+    if not local:
+        return theory_evaluation_agent(theory_questions=theory_questions, candidate_theory_answers=answers)
+
+    remaining = [q for q in theory_questions if q.get("id") not in local]
+    raw: Dict[str, Any] = {}
+    if remaining:
+        raw = theory_evaluation_agent(
+            theory_questions=remaining,
+            candidate_theory_answers={q.get("id"): answers.get(q.get("id"), "") for q in remaining},
+        )
+    graded = {
+        p.get("question_id"): {**p, "score": float(p.get("score", 0.0))}
+        for p in raw.get("per_question", []) or []
+        if isinstance(p, dict)
+    }
+    # Questions the reply does not score individually take its section total
+    for q in remaining:
+        graded.setdefault(
+            q.get("id"),
+            {"question_id": q.get("id"), "score": float(raw.get("total_score", 0.0)), "feedback": ""},
+        )
+    graded.update(local)
+    result = _section_result(theory_questions, graded, "Theory")
+    if raw.get("summary"):
+        result["summary"] = raw["summary"]
+    return result
 
 
 def evaluate_candidate(
     db: Session,
     candidate: Candidate,
-    question_set: QuestionSet,
+    ctx: ProcessContext,
     submission: CandidateTestSubmission,
 ) -> EvaluationOut:
     logger.info("Evaluating candidate_id=%s", candidate.id)
 
-    mcq_questions = question_set.mcq_questions or []
-    coding_questions = question_set.coding_questions or []
-    theory_questions = question_set.theory_questions or []
+    coding_questions = list(ctx.coding_questions)
+    theory_questions = list(ctx.theory_questions)
 
     # MCQ evaluation
-    mcq_score = _evaluate_mcq(mcq_questions, submission.mcq_answers)
+    mcq_score = _evaluate_mcq(ctx.answer_key, submission.mcq_answers)
     logger.info("MCQ score for candidate_id=%s: %.2f", candidate.id, mcq_score)
 
-    # Code evaluation via agent
-    code_eval_raw: Dict[str, Any] = code_evaluation_agent(
-        coding_questions=coding_questions,
-        candidate_code_answers=submission.coding_answers,
-    )
-    coding_score = float(code_eval_raw.get("total_score", 0.0))
+    # Code evaluation: correctness from local test runs, style from the agent
+    execution: Dict[str, Dict[str, Any]] = {}
+    if settings.CODE_EXEC_ENABLED:
+        execution = run_coding_tests(coding_questions, submission.coding_answers)
 
-    # Theory evaluation via agent
-    theory_eval_raw: Dict[str, Any] = theory_evaluation_agent(
-        theory_questions=theory_questions,
-        candidate_theory_answers=submission.theory_answers,
+    # Closest answers from other candidates, per coding question
+    plagiarism = plagiarism_service.index_submission(
+        db, ctx.question_set_id, candidate.id, submission.coding_answers
     )
-    theory_score = float(theory_eval_raw.get("total_score", 0.0))
 
-    # Summary agent
-    jd_analysis_dict = {
-        "skills": candidate.process.jd_skills,
-        "role_level": candidate.process.jd_role_level,
-        "tech_stack": candidate.process.jd_tech_stack,
-        "experience_expectations": candidate.process.jd_experience_expectations,
-    }
-    resume_result = {
-        "match_score": candidate.resume_match_score,
-        "skill_overlap": candidate.resume_skill_overlap,
-        "experience_relevance": candidate.resume_experience_relevance,
-        "summary": candidate.resume_summary,
-        "decision": candidate.resume_decision,
-    }
+    if settings.EVAL_MODE == "per_question":
+        code_eval_raw, theory_eval_raw = _evaluate_per_question(
+            db, ctx, submission, execution
+        )
+    else:
+        code_eval_raw = code_evaluation_agent(
+            coding_questions=_strip_test_cases(coding_questions),
+            candidate_code_answers=submission.coding_answers,
+            execution_results={
+                qid: {k: r[k] for k in ("passed", "total", "error")}
+                for qid, r in execution.items()
+                if not r.get("sandbox_failed")
+            },
+        )
+        # Theory evaluation via agent, for answers not graded locally
+        theory_eval_raw = _evaluate_theory_batch(theory_questions, submission.theory_answers)
 
-    summary_raw: Dict[str, Any] = summary_agent(
-        jd_analysis=jd_analysis_dict,
-        resume_result=resume_result,
-        mcq_score=mcq_score,
-        code_eval_result=code_eval_raw,
-        theory_eval_result=TheoryEvalShim(theory_eval_raw),
-    )
+    coding_score = _combine_code_scores(coding_questions, code_eval_raw, execution)
+    theory_score = float(theory_eval_raw.get("total_score", 0.0))
 
-    overall_score = float(summary_raw.get("overall_score", 0.0))
-    strengths = summary_raw.get("strengths", []) or []
-    weaknesses = summary_raw.get("weaknesses", []) or []
-    verdict = summary_raw.get("verdict", "borderline")
-    explanation = summary_raw.get("explanation", "")
+    # Overall score and verdict are computed locally; the written summary
+    # is generated later (first result view or narrative backfill).
+    section_scores = {
+        "resume": candidate.resume_match_score or 0.0,
+        "mcq": mcq_score,
+        "coding": coding_score,
+        "theory": theory_score,
+    }
+    scored = scoring_service.score_candidate(section_scores, ctx.weights, ctx.thresholds)
 
     eval_obj = Evaluation(
         candidate_id=candidate.id,
+        process_id=candidate.process_id,
         mcq_score=mcq_score,
         coding_score=coding_score,
         theory_score=theory_score,
         resume_match_score=candidate.resume_match_score or 0.0,
-        overall_score=overall_score,
-        strengths=strengths,
-        weaknesses=weaknesses,
-        final_verdict=verdict,
-        summary=explanation,
+        overall_score=scored["overall_score"],
+        final_verdict=scored["verdict"],
         raw_agent_responses={
             "code_eval": code_eval_raw,
+            "code_execution": execution,
             "theory_eval": theory_eval_raw,
-            "summary": summary_raw,
+            "scoring": {"weights": scored["weights"]},
+            "plagiarism": plagiarism,
         },
     )
     db.add(eval_obj)
     db.commit()
     db.refresh(eval_obj)
 
+    return to_evaluation_out(eval_obj)
+
+
+def to_evaluation_out(evaluation: Evaluation) -> EvaluationOut:
     return EvaluationOut(
-        mcq_score=mcq_score,
-        coding_score=coding_score,
-        theory_score=theory_score,
-        resume_match_score=eval_obj.resume_match_score,
-        overall_score=eval_obj.overall_score,
-        strengths=strengths,
-        weaknesses=weaknesses,
-        final_verdict=verdict,
-        summary=explanation,
+        mcq_score=evaluation.mcq_score or 0.0,
+        coding_score=evaluation.coding_score or 0.0,
+        theory_score=evaluation.theory_score or 0.0,
+        resume_match_score=evaluation.resume_match_score or 0.0,
+        overall_score=evaluation.overall_score or 0.0,
+        strengths=evaluation.strengths or [],
+        weaknesses=evaluation.weaknesses or [],
+        final_verdict=evaluation.final_verdict or "",
+        summary=evaluation.summary or "",
+        narrative_ready=evaluation.summary is not None,
+    )
+
+
+def ensure_narrative(db: Session, evaluation: Evaluation) -> Evaluation:
+    """
+    Generate strengths/weaknesses/explanation for an evaluation that does not
+    have them yet. Failures are logged and leave the evaluation untouched so
+    a later view or backfill can try again. Only one request generates a
+    given narrative at a time; concurrent ones get the pending evaluation.
+    """
+    if evaluation.summary is not None:
+        return evaluation
+
+    claim_key = f"narrative:{evaluation.id}"
+    owner = f"{os.getpid()}:{threading.get_ident()}"
+    if not shared_state_service.claim(claim_key, owner, settings.NARRATIVE_CLAIM_TTL_SECONDS):
+        return evaluation
+    try:
+        # The previous holder may have finished between our read and the claim
+        db.refresh(evaluation)
+        if evaluation.summary is not None:
+            return evaluation
+        return _generate_narrative(db, evaluation)
+    finally:
+        shared_state_service.release(claim_key, owner)
+
+
+def _generate_narrative(db: Session, evaluation: Evaluation) -> Evaluation:
+    candidate = evaluation.candidate
+    ctx = get_context(db, candidate.process_id)
+    raw = evaluation.raw_agent_responses or {}
+    resume_result = {
+        "match_score": candidate.resume_match_score,
+        "skill_overlap": candidate.resume_skill_overlap,
+        "experience_relevance": candidate.resume_experience_relevance,
+        "summary": candidate.resume_summary,
+        "decision": candidate.resume_decision,
+    }
+
+    try:
+        narrative: Dict[str, Any] = narrative_summary_agent(
+            jd_analysis=dict(ctx.jd_analysis),
+            resume_result=resume_result,
+            section_scores={
+                "resume": evaluation.resume_match_score or 0.0,
+                "mcq": evaluation.mcq_score or 0.0,
+                "coding": evaluation.coding_score or 0.0,
+                "theory": evaluation.theory_score or 0.0,
+            },
+            overall_score=evaluation.overall_score or 0.0,
+            verdict=evaluation.final_verdict or "borderline",
+            code_eval_result=raw.get("code_eval", {}),
+            theory_eval_result=TheoryEvalShim(raw.get("theory_eval", {})),
+        )
+    except Exception as e:  # noqa: BLE001
+        logger.error("Narrative generation failed for candidate_id=%s: %s", candidate.id, e)
+        return evaluation
+
+    evaluation.strengths = narrative.get("strengths", []) or []
+    evaluation.weaknesses = narrative.get("weaknesses", []) or []
+    evaluation.summary = narrative.get("explanation", "") or ""
+    evaluation.raw_agent_responses = {**raw, "summary": narrative}
+    db.commit()
+    logger.info("Narrative generated for candidate_id=%s", candidate.id)
+    return evaluation
+
+
+def generate_pending_narratives(db: Session, limit: int = 100) -> int:
+    """
+    Off-peak batch: fill in narratives for evaluations still missing one.
+    """
+    pending = (
+        db.query(Evaluation)
+        .filter(Evaluation.summary.is_(None))
+        .order_by(Evaluation.id)
+        .limit(limit)
+        .all()
     )
+    done = 0
+    for evaluation in pending:
+        if ensure_narrative(db, evaluation).summary is not None:
+            done += 1
+    logger.info("Generated %s of %s pending narratives", done, len(pending))
+    return done
 
 
 def TheoryEvalShim(raw: Dict[str, Any]) -> Dict[str, Any]:
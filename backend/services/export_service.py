@@ -0,0 +1,165 @@
+import csv
+import io
+import logging
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Sequence
+
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from config import settings
+from database import SessionLocal
+from models import Candidate, Evaluation
+
+logger = logging.getLogger("skillpick.export")
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+
+def _per_question(raw: Dict[str, Any] | None) -> List[Dict[str, Any]]:
+    """Per-question scores and feedback from the stored grading responses."""
+    raw = raw or {}
+    execution = raw.get("code_execution") or {}
+    similar = raw.get("plagiarism") or {}
+    items = []
+    for section in ("code_eval", "theory_eval"):
+        for q in (raw.get(section) or {}).get("per_question") or []:
+            item = {
+                "question_id": q.get("question_id"),
+                "score": q.get("score"),
+                "feedback": q.get("feedback"),
+            }
+            run = execution.get(q.get("question_id"))
+            if run:
+                item["tests_passed"] = run.get("passed")
+                item["tests_total"] = run.get("total")
+            if q.get("question_id") in similar:
+                item["similar_answers"] = [
+                    {"candidate_id": m["candidate_id"], "similarity": m["similarity"]} for m in similar[q["question_id"]]
+                ]
+            items.append(item)
+    return items
+
+
+# Export column -> (source columns it needs, value from a result row)
+_COLUMNS: Dict[str, tuple] = {
+    "candidate_id": ((Candidate.id,), lambda r: r.id),
+    "name": ((Candidate.name,), lambda r: r.name),
+    "email": ((Candidate.email,), lambda r: r.email),
+    "status": ((Candidate.status,), lambda r: r.status),
+    "registered_at": ((Candidate.created_at,), lambda r: r.created_at.isoformat() if r.created_at else None),
+    "resume_match_score": ((Candidate.resume_match_score,), lambda r: r.resume_match_score),
+    "resume_decision": ((Candidate.resume_decision,), lambda r: r.resume_decision),
+    "resume_summary": ((Candidate.resume_summary,), lambda r: r.resume_summary),
+    "mcq_score": ((Evaluation.mcq_score,), lambda r: r.mcq_score),
+    "coding_score": ((Evaluation.coding_score,), lambda r: r.coding_score),
+    "theory_score": ((Evaluation.theory_score,), lambda r: r.theory_score),
+    "overall_score": ((Evaluation.overall_score,), lambda r: r.overall_score),
+    "final_verdict": ((Evaluation.final_verdict,), lambda r: r.final_verdict),
+    "strengths": ((Evaluation.strengths,), lambda r: r.strengths),
+    "weaknesses": ((Evaluation.weaknesses,), lambda r: r.weaknesses),
+    "summary": ((Evaluation.summary,), lambda r: r.summary),
+    "question_feedback": ((Evaluation.raw_agent_responses,), lambda r: _per_question(r.raw_agent_responses)),
+}
+
+EXPORT_COLUMNS = tuple(_COLUMNS)
+DEFAULT_EXPORT_COLUMNS = tuple(c for c in EXPORT_COLUMNS if c not in ("resume_summary", "summary"))
+
+
+def parse_columns(columns: str | None) -> List[str]:
+    """
+    Validate a comma-separated column selection; None means the defaults.
+    Raises ValueError naming any unknown column.
+    """
+    if not columns:
+        return list(DEFAULT_EXPORT_COLUMNS)
+    picked = list(dict.fromkeys(c.strip() for c in columns.split(",") if c.strip()))
+    unknown = [c for c in picked if c not in _COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    return picked
+
+
+def _rows(process_id: int, columns: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Candidates of a process joined with their latest evaluation, in id order,
+    fetched EXPORT_BATCH_SIZE rows at a time (a server-side cursor on
+    PostgreSQL) so memory stays flat however many rows there are. Only the
+    selected columns are loaded; question_feedback is the only one that
+    needs the compressed raw responses.
+    """
+    sources = [Candidate.id]
+    for name in columns:
+        sources.extend(s for s in _COLUMNS[name][0] if s not in sources)
+    extractors: List[tuple[str, Callable]] = [(name, _COLUMNS[name][1]) for name in columns]
+
+    # A resubmission leaves several evaluations; export only the latest
+    other = aliased(Evaluation)
+    latest = select(func.max(other.id)).where(other.candidate_id == Candidate.id).scalar_subquery()
+    stmt = (
+        select(*sources)
+        .outerjoin(Evaluation, Evaluation.id == latest)
+        .where(Candidate.process_id == process_id)
+        .order_by(Candidate.id)
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+    # A session of its own: the response body is produced after the
+    # request's session has been closed.
+    db = SessionLocal()
+    try:
+        for row in db.execute(stmt):
+            yield {name: extract(row) for name, extract in extractors}
+    finally:
+        db.close()
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value).decode("utf-8")
+    return value
+
+
+def _encode_csv(rows: Iterator[Dict[str, Any]], columns: Sequence[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(row[c]) for c in columns])
+        if buffer.tell() >= settings.EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    chunk = bytearray()
+    for row in rows:
+        chunk += orjson.dumps(row)
+        chunk += b"\n"
+        if len(chunk) >= settings.EXPORT_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    yield bytes(chunk)
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def stream_export(process_id: int, fmt: str, columns: Sequence[str], gzip: bool = False) -> Iterator[bytes]:
+    """
+    Encoded export body as a stream of byte chunks of roughly
+    EXPORT_CHUNK_BYTES. Nested values (strengths, question_feedback) stay
+    structured in NDJSON and are JSON-encoded strings in CSV.
+    """
+    rows = _rows(process_id, columns)
+    body = _encode_csv(rows, columns) if fmt == "csv" else _encode_ndjson(rows)
+    logger.info("Exporting process_id=%s as %s%s (%s columns)", process_id, fmt, "+gzip" if gzip else "", len(columns))
+    return _gzip(body) if gzip else body
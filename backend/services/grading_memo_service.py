@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import bindparam, event, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import GradingMemo, QuestionSet
+from utils.shingles import hamming64, normalize_text, simhash64, split_bands
+
+logger = logging.getLogger("skillpick.grading_memo")
+
+_stats_lock = threading.Lock()
+_stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+# Memo row id -> hits not yet written; lookups stay read-only
+_pending_hits: Dict[int, int] = {}
+
+_memo = GradingMemo.__table__
+
+
+def _bump(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+def question_hash(question: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(question, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def normalize_answer(section: str, answer: str) -> str:
+    if section == "code":
+        # Whitespace-only edits do not change what the code does.
+        lines = [line.rstrip() for line in (answer or "").strip().splitlines()]
+        return "\n".join(line for line in lines if line)
+    return normalize_text(answer)
+
+
+def _answer_hash(section: str, answer: str) -> str:
+    return hashlib.sha256(normalize_answer(section, answer).encode("utf-8")).hexdigest()
+
+
+def lookup(
+    db: Session,
+    question_set_id: int,
+    section: str,
+    question: Dict[str, Any],
+    answer: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Return a stored grading for this answer, or None. Exact match on the
+    normalized answer first; for theory answers, optionally fall back to a
+    simhash near-duplicate within GRADING_MEMO_NEAR_DUP_MAX_BITS bits.
+    """
+    if not settings.GRADING_MEMO_ENABLED:
+        return None
+
+    qid = question.get("id")
+    q_hash = question_hash(question)
+    base = db.query(GradingMemo).filter(
+        GradingMemo.question_set_id == question_set_id,
+        GradingMemo.question_id == qid,
+        GradingMemo.question_hash == q_hash,
+    )
+
+    row = base.filter(GradingMemo.answer_hash == _answer_hash(section, answer)).first()
+    tier = "exact"
+    if row is None and section == "theory" and settings.GRADING_MEMO_NEAR_DUP:
+        # With 4 bands and <= 3 differing bits, at least one band matches exactly.
+        sig = simhash64(answer)
+        b0, b1, b2, b3 = split_bands(sig)
+        near = base.filter(
+            or_(
+                GradingMemo.simhash_b0 == b0,
+                GradingMemo.simhash_b1 == b1,
+                GradingMemo.simhash_b2 == b2,
+                GradingMemo.simhash_b3 == b3,
+            )
+        ).all()
+        best = None
+        for cand in near:
+            cand_sig = (
+                cand.simhash_b0 | (cand.simhash_b1 << 16) | (cand.simhash_b2 << 32) | (cand.simhash_b3 << 48)
+            )
+            dist = hamming64(sig, cand_sig)
+            if dist <= settings.GRADING_MEMO_NEAR_DUP_MAX_BITS and (best is None or dist < best[0]):
+                best = (dist, cand)
+        if best is not None:
+            row = best[1]
+            tier = "near"
+
+    if row is None:
+        _bump("misses")
+        return None
+
+    with _stats_lock:
+        _pending_hits[row.id] = _pending_hits.get(row.id, 0) + 1
+    _bump("exact_hits" if tier == "exact" else "near_hits")
+    return {"question_id": qid, "score": row.score, "feedback": row.feedback or "", "memo": tier}
+
+
+def store(
+    db: Session,
+    question_set_id: int,
+    section: str,
+    question: Dict[str, Any],
+    answer: str,
+    result: Dict[str, Any],
+) -> None:
+    if not settings.GRADING_MEMO_ENABLED or result.get("grading_failed"):
+        return
+    bands = split_bands(simhash64(answer)) if section == "theory" else [None] * 4
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    # Two submissions with the same answer may be graded concurrently; the
+    # first grading stored wins and the other is dropped
+    stored = db.execute(
+        insert(_memo)
+        .values(
+            question_set_id=question_set_id,
+            question_id=question.get("id"),
+            question_hash=question_hash(question),
+            answer_hash=_answer_hash(section, answer),
+            simhash_b0=bands[0],
+            simhash_b1=bands[1],
+            simhash_b2=bands[2],
+            simhash_b3=bands[3],
+            score=result["score"],
+            feedback=result.get("feedback", ""),
+        )
+        .on_conflict_do_nothing(index_elements=[_memo.c.question_set_id, _memo.c.question_id, _memo.c.answer_hash])
+    ).rowcount
+    db.commit()
+    if stored:
+        _bump("stores")
+
+
+def flush_hits(db: Session) -> int:
+    """Write the hit counts recorded by lookup() since the last flush, in one statement."""
+    with _stats_lock:
+        pending = list(_pending_hits.items())
+        _pending_hits.clear()
+    if not pending:
+        return 0
+    db.execute(
+        _memo.update().where(_memo.c.id == bindparam("memo_id")).values(hits=_memo.c.hits + bindparam("n")),
+        [{"memo_id": memo_id, "n": n} for memo_id, n in pending],
+    )
+    db.commit()
+    return len(pending)
+
+
+def invalidate_question_set(db: Session, question_set_id: int) -> int:
+    deleted = db.query(GradingMemo).filter(GradingMemo.question_set_id == question_set_id).delete()
+    db.commit()
+    _bump("invalidations", deleted)
+    return deleted
+
+
+@event.listens_for(QuestionSet, "after_update")
+@event.listens_for(QuestionSet, "after_delete")
+def _invalidate_on_question_set_change(mapper, connection, target) -> None:
+    result = connection.execute(
+        GradingMemo.__table__.delete().where(GradingMemo.question_set_id == target.id)
+    )
+    _bump("invalidations", result.rowcount or 0)
+    logger.info("Invalidated grading memo for question_set_id=%s", target.id)
+
+
+def get_memo_stats(db: Session) -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["exact_hits"] + stats["near_hits"]) / lookups if lookups else 0.0
+    stats["entries"] = db.query(GradingMemo).count()
+    return stats
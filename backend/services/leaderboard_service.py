@@ -0,0 +1,235 @@
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+from models import Candidate, Evaluation, ScoreSketch
+from utils.tdigest import TDigest
+
+logger = logging.getLogger("skillpick.leaderboard")
+
+# Sketched score per section name
+SECTIONS = {
+    "overall": Evaluation.overall_score,
+    "resume": Evaluation.resume_match_score,
+    "mcq": Evaluation.mcq_score,
+    "coding": Evaluation.coding_score,
+    "theory": Evaluation.theory_score,
+}
+DISTRIBUTION_QUANTILES = {"p25": 0.25, "p50": 0.5, "p75": 0.75, "p90": 0.9}
+
+_sketches = ScoreSketch.__table__
+_evaluations = Evaluation.__table__
+
+
+def _insert(conn: Connection):
+    return postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+
+
+def _add_to_sketches(conn: Connection, process_id: int, scores: Dict[str, Optional[float]]) -> None:
+    """Add one evaluation's scores to the process's sketches, in conn's transaction."""
+    now = datetime.utcnow()
+    for section, value in scores.items():
+        if value is None:
+            continue
+        # Creates the row if missing; on SQLite this also takes the write lock
+        # so the read-modify-write below cannot interleave with another worker
+        empty = TDigest(settings.SCORE_SKETCH_COMPRESSION).to_bytes()
+        conn.execute(
+            _insert(conn)(_sketches)
+            .values(process_id=process_id, section=section, count=0, digest=empty, updated_at=now)
+            .on_conflict_do_nothing(index_elements=[_sketches.c.process_id, _sketches.c.section])
+        )
+        row = conn.execute(
+            select(_sketches.c.id, _sketches.c.digest)
+            .where(_sketches.c.process_id == process_id, _sketches.c.section == section)
+            .with_for_update()
+        ).one()
+        digest = TDigest.from_bytes(row.digest)
+        digest.add(value)
+        conn.execute(
+            _sketches.update()
+            .where(_sketches.c.id == row.id)
+            .values(count=digest.count, digest=digest.to_bytes(), updated_at=now)
+        )
+
+
+def rebuild_sketches(conn: Connection, process_id: int) -> int:
+    """
+    Recompute a process's sketches from its current evaluations, e.g. after
+    rescoring. Returns the number of evaluations read.
+    """
+    digests = {section: TDigest(settings.SCORE_SKETCH_COMPRESSION) for section in SECTIONS}
+    rows = conn.execute(
+        select(*SECTIONS.values()).where(Evaluation.process_id == process_id)
+    )
+    total = 0
+    for row in rows:
+        total += 1
+        for section, value in zip(SECTIONS, row):
+            if value is not None:
+                digests[section].add(value)
+    now = datetime.utcnow()
+    conn.execute(_sketches.delete().where(_sketches.c.process_id == process_id))
+    fresh = [
+        {"process_id": process_id, "section": s, "count": d.count, "digest": d.to_bytes(), "updated_at": now}
+        for s, d in digests.items()
+        if d.count
+    ]
+    if fresh:
+        conn.execute(_sketches.insert(), fresh)
+    return total
+
+
+@event.listens_for(Evaluation, "after_insert")
+def _record_evaluation(mapper, connection, target) -> None:
+    if target.process_id is None:
+        return
+    superseded = connection.execute(
+        _evaluations.update()
+        .where(
+            _evaluations.c.candidate_id == target.candidate_id,
+            _evaluations.c.id != target.id,
+            _evaluations.c.process_id.isnot(None),
+        )
+        .values(process_id=None)
+    ).rowcount
+    if superseded:
+        # A digest cannot forget the earlier scores; resubmissions are rare
+        rebuild_sketches(connection, target.process_id)
+    else:
+        _add_to_sketches(
+            connection,
+            target.process_id,
+            {section: getattr(target, column.key) for section, column in SECTIONS.items()},
+        )
+
+
+def index_missing_evaluations() -> int:
+    """
+    Set process_id on each candidate's latest evaluation where it predates
+    the column, and build sketches for processes that have none. Returns the
+    number of processes sketched.
+    """
+    start = time.perf_counter()
+    latest = select(func.max(_evaluations.c.id)).group_by(_evaluations.c.candidate_id)
+    with engine.begin() as conn:
+        conn.execute(
+            _evaluations.update()
+            .where(_evaluations.c.process_id.is_(None), _evaluations.c.id.in_(latest))
+            .values(
+                process_id=select(Candidate.process_id)
+                .where(Candidate.id == _evaluations.c.candidate_id)
+                .scalar_subquery()
+            )
+        )
+        sketched = select(_sketches.c.process_id).distinct()
+        missing = [
+            row[0]
+            for row in conn.execute(
+                select(_evaluations.c.process_id)
+                .where(_evaluations.c.process_id.isnot(None), _evaluations.c.process_id.notin_(sketched))
+                .distinct()
+            )
+        ]
+        for process_id in missing:
+            rebuild_sketches(conn, process_id)
+    if missing:
+        logger.info(
+            "Built score sketches for %s processes in %.1fs", len(missing), time.perf_counter() - start
+        )
+    return len(missing)
+
+
+def load_sketches(db: Session, process_id: int) -> Dict[str, TDigest]:
+    return {
+        section: TDigest.from_bytes(digest)
+        for section, digest in db.query(ScoreSketch.section, ScoreSketch.digest).filter(
+            ScoreSketch.process_id == process_id
+        )
+    }
+
+
+def percentiles(sketches: Dict[str, TDigest], scores: Dict[str, Optional[float]]) -> Dict[str, float]:
+    """Percentile (0-100, mid-rank) of each score within its section's sketch."""
+    out = {}
+    for section, value in scores.items():
+        sketch = sketches.get(section)
+        if value is not None and sketch is not None and sketch.count:
+            out[section] = round(100.0 * sketch.cdf(value), 1)
+    return out
+
+
+def get_leaderboard(db: Session, process_id: int, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+    """
+    Top candidates of a process by overall score, read in index order, with
+    each one's section percentiles from the process's sketches.
+    """
+    rows = (
+        db.query(Evaluation.candidate_id, Candidate.name, Candidate.email, Evaluation.final_verdict, *SECTIONS.values())
+        .join(Candidate, Candidate.id == Evaluation.candidate_id)
+        .filter(Evaluation.process_id == process_id, Evaluation.overall_score.isnot(None))
+        .order_by(Evaluation.overall_score.desc(), Evaluation.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    sketches = load_sketches(db, process_id)
+    entries = []
+    for rank, (candidate_id, name, email, verdict, *values) in enumerate(rows, start=offset + 1):
+        scores = dict(zip(SECTIONS, values))
+        entries.append(
+            {
+                "rank": rank,
+                "candidate_id": candidate_id,
+                "name": name,
+                "email": email,
+                "final_verdict": verdict or "",
+                "overall_score": scores["overall"],
+                "resume_match_score": scores["resume"] or 0.0,
+                "mcq_score": scores["mcq"] or 0.0,
+                "coding_score": scores["coding"] or 0.0,
+                "theory_score": scores["theory"] or 0.0,
+                "percentiles": percentiles(sketches, scores),
+            }
+        )
+    overall = sketches.get("overall")
+    return {
+        "process_id": process_id,
+        "evaluated": overall.count if overall is not None else 0,
+        "entries": entries,
+        "distribution": {
+            section: {"count": sketch.count, **{k: sketch.quantile(q) for k, q in DISTRIBUTION_QUANTILES.items()}}
+            for section, sketch in sketches.items()
+            if sketch.count
+        },
+    }
+
+
+def get_candidate_percentiles(db: Session, candidate_id: int) -> Optional[Dict[str, Any]]:
+    """Section percentiles of a candidate's current evaluation, or None if not evaluated."""
+    row = (
+        db.query(Evaluation.process_id, *SECTIONS.values())
+        .filter(Evaluation.candidate_id == candidate_id, Evaluation.process_id.isnot(None))
+        .first()
+    )
+    if row is None:
+        return None
+    process_id, *values = row
+    scores = dict(zip(SECTIONS, values))
+    sketches = load_sketches(db, process_id)
+    overall = sketches.get("overall")
+    return {
+        "candidate_id": candidate_id,
+        "process_id": process_id,
+        "evaluated": overall.count if overall is not None else 0,
+        "overall_score": scores["overall"] or 0.0,
+        "percentiles": percentiles(sketches, scores),
+    }
@@ -0,0 +1,282 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import Candidate, CandidateResponse, CodeFingerprint, CodeFingerprintSet, CodeSimilarity, QuestionSet
+from utils.winnowing import fingerprint_code
+
+logger = logging.getLogger("skillpick.plagiarism")
+
+
+def _fingerprints(code: str) -> set[int]:
+    return fingerprint_code(code, settings.PLAGIARISM_KGRAM, settings.PLAGIARISM_WINDOW)
+
+
+def _store_set(db: Session, question_set_id: int, question_id: str, candidate_id: int, hashes: set[int]) -> CodeFingerprintSet:
+    """Replace the candidate's fingerprints and similarity pairs for this question."""
+    old = (
+        db.query(CodeFingerprintSet)
+        .filter(
+            CodeFingerprintSet.question_set_id == question_set_id,
+            CodeFingerprintSet.question_id == question_id,
+            CodeFingerprintSet.candidate_id == candidate_id,
+        )
+        .first()
+    )
+    if old is not None:
+        db.query(CodeFingerprint).filter(CodeFingerprint.set_id == old.id).delete()
+        db.delete(old)
+    db.query(CodeSimilarity).filter(
+        CodeSimilarity.question_set_id == question_set_id,
+        CodeSimilarity.question_id == question_id,
+        or_(CodeSimilarity.candidate_id == candidate_id, CodeSimilarity.other_candidate_id == candidate_id),
+    ).delete(synchronize_session=False)
+    db.flush()
+
+    fp_set = CodeFingerprintSet(
+        question_set_id=question_set_id, question_id=question_id, candidate_id=candidate_id, size=len(hashes)
+    )
+    db.add(fp_set)
+    db.flush()
+    if hashes:
+        db.execute(
+            CodeFingerprint.__table__.insert(),
+            [
+                {"set_id": fp_set.id, "question_set_id": question_set_id, "question_id": question_id, "hash": h}
+                for h in hashes
+            ],
+        )
+    return fp_set
+
+
+def _match(db: Session, fp_set: CodeFingerprintSet, hashes: set[int]) -> List[Dict[str, Any]]:
+    """
+    Other answers to the same question sharing at least
+    PLAGIARISM_MIN_SIMILARITY of the smaller answer's fingerprints. Only the
+    postings of this answer's fingerprints are read, and in larger pools
+    fingerprints found in more than PLAGIARISM_BOILERPLATE_SHARE of the
+    answers (signature lines, the usual loop) are skipped, so cost follows
+    how much code is actually shared rather than the number of submissions.
+    """
+    if len(hashes) < settings.PLAGIARISM_MIN_FINGERPRINTS:
+        return []
+    same_question = (
+        CodeFingerprint.question_set_id == fp_set.question_set_id,
+        CodeFingerprint.question_id == fp_set.question_id,
+    )
+    submissions = (
+        db.query(func.count(CodeFingerprintSet.id))
+        .filter(
+            CodeFingerprintSet.question_set_id == fp_set.question_set_id,
+            CodeFingerprintSet.question_id == fp_set.question_id,
+        )
+        .scalar()
+    )
+    # A share alone would call any ring of copies boilerplate in a small
+    # pool (3 identical answers out of 6), so it needs a minimum count too
+    max_postings = max(
+        settings.PLAGIARISM_BOILERPLATE_MIN_ANSWERS - 1, int(settings.PLAGIARISM_BOILERPLATE_SHARE * submissions)
+    )
+    hash_list = list(hashes)
+    kept = [
+        h
+        for h, postings in db.query(CodeFingerprint.hash, func.count())
+        .filter(*same_question, CodeFingerprint.hash.in_(hash_list))
+        .group_by(CodeFingerprint.hash)
+        if postings <= max_postings
+    ]
+    if not kept:
+        return []
+
+    # Threshold applied in SQL so only actual matches come back
+    smaller = case((CodeFingerprintSet.size < len(hashes), CodeFingerprintSet.size), else_=len(hashes))
+    rows = (
+        db.query(CodeFingerprintSet.candidate_id, func.count(), smaller)
+        .select_from(CodeFingerprint)
+        .join(CodeFingerprintSet, CodeFingerprintSet.id == CodeFingerprint.set_id)
+        .filter(
+            *same_question,
+            CodeFingerprint.hash.in_(kept),
+            CodeFingerprint.set_id != fp_set.id,
+            CodeFingerprintSet.size >= settings.PLAGIARISM_MIN_FINGERPRINTS,
+        )
+        .group_by(CodeFingerprintSet.id, CodeFingerprintSet.candidate_id, CodeFingerprintSet.size)
+        .having(func.count() >= settings.PLAGIARISM_MIN_SIMILARITY * smaller)
+        .all()
+    )
+    matches = [
+        {"candidate_id": candidate_id, "similarity": shared / size, "shared": shared}
+        for candidate_id, shared, size in rows
+    ]
+    matches.sort(key=lambda m: (-m["similarity"], m["candidate_id"]))
+    return matches
+
+
+def index_submission(
+    db: Session,
+    question_set_id: int,
+    candidate_id: int,
+    coding_answers: Mapping[str, str],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fingerprint a candidate's coding answers, record which other answers
+    they closely match, and return the top matches per question id.
+    A resubmission replaces the candidate's earlier fingerprints and pairs.
+    """
+    if not settings.PLAGIARISM_ENABLED:
+        return {}
+    start = time.perf_counter()
+    top: Dict[str, List[Dict[str, Any]]] = {}
+    for question_id, code in (coding_answers or {}).items():
+        hashes = _fingerprints(code or "")
+        fp_set = _store_set(db, question_set_id, question_id, candidate_id, hashes)
+        matches = _match(db, fp_set, hashes)
+        for m in matches:
+            db.add(
+                CodeSimilarity(
+                    question_set_id=question_set_id,
+                    question_id=question_id,
+                    candidate_id=candidate_id,
+                    other_candidate_id=m["candidate_id"],
+                    similarity=m["similarity"],
+                    shared=m["shared"],
+                )
+            )
+        if matches:
+            top[question_id] = matches[: settings.PLAGIARISM_TOP_MATCHES]
+    db.commit()
+    if top:
+        logger.info(
+            "Candidate %s coding answers closely match %s other answers (%.1f ms)",
+            candidate_id, sum(len(m) for m in top.values()), (time.perf_counter() - start) * 1000.0,
+        )
+    return top
+
+
+def index_missing_submissions(chunk_size: int = 200) -> int:
+    """
+    Fingerprint stored coding answers that predate the index, oldest first
+    so pairs keep their submission order. Returns the number indexed.
+    """
+    db = SessionLocal()
+    total = 0
+    try:
+        latest_set = dict(
+            db.query(QuestionSet.process_id, func.max(QuestionSet.id)).group_by(QuestionSet.process_id).all()
+        )
+        indexed = select(CodeFingerprintSet.candidate_id).distinct()
+        # A candidate who submitted twice is indexed on the newest response
+        newest = select(func.max(CandidateResponse.id)).group_by(CandidateResponse.candidate_id)
+        last_id = 0
+        while True:
+            rows = (
+                db.query(CandidateResponse.id, CandidateResponse.candidate_id, CandidateResponse.coding_answers, Candidate.process_id)
+                .join(Candidate, Candidate.id == CandidateResponse.candidate_id)
+                .filter(
+                    CandidateResponse.id > last_id,
+                    CandidateResponse.id.in_(newest),
+                    CandidateResponse.candidate_id.notin_(indexed),
+                )
+                .order_by(CandidateResponse.id)
+                .limit(chunk_size)
+                .all()
+            )
+            if not rows:
+                break
+            for _, candidate_id, answers, process_id in rows:
+                if answers and process_id in latest_set:
+                    index_submission(db, latest_set[process_id], candidate_id, answers)
+                    total += 1
+            last_id = rows[-1][0]
+    finally:
+        db.close()
+    if total:
+        logger.info("Fingerprinted coding answers of %s earlier submissions", total)
+    return total
+
+
+def _pairs(db: Session, candidate_ids: Iterable[int]) -> List[CodeSimilarity]:
+    ids = list(candidate_ids)
+    if not ids:
+        return []
+    return (
+        db.query(CodeSimilarity)
+        .filter(or_(CodeSimilarity.candidate_id.in_(ids), CodeSimilarity.other_candidate_id.in_(ids)))
+        .all()
+    )
+
+
+def max_similarity_by_candidate(db: Session, candidate_ids: Iterable[int]) -> Dict[int, float]:
+    best: Dict[int, float] = {}
+    for pair in _pairs(db, candidate_ids):
+        for cid in (pair.candidate_id, pair.other_candidate_id):
+            best[cid] = max(best.get(cid, 0.0), pair.similarity)
+    return best
+
+
+def _clusters(pairs: List[CodeSimilarity]) -> List[Dict[str, Any]]:
+    """Connected groups of candidates linked by similar answers, largest first."""
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for p in pairs:
+        parent[find(p.candidate_id)] = find(p.other_candidate_id)
+    groups: Dict[int, Dict[str, Any]] = defaultdict(lambda: {"candidate_ids": set(), "max_similarity": 0.0})
+    for p in pairs:
+        group = groups[find(p.candidate_id)]
+        group["candidate_ids"].update((p.candidate_id, p.other_candidate_id))
+        group["max_similarity"] = max(group["max_similarity"], p.similarity)
+    clusters = [
+        {"candidate_ids": sorted(g["candidate_ids"]), "max_similarity": g["max_similarity"]} for g in groups.values()
+    ]
+    clusters.sort(key=lambda c: (-len(c["candidate_ids"]), -c["max_similarity"]))
+    return clusters
+
+
+def get_process_report(db: Session, process_id: int) -> Dict[str, Any]:
+    """
+    Similar-answer clusters per coding question and the closest matches of
+    each flagged candidate, for the process's question sets.
+    """
+    set_ids = [row[0] for row in db.query(QuestionSet.id).filter(QuestionSet.process_id == process_id)]
+    pairs = (
+        db.query(CodeSimilarity).filter(CodeSimilarity.question_set_id.in_(set_ids)).all() if set_ids else []
+    )
+    submissions = dict(
+        (question_id, n)
+        for question_id, n in db.query(CodeFingerprintSet.question_id, func.count(CodeFingerprintSet.id))
+        .filter(CodeFingerprintSet.question_set_id.in_(set_ids))
+        .group_by(CodeFingerprintSet.question_id)
+    ) if set_ids else {}
+
+    by_question: Dict[str, List[CodeSimilarity]] = defaultdict(list)
+    by_candidate: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for p in pairs:
+        by_question[p.question_id].append(p)
+        for me, other in ((p.candidate_id, p.other_candidate_id), (p.other_candidate_id, p.candidate_id)):
+            by_candidate[me].append({"candidate_id": other, "question_id": p.question_id, "similarity": p.similarity})
+
+    questions = [
+        {"question_id": qid, "submissions": n, "clusters": _clusters(by_question.get(qid, []))}
+        for qid, n in sorted(submissions.items())
+    ]
+    candidates = [
+        {
+            "candidate_id": cid,
+            "top_matches": sorted(matches, key=lambda m: -m["similarity"])[: settings.PLAGIARISM_TOP_MATCHES],
+        }
+        for cid, matches in sorted(by_candidate.items())
+    ]
+    return {"process_id": process_id, "questions": questions, "candidates": candidates}
@@ -0,0 +1,242 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, object_session
+
+from config import settings
+from models import HiringProcess, QuestionSet, ScoringProfile
+from services import scoring_service, shared_state_service
+
+logger = logging.getLogger("skillpick.process_context")
+
+_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class ProcessContext:
+    """
+    Read-only snapshot of everything the candidate request paths need from a
+    process: JD analysis, the question set with its answer key, the
+    pre-rendered candidate-facing question JSON and the scoring profile.
+    Question dicts are shared between requests and must not be mutated.
+    """
+
+    process_id: int
+    version: int
+    epoch: int
+    loaded_at: float
+
+    public_token: str
+    title: str
+    description: str
+    extra_context: Optional[str]
+    status: str
+    status_detail: Optional[str]
+    num_mcq: int
+    num_coding: int
+    num_theory: int
+    llm_share_weight: float
+
+    jd_analysis: Mapping[str, Any]
+    skills: Tuple[str, ...]
+
+    question_set_id: Optional[int]
+    mcq_questions: Tuple[Dict[str, Any], ...]
+    coding_questions: Tuple[Dict[str, Any], ...]
+    theory_questions: Tuple[Dict[str, Any], ...]
+    answer_key: Mapping[str, int]
+    questions_payload: Optional[bytes]
+
+    weights: Mapping[str, float]
+    thresholds: Mapping[str, float]
+
+
+def jd_analysis_for(process: HiringProcess) -> Dict[str, Any]:
+    return {
+        "skills": list(process.jd_skills or []),
+        "role_level": process.jd_role_level or "unknown",
+        "tech_stack": list(process.jd_tech_stack or []),
+        "experience_expectations": process.jd_experience_expectations or "",
+    }
+
+
+def build_context(process: HiringProcess, epoch: int = 0) -> ProcessContext:
+    from services.process_service import render_candidate_payload
+
+    jd_analysis = jd_analysis_for(process)
+    qset = process.question_set
+    mcq = tuple(qset.mcq_questions or []) if qset else ()
+    weights, thresholds = scoring_service.resolve_profile(process)
+
+    return ProcessContext(
+        process_id=process.id,
+        version=next(_versions),
+        epoch=epoch,
+        loaded_at=time.monotonic(),
+        public_token=process.public_token,
+        title=process.title,
+        description=process.description,
+        extra_context=process.extra_context,
+        status=process.status,
+        status_detail=process.status_detail,
+        num_mcq=process.num_mcq,
+        num_coding=process.num_coding,
+        num_theory=process.num_theory,
+        llm_share_weight=process.llm_share_weight or 1.0,
+        jd_analysis=MappingProxyType(jd_analysis),
+        skills=tuple(dict.fromkeys(jd_analysis["skills"] + jd_analysis["tech_stack"])),
+        question_set_id=qset.id if qset else None,
+        mcq_questions=mcq,
+        coding_questions=tuple(qset.coding_questions or []) if qset else (),
+        theory_questions=tuple(qset.theory_questions or []) if qset else (),
+        answer_key=MappingProxyType({q.get("id"): q.get("correct_index") for q in mcq}),
+        questions_payload=(qset.candidate_payload or render_candidate_payload(qset)) if qset else None,
+        weights=MappingProxyType(weights),
+        thresholds=MappingProxyType(thresholds),
+    )
+
+
+class ProcessContextCache:
+    """
+    LRU of compiled contexts keyed by process id, with a public token -> id
+    map. A commit that touches the process, its question set or its scoring
+    profile drops the local entry and bumps the process epoch in shared state,
+    which makes other workers reload on their next lookup. Entries also expire
+    after PROCESS_CONTEXT_TTL_SECONDS as a backstop.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, ProcessContext]" = OrderedDict()
+        self._tokens: Dict[str, int] = {}
+
+    def get(self, process_id: int) -> Optional[ProcessContext]:
+        with self._lock:
+            ctx = self._entries.get(process_id)
+            if ctx is None:
+                return None
+            if time.monotonic() - ctx.loaded_at > settings.PROCESS_CONTEXT_TTL_SECONDS:
+                self._drop(process_id)
+                return None
+            self._entries.move_to_end(process_id)
+            return ctx
+
+    def id_for_token(self, token: str) -> Optional[int]:
+        return self._tokens.get(token)
+
+    def put(self, ctx: ProcessContext) -> None:
+        with self._lock:
+            self._entries[ctx.process_id] = ctx
+            self._entries.move_to_end(ctx.process_id)
+            self._tokens[ctx.public_token] = ctx.process_id
+            while len(self._entries) > settings.PROCESS_CONTEXT_CACHE_SIZE:
+                oldest, _ = self._entries.popitem(last=False)
+                self._tokens = {t: i for t, i in self._tokens.items() if i != oldest}
+
+    def remember_token(self, token: str, process_id: int) -> None:
+        with self._lock:
+            self._tokens[token] = process_id
+
+    def _drop(self, process_id: int) -> None:
+        # Token -> id never changes, so the token mapping is kept.
+        self._entries.pop(process_id, None)
+
+    def invalidate(self, process_id: int) -> None:
+        with self._lock:
+            self._drop(process_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+
+
+_cache = ProcessContextCache()
+
+
+def _epoch_key(process_id: int) -> str:
+    return f"process_ctx:{process_id}"
+
+
+def _load(db: Session, process_id: int) -> Optional[ProcessContext]:
+    # Read the epoch first: an invalidation racing with the load below then
+    # leaves a stale epoch behind, and the next lookup reloads.
+    epoch = shared_state_service.get_int(_epoch_key(process_id))
+    # One round-trip: process, question set and scoring profile together.
+    process = (
+        db.query(HiringProcess)
+        .options(
+            joinedload(HiringProcess.question_set),
+            joinedload(HiringProcess.scoring_profile),
+        )
+        .filter(HiringProcess.id == process_id)
+        .first()
+    )
+    if process is None:
+        return None
+    ctx = build_context(process, epoch)
+    _cache.put(ctx)
+    return ctx
+
+
+def get_context(db: Session, process_id: int) -> Optional[ProcessContext]:
+    ctx = _cache.get(process_id)
+    if ctx is not None and ctx.epoch == shared_state_service.get_int(_epoch_key(process_id)):
+        return ctx
+    return _load(db, process_id)
+
+
+def get_context_by_token(db: Session, public_token: str) -> Optional[ProcessContext]:
+    process_id = _cache.id_for_token(public_token)
+    if process_id is None:
+        process_id = db.query(HiringProcess.id).filter(HiringProcess.public_token == public_token).scalar()
+        if process_id is None:
+            return None
+        _cache.remember_token(public_token, process_id)
+    return get_context(db, process_id)
+
+
+def invalidate(process_id: int) -> None:
+    _cache.invalidate(process_id)
+    shared_state_service.incr(_epoch_key(process_id))
+
+
+# Invalidate once the change is committed, so no other request can rebuild
+# the context from the pre-commit state in between.
+_DIRTY_KEY = "process_context_dirty"
+
+
+@event.listens_for(HiringProcess, "after_update")
+@event.listens_for(HiringProcess, "after_delete")
+@event.listens_for(QuestionSet, "after_insert")
+@event.listens_for(QuestionSet, "after_update")
+@event.listens_for(QuestionSet, "after_delete")
+@event.listens_for(ScoringProfile, "after_insert")
+@event.listens_for(ScoringProfile, "after_update")
+@event.listens_for(ScoringProfile, "after_delete")
+def _mark_dirty(mapper, connection, target) -> None:
+    session = object_session(target)
+    process_id = target.id if isinstance(target, HiringProcess) else target.process_id
+    if session is None:
+        invalidate(process_id)
+        return
+    session.info.setdefault(_DIRTY_KEY, set()).add(process_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session) -> None:
+    for process_id in session.info.pop(_DIRTY_KEY, ()):
+        invalidate(process_id)
+        logger.debug("Invalidated process context for process_id=%s", process_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty(session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
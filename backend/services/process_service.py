@@ -1,31 +1,42 @@
 import logging
+import os
 import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import orjson
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
+from config import settings
+from database import SessionLocal
+
 from models import HiringProcess, QuestionSet
 from schemas import HiringProcessCreate, JDAnalysis, QuestionSetOut, MCQQuestion, CodingQuestion, TheoryQuestion
-from gemini_client import jd_agent_extract, question_generator_agent
+from gemini_client import jd_agent_extract
+from services import question_bank_service, shared_state_service
+from utils.llm_gate import llm_scope
 
 logger = logging.getLogger("skillpick.process")
 
+# JD analysis + question generation run here so process creation returns at once.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix="process-gen"
+)
+
 
 def _generate_public_token() -> str:
     return secrets.token_urlsafe(12)
 
 
 def create_hiring_process(db: Session, payload: HiringProcessCreate) -> HiringProcess:
+    """
+    Store the process in the "generating" state and hand JD analysis and
+    question generation to the background executor.
+    """
     logger.info("Creating hiring process: %s", payload.title)
 
-    # Call JD Agent
-    jd_raw = jd_agent_extract(payload.description, payload.extra_context)
-    jd_analysis = JDAnalysis(
-        skills=jd_raw.get("skills", []),
-        role_level=jd_raw.get("role_level", "unknown"),
-        tech_stack=jd_raw.get("tech_stack", []),
-        experience_expectations=jd_raw.get("experience_expectations", ""),
-    )
-    logger.info("JD analysis complete for title=%s", payload.title)
-
     process = HiringProcess(
         public_token=_generate_public_token(),
         title=payload.title,
@@ -34,29 +45,105 @@ def create_hiring_process(db: Session, payload: HiringProcessCreate) -> HiringPr
         num_coding=payload.num_coding,
         num_theory=payload.num_theory,
         extra_context=payload.extra_context,
-        jd_skills=jd_analysis.skills,
-        jd_role_level=jd_analysis.role_level,
-        jd_tech_stack=jd_analysis.tech_stack,
-        jd_experience_expectations=jd_analysis.experience_expectations,
+        status="generating",
     )
     db.add(process)
     db.commit()
     db.refresh(process)
 
-    # Generate questions once per process
-    questions_raw = question_generator_agent(
-        job_description=process.description,
-        jd_analysis={
-            "skills": process.jd_skills,
-            "role_level": process.jd_role_level,
-            "tech_stack": process.jd_tech_stack,
-            "experience_expectations": process.jd_experience_expectations,
-        },
-        extra_context=process.extra_context,
-        num_mcq=process.num_mcq,
-        num_coding=process.num_coding,
-        num_theory=process.num_theory,
+    start_generation(process.id)
+    return process
+
+
+def start_generation(process_id: int) -> None:
+    _executor.submit(_run_generation_pipeline, process_id)
+
+
+def _claim_key(process_id: int) -> str:
+    return f"process-gen:{process_id}"
+
+
+class GenerationClaimLost(RuntimeError):
+    """Another worker took over generation after this one's claim expired."""
+
+
+def _run_generation_pipeline(process_id: int) -> None:
+    # With several workers, a process must only be generated by one of them.
+    claim_key = _claim_key(process_id)
+    owner = f"{os.getpid()}:{threading.get_ident()}"
+    if not shared_state_service.claim(claim_key, owner, settings.GENERATION_CLAIM_TTL_SECONDS):
+        logger.info("Generation for process_id=%s already claimed by another worker", process_id)
+        return
+
+    def heartbeat() -> None:
+        # Generation can outlive one TTL; renew between stages so the process
+        # is not offered for retry while this worker is still on it
+        if not shared_state_service.claim(claim_key, owner, settings.GENERATION_CLAIM_TTL_SECONDS):
+            raise GenerationClaimLost(f"generation claim for process_id={process_id} was taken over")
+
+    db = SessionLocal()
+    try:
+        process = get_process_by_id(db, process_id)
+        if process is None or process.status != "generating":
+            # A retried job that was queued twice; the first run finished it
+            return
+
+        # Background work: no deadline, yields to candidates waiting on a response
+        with llm_scope(process.id, process.llm_share_weight or 1.0, priority="batch"):
+            _analyze_and_generate(db, process, heartbeat)
+    except GenerationClaimLost as e:
+        # The worker holding the claim now owns the outcome; leave the status alone
+        logger.warning("Abandoning generation: %s", e)
+        db.rollback()
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Question generation failed for process_id=%s", process_id)
+        db.rollback()
+        process = get_process_by_id(db, process_id)
+        if process is not None:
+            process.status = "failed"
+            process.status_detail = str(e)[:500]
+            db.commit()
+    finally:
+        db.close()
+        shared_state_service.release(claim_key, owner)
+
+
+def _analyze_and_generate(db: Session, process: HiringProcess, heartbeat: Callable[[], None]) -> None:
+    process_id = process.id
+
+    # Call JD Agent
+    jd_raw = jd_agent_extract(process.description, process.extra_context)
+    jd_analysis = JDAnalysis(
+        skills=jd_raw.get("skills", []),
+        role_level=jd_raw.get("role_level", "unknown"),
+        tech_stack=jd_raw.get("tech_stack", []),
+        experience_expectations=jd_raw.get("experience_expectations", ""),
     )
+    process.jd_skills = jd_analysis.skills
+    process.jd_role_level = jd_analysis.role_level
+    process.jd_tech_stack = jd_analysis.tech_stack
+    process.jd_experience_expectations = jd_analysis.experience_expectations
+    db.commit()
+    logger.info("JD analysis complete for process_id=%s", process_id)
+
+    # Generate questions once per process (reusing the question bank where possible)
+    heartbeat()
+    questions_raw = question_bank_service.build_question_set_payload(db, process, heartbeat)
+
+    # Re-check under a row lock: a run that lost its claim must not add a
+    # second set, nor overwrite a process that was finished or failed meanwhile
+    heartbeat()
+    process = (
+        db.query(HiringProcess)
+        .filter(HiringProcess.id == process_id)
+        .populate_existing()
+        .with_for_update()
+        .one_or_none()
+    )
+    if process is None or process.status != "generating" or get_question_set_for_process(db, process_id) is not None:
+        logger.warning("Discarding generated questions for process_id=%s: no longer generating", process_id)
+        db.rollback()
+        return
 
     question_set = QuestionSet(
         process_id=process.id,
@@ -65,10 +152,29 @@ def create_hiring_process(db: Session, payload: HiringProcessCreate) -> HiringPr
         theory_questions=questions_raw.get("theory", []),
     )
     db.add(question_set)
+    process.status = "ready"
+    process.status_detail = None
     db.commit()
-    db.refresh(question_set)
+    logger.info("Question set generated for process_id=%s", process_id)
+
+
+def can_retry_generation(process: HiringProcess) -> bool:
+    """
+    Failed generation can be retried, and so can a process left "generating"
+    with no worker holding its claim: the worker died (restart, crash) and
+    the claim has expired, or the job is still queued, where the duplicate
+    run finds the process ready and stops.
+    """
+    if process.status == "failed":
+        return True
+    return process.status == "generating" and shared_state_service.get(_claim_key(process.id)) is None
 
-    logger.info("Question set generated for process_id=%s", process.id)
+
+def retry_generation(db: Session, process: HiringProcess) -> HiringProcess:
+    process.status = "generating"
+    process.status_detail = None
+    db.commit()
+    start_generation(process.id)
     return process
 
 
@@ -89,3 +195,26 @@ def to_question_set_out(qset: QuestionSet) -> QuestionSetOut:
     coding_objs = [CodingQuestion(**q) for q in (qset.coding_questions or [])]
     theory_objs = [TheoryQuestion(**q) for q in (qset.theory_questions or [])]
     return QuestionSetOut(mcq=mcq_objs, coding=coding_objs, theory=theory_objs)
+
+
+def render_candidate_payload(qset: QuestionSet) -> bytes:
+    """
+    Validate the question set once and render the candidate-facing JSON
+    ({"mcq": [...], "coding": [...], "theory": [...]}). Only schema fields are
+    kept, so test cases are dropped, and MCQ correct_index and theory
+    reference answers are excluded.
+    """
+    out = to_question_set_out(qset)
+    return orjson.dumps(
+        {
+            "mcq": [q.model_dump(exclude={"correct_index"}) for q in out.mcq],
+            "coding": [q.model_dump() for q in out.coding],
+            "theory": [q.model_dump(exclude={"reference_answer", "key_points"}) for q in out.theory],
+        }
+    )
+
+
+@event.listens_for(QuestionSet, "before_insert")
+@event.listens_for(QuestionSet, "before_update")
+def _render_on_store(mapper, connection, target) -> None:
+    target.candidate_payload = render_candidate_payload(target)
@@ -0,0 +1,234 @@
+import copy
+import logging
+import random
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import HiringProcess, QuestionBankItem
+from services import shared_state_service
+from services.process_context_service import jd_analysis_for
+from services.question_generation_service import SECTIONS, assign_ids, content_hash, dedupe, generate_questions
+
+logger = logging.getLogger("skillpick.question_bank")
+
+
+class IncompleteQuestionSet(RuntimeError):
+    """Fewer questions could be produced than the process asks for."""
+
+
+def normalize_skill(skill: Any) -> str:
+    return " ".join(str(skill or "").lower().split())
+
+
+class QuestionBankIndex:
+    """
+    In-memory inverted index (kind, skill) -> bank item ids.
+    Loaded from the DB on first use and kept up to date as items are stored.
+    Items stored by other workers are picked up incrementally whenever the
+    shared "question_bank" epoch moves. New rows are found by content hash,
+    not by id: concurrent writers can commit ids out of order.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._epoch: int | None = None
+        self._postings: Dict[Tuple[str, str], List[int]] = {}
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._hashes: set[str] = set()
+
+    def _add(self, row: QuestionBankItem) -> bool:
+        if row.id in self._items:
+            return False
+        self._items[row.id] = {
+            "kind": row.kind,
+            "skill": row.skill,
+            "role_level": row.role_level,
+            "difficulty": row.difficulty,
+            "payload": row.payload,
+        }
+        self._hashes.add(row.content_hash)
+        self._postings.setdefault((row.kind, row.skill), []).append(row.id)
+        return True
+
+    def _load_locked(self, db: Session, hashes: Iterable[str]) -> int:
+        missing = [h for h in hashes if h not in self._hashes]
+        added = 0
+        for start in range(0, len(missing), 500):
+            batch = missing[start : start + 500]
+            for row in db.query(QuestionBankItem).filter(QuestionBankItem.content_hash.in_(batch)):
+                added += self._add(row)
+        return added
+
+    def ensure_loaded(self, db: Session) -> None:
+        epoch = shared_state_service.get_int(_EPOCH_KEY)
+        if self._epoch == epoch:
+            return
+        with self._lock:
+            if self._epoch == epoch:
+                return
+            loaded = self._load_locked(db, (h for (h,) in db.query(QuestionBankItem.content_hash)))
+            self._epoch = epoch
+            logger.info("Question bank index loaded %s new items (%s total)", loaded, len(self._items))
+
+    def load(self, db: Session, hashes: Iterable[str]) -> int:
+        """Index the stored rows with these hashes that are not indexed yet."""
+        with self._lock:
+            return self._load_locked(db, hashes)
+
+    def contains_hash(self, content_hash: str) -> bool:
+        with self._lock:
+            return content_hash in self._hashes
+
+    def lookup(self, kind: str, skill: str, role_level: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [self._items[i] for i in self._postings.get((kind, skill), [])]
+        if role_level and role_level != "unknown":
+            items = [i for i in items if i["role_level"] in (role_level, "unknown")]
+        return items
+
+
+_EPOCH_KEY = "question_bank"
+_index = QuestionBankIndex()
+
+
+def store_generated_questions(
+    db: Session,
+    questions: Dict[str, List[Dict[str, Any]]],
+    role_level: str | None,
+    source_process_id: int | None = None,
+) -> int:
+    """
+    Add freshly generated questions to the bank, skipping ones already stored.
+    Returns the number of new bank items.
+    """
+    _index.ensure_loaded(db)
+    level = normalize_skill(role_level) or "unknown"
+
+    new_rows: List[Dict[str, Any]] = []
+    seen: set[str] = set()
+    for kind in SECTIONS:
+        for item in questions.get(kind, []) or []:
+            item_hash = content_hash(kind, item)
+            if item_hash in seen or _index.contains_hash(item_hash):
+                continue
+            seen.add(item_hash)
+            new_rows.append(
+                {
+                    "kind": kind,
+                    "skill": normalize_skill(item.get("skill")) or "general",
+                    "role_level": level,
+                    "difficulty": item.get("difficulty"),
+                    "content_hash": item_hash,
+                    "payload": {k: v for k, v in item.items() if k != "id"},
+                    "source_process_id": source_process_id,
+                }
+            )
+
+    if not new_rows:
+        return 0
+
+    # Another worker may store the same question between the check above and
+    # this insert; its row is kept and indexed below like ours
+    table = QuestionBankItem.__table__
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    db.execute(insert(table).on_conflict_do_nothing(index_elements=[table.c.content_hash]), new_rows)
+    db.commit()
+    added = _index.load(db, seen)
+    shared_state_service.incr(_EPOCH_KEY)
+    logger.info("Stored %s new questions in the bank", added)
+    return added
+
+
+def assemble_from_bank(
+    db: Session,
+    skills: List[str],
+    role_level: str | None,
+    counts: Dict[str, int],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Pick up to counts[kind] bank questions per section, spreading the picks
+    round-robin over the given skills.
+    """
+    _index.ensure_loaded(db)
+    level = normalize_skill(role_level) or "unknown"
+    skill_keys = list(dict.fromkeys(normalize_skill(s) for s in skills if normalize_skill(s)))
+
+    picked: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in SECTIONS}
+    for kind in SECTIONS:
+        wanted = counts.get(kind, 0)
+        pools = []
+        for skill in skill_keys:
+            items = _index.lookup(kind, skill, level)
+            if items:
+                pools.append(random.sample(items, len(items)))
+
+        while len(picked[kind]) < wanted and pools:
+            for pool in list(pools):
+                if len(picked[kind]) >= wanted:
+                    break
+                if not pool:
+                    pools.remove(pool)
+                    continue
+                picked[kind].append(copy.deepcopy(pool.pop()["payload"]))
+    return picked
+
+
+def build_question_set_payload(
+    db: Session,
+    process: HiringProcess,
+    heartbeat: Callable[[], None] | None = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Assemble the question set for a process, reusing bank questions where the
+    bank covers enough of the request and calling the generator only for gaps.
+    Raises IncompleteQuestionSet when a section still comes up short after
+    the generator's retries.
+    """
+    counts = {
+        "mcq": process.num_mcq,
+        "coding": process.num_coding,
+        "theory": process.num_theory,
+    }
+    requested = sum(counts.values())
+    jd_analysis = jd_analysis_for(process)
+
+    picked: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in SECTIONS}
+    if settings.QUESTION_BANK_ENABLED and requested:
+        skills = (process.jd_skills or []) + (process.jd_tech_stack or [])
+        # The bank can hold the same question under several skills
+        picked = dedupe(assemble_from_bank(db, skills, process.jd_role_level, counts))
+        coverage = sum(len(v) for v in picked.values()) / requested
+        logger.info(
+            "Question bank coverage for process_id=%s: %.0f%%", process.id, coverage * 100
+        )
+        if coverage < settings.QUESTION_BANK_MIN_COVERAGE:
+            picked = {kind: [] for kind in SECTIONS}
+
+    gaps = {kind: counts[kind] - len(picked[kind]) for kind in SECTIONS}
+    if any(gaps.values()):
+        generated = generate_questions(
+            job_description=process.description,
+            jd_analysis=jd_analysis,
+            extra_context=process.extra_context,
+            counts=gaps,
+            avoid=picked,
+            heartbeat=heartbeat,
+        )
+        if settings.QUESTION_BANK_ENABLED:
+            store_generated_questions(db, generated, process.jd_role_level, process.id)
+        merged = dedupe({kind: picked[kind] + generated[kind] for kind in SECTIONS})
+        picked = {kind: merged[kind][: counts[kind]] for kind in SECTIONS}
+    else:
+        logger.info("Question set for process_id=%s served entirely from bank", process.id)
+
+    short = {kind: f"{len(picked[kind])}/{counts[kind]}" for kind in SECTIONS if len(picked[kind]) < counts[kind]}
+    if short:
+        # Generated questions are already in the bank, so a retry only fills the rest
+        raise IncompleteQuestionSet(
+            "Could not produce enough questions: " + ", ".join(f"{kind} {n}" for kind, n in short.items())
+        )
+    return assign_ids(picked)
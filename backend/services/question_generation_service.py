@@ -0,0 +1,224 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from config import settings
+from gemini_client import question_generator_agent, question_shard_generator_agent
+from utils.llm_gate import bind_scope
+
+logger = logging.getLogger("skillpick.question_generation")
+
+SECTIONS = ("mcq", "coding", "theory")
+ID_PREFIXES = {"mcq": "mcq", "coding": "code", "theory": "theory"}
+
+
+@dataclass
+class Shard:
+    key: str
+    section: str
+    count: int
+    skills: Dict[str, int]
+    avoid: List[str] = field(default_factory=list)
+
+
+def content_hash(section: str, item: Dict[str, Any]) -> str:
+    if section == "coding":
+        text = f"{item.get('title', '')}\n{item.get('description', '')}"
+    else:
+        text = item.get("question", "")
+    normalized = " ".join(str(text).lower().split())
+    return hashlib.sha256(f"{section}:{normalized}".encode("utf-8")).hexdigest()
+
+
+def _display_text(section: str, item: Dict[str, Any]) -> str:
+    return item.get("title", "") if section == "coding" else item.get("question", "")
+
+
+def assign_ids(questions: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    for section in SECTIONS:
+        prefix = ID_PREFIXES[section]
+        for i, item in enumerate(questions.get(section, []), start=1):
+            item["id"] = f"{prefix}{i}"
+    return questions
+
+
+def plan_shards(counts: Dict[str, int], skills: List[str]) -> List[Shard]:
+    """
+    One shard per section, with MCQs split into batches of
+    QUESTION_GEN_MCQ_BATCH_SIZE. Question slots are given skills round-robin
+    so every shard covers a slice of the JD skills.
+    """
+    skills = skills or ["general"]
+    shards: List[Shard] = []
+    slot = 0
+    for section in SECTIONS:
+        remaining = counts.get(section, 0)
+        batch = settings.QUESTION_GEN_MCQ_BATCH_SIZE if section == "mcq" else remaining
+        index = 0
+        while remaining > 0:
+            n = min(batch, remaining)
+            allocation: Dict[str, int] = {}
+            for _ in range(n):
+                skill = skills[slot % len(skills)]
+                allocation[skill] = allocation.get(skill, 0) + 1
+                slot += 1
+            shards.append(Shard(key=f"{section}-{index}", section=section, count=n, skills=allocation))
+            remaining -= n
+            index += 1
+    return shards
+
+
+def _is_valid(section: str, item: Any) -> bool:
+    if not isinstance(item, dict):
+        return False
+    if section == "mcq":
+        options = item.get("options")
+        correct = item.get("correct_index")
+        return (
+            bool(item.get("question"))
+            and isinstance(options, list)
+            and len(options) >= 2
+            and isinstance(correct, int)
+            and 0 <= correct < len(options)
+        )
+    if section == "coding":
+        return (
+            bool(item.get("title"))
+            and bool(item.get("description"))
+            and isinstance(item.get("expected_time_minutes", 0), int)
+        )
+    return bool(item.get("question"))
+
+
+def _run_shard(
+    shard: Shard,
+    count: int,
+    job_description: str,
+    jd_analysis: Dict[str, Any],
+    extra_context: str | None,
+) -> List[Dict[str, Any]]:
+    raw = question_shard_generator_agent(
+        job_description=job_description,
+        jd_analysis=jd_analysis,
+        extra_context=extra_context,
+        section=shard.section,
+        count=count,
+        skills=shard.skills,
+        avoid=shard.avoid,
+    )
+    items = [i for i in (raw.get(shard.section) or []) if _is_valid(shard.section, i)]
+    if shard.section == "coding":
+        for item in items:
+            item.setdefault("difficulty", "medium")
+            item.setdefault("expected_time_minutes", 20)
+    return items[:count]
+
+
+def dedupe(
+    questions: Dict[str, List[Dict[str, Any]]],
+    existing: Dict[str, List[Dict[str, Any]]] | None = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Drop repeated questions per section, and any already in existing."""
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for section in SECTIONS:
+        seen = {content_hash(section, item) for item in (existing or {}).get(section, [])}
+        out[section] = []
+        for item in questions.get(section, []) or []:
+            h = content_hash(section, item)
+            if h not in seen:
+                seen.add(h)
+                out[section].append(item)
+    return out
+
+
+def generate_questions(
+    job_description: str,
+    jd_analysis: Dict[str, Any],
+    extra_context: str | None,
+    counts: Dict[str, int],
+    avoid: Dict[str, List[Dict[str, Any]]] | None = None,
+    heartbeat: Callable[[], None] | None = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Generate a question set as concurrent shards, merge them in plan order
+    with cross-shard dedupe and stable ids, and regenerate only the shards
+    that came back short, malformed or duplicated. Questions in avoid (e.g.
+    picked from the bank for the same set) are never returned again.
+    heartbeat, if given, is called before each round of shards.
+    """
+    avoid = avoid or {}
+    if not settings.QUESTION_GEN_SHARDED:
+        raw = question_generator_agent(
+            job_description=job_description,
+            jd_analysis=jd_analysis,
+            extra_context=extra_context,
+            num_mcq=counts.get("mcq", 0),
+            num_coding=counts.get("coding", 0),
+            num_theory=counts.get("theory", 0),
+        )
+        unique = dedupe({s: raw.get(s) or [] for s in SECTIONS}, avoid)
+        return assign_ids({s: unique[s][: counts.get(s, 0)] for s in SECTIONS})
+
+    skills = list(dict.fromkeys((jd_analysis.get("skills") or []) + (jd_analysis.get("tech_stack") or [])))
+    shards = plan_shards(counts, skills)
+    avoided = {s: [_display_text(s, item) for item in avoid.get(s, [])] for s in SECTIONS}
+    for shard in shards:
+        shard.avoid = list(avoided[shard.section])
+    produced: Dict[str, List[Dict[str, Any]]] = {shard.key: [] for shard in shards}
+    pending = list(shards)
+
+    for attempt in range(settings.QUESTION_GEN_MAX_RETRIES + 1):
+        if not pending:
+            break
+        if heartbeat is not None:
+            heartbeat()
+        workers = max(1, min(settings.QUESTION_GEN_MAX_WORKERS, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qgen") as pool:
+            futures = {
+                shard.key: pool.submit(
+                    bind_scope(_run_shard),
+                    shard,
+                    shard.count - len(produced[shard.key]),
+                    job_description,
+                    jd_analysis,
+                    extra_context,
+                )
+                for shard in pending
+            }
+            for shard in pending:
+                try:
+                    produced[shard.key].extend(futures[shard.key].result())
+                except Exception as e:  # noqa: BLE001
+                    logger.warning("Question shard %s failed (attempt %s): %s", shard.key, attempt + 1, e)
+
+        # Merge in plan order so earlier shards keep their questions on dedupe.
+        seen = {content_hash(s, item) for s in SECTIONS for item in avoid.get(s, [])}
+        pending = []
+        for shard in shards:
+            unique = []
+            for item in produced[shard.key]:
+                h = content_hash(shard.section, item)
+                if h not in seen:
+                    seen.add(h)
+                    unique.append(item)
+            produced[shard.key] = unique
+            if len(unique) < shard.count:
+                shard.avoid = avoided[shard.section] + [
+                    _display_text(shard.section, item)
+                    for other in shards
+                    if other.section == shard.section
+                    for item in produced[other.key]
+                ]
+                pending.append(shard)
+        if pending:
+            logger.info("Regenerating %s question shard(s): %s", len(pending), [s.key for s in pending])
+
+    if pending:
+        logger.error("Question shards still incomplete after retries: %s", [s.key for s in pending])
+
+    merged: Dict[str, List[Dict[str, Any]]] = {section: [] for section in SECTIONS}
+    for shard in shards:
+        merged[shard.section].extend(produced[shard.key])
+    return assign_ids(merged)
@@ -0,0 +1,204 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+from sqlalchemy import and_, or_, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+from models import Candidate, ResumeDocument, ResumeLSHBucket, ScreeningDecision
+from utils.shingles import lsh_bands, minhash, minhash_similarity
+
+logger = logging.getLogger("skillpick.resume_dedup")
+
+# 128 permutations in 32 bands of 4 rows: resumes with Jaccard 0.8 share a
+# bucket with probability ~1, unrelated ones (< 0.1) almost never. Bucket
+# matches are then checked against the full signature. Changing these
+# invalidates stored signatures (manage.py reindex-resumes).
+NUM_PERM = 128
+BANDS = 32
+
+DEDUP_POLICIES = ("off", "flag", "reuse", "reject")
+
+
+@dataclass(frozen=True)
+class NearDuplicate:
+    document_id: int
+    similarity: float
+    # Latest candidate in scope who uploaded that document, if any
+    candidate_id: int | None
+    # Latest screening of that document by this process that can be reused
+    screening_id: int | None
+
+
+def _signature(resume_text: str) -> bytes:
+    sig = minhash(resume_text, num_perm=NUM_PERM)
+    return b"" if sig is None else sig.tobytes()
+
+
+def _decode(blob: bytes | None) -> np.ndarray | None:
+    if not blob:
+        return None
+    return np.frombuffer(bytes(blob), dtype=np.uint32)
+
+
+def _store_signature(conn, document_id: int, blob: bytes) -> None:
+    conn.execute(
+        text("UPDATE resume_documents SET minhash = :m WHERE id = :id"), {"m": blob, "id": document_id}
+    )
+    sig = _decode(blob)
+    if sig is not None:
+        conn.execute(
+            ResumeLSHBucket.__table__.insert(),
+            [{"document_id": document_id, "band": i, "bucket": b} for i, b in enumerate(lsh_bands(sig, BANDS))],
+        )
+
+
+def ensure_signature(db: Session, document_id: int, resume_text: str) -> np.ndarray | None:
+    """
+    Signature of a stored resume, computing and indexing it on first use.
+    None when the resume has no words (e.g. a scanned PDF), since every
+    such resume would look identical.
+    """
+    blob = db.query(ResumeDocument.minhash).filter(ResumeDocument.id == document_id).scalar()
+    if blob is None:
+        blob = _signature(resume_text)
+        try:
+            _store_signature(db.connection(), document_id, blob)
+            db.commit()
+        except IntegrityError:
+            # Another worker indexed the same document first
+            db.rollback()
+    return _decode(blob)
+
+
+def _similar_documents(db: Session, sig: np.ndarray) -> Dict[int, float]:
+    """Documents whose signature is within RESUME_DEDUP_THRESHOLD, by similarity."""
+    # One index search per band; a row-value IN would scan the table on SQLite
+    match_any = or_(
+        *(
+            and_(ResumeLSHBucket.band == band, ResumeLSHBucket.bucket == bucket)
+            for band, bucket in enumerate(lsh_bands(sig, BANDS))
+        )
+    )
+    ids = [
+        row[0]
+        for row in db.query(ResumeLSHBucket.document_id)
+        .filter(match_any)
+        .distinct()
+        .limit(settings.RESUME_DEDUP_MAX_CANDIDATES)
+    ]
+    if not ids:
+        return {}
+    similar = {}
+    for doc_id, blob in db.query(ResumeDocument.id, ResumeDocument.minhash).filter(ResumeDocument.id.in_(ids)):
+        other = _decode(blob)
+        if other is not None:
+            sim = minhash_similarity(sig, other)
+            if sim >= settings.RESUME_DEDUP_THRESHOLD:
+                similar[doc_id] = sim
+    return similar
+
+
+def find_near_duplicate(
+    db: Session,
+    document_id: int,
+    resume_text: str,
+    process_id: int,
+) -> NearDuplicate | None:
+    """
+    The most similar resume already submitted in scope (this process, or any
+    process with RESUME_DEDUP_SCOPE=global), including an earlier upload of
+    the very same file. Lookup cost depends on bucket sizes, not on the
+    number of stored resumes.
+    """
+    if settings.RESUME_DEDUP_POLICY == "off":
+        return None
+    start = time.perf_counter()
+    sig = ensure_signature(db, document_id, resume_text)
+    if sig is None:
+        return None
+    similar = _similar_documents(db, sig)
+    if not similar:
+        return None
+
+    doc_ids = list(similar)
+    candidates = db.query(Candidate.id, Candidate.resume_document_id).filter(
+        Candidate.resume_document_id.in_(doc_ids)
+    )
+    screened = db.query(ScreeningDecision.resume_document_id).filter(
+        ScreeningDecision.resume_document_id.in_(doc_ids)
+    )
+    if settings.RESUME_DEDUP_SCOPE != "global":
+        candidates = candidates.filter(Candidate.process_id == process_id)
+        screened = screened.filter(ScreeningDecision.process_id == process_id)
+    latest_candidate = {doc: cid for cid, doc in candidates.order_by(Candidate.id)}
+    seen = {row[0] for row in screened.distinct()}
+    # Screening results only transfer within the process they were made for
+    reusable = {
+        doc: sid
+        for sid, doc in db.query(ScreeningDecision.id, ScreeningDecision.resume_document_id)
+        .filter(
+            ScreeningDecision.resume_document_id.in_(doc_ids),
+            ScreeningDecision.process_id == process_id,
+            ScreeningDecision.result.isnot(None),
+        )
+        .order_by(ScreeningDecision.id)
+    }
+
+    submitted = [doc for doc in doc_ids if doc in latest_candidate or doc in seen]
+    if not submitted:
+        return None
+    best = max(submitted, key=lambda doc: (similar[doc], doc in reusable, doc))
+    match = NearDuplicate(
+        document_id=best,
+        similarity=similar[best],
+        candidate_id=latest_candidate.get(best),
+        screening_id=reusable.get(best),
+    )
+    logger.info(
+        "Resume document %s nearly duplicates document %s (similarity %.2f) for process_id=%s in %.1f ms",
+        document_id, best, match.similarity, process_id, (time.perf_counter() - start) * 1000.0,
+    )
+    return match
+
+
+def index_missing_signatures(chunk_size: int = 500, rebuild: bool = False) -> int:
+    """
+    Compute signatures for stored resumes that have none (all of them with
+    rebuild), chunk_size per transaction. Returns the number indexed.
+    """
+    start = time.perf_counter()
+    if rebuild:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM resume_lsh_buckets"))
+            conn.execute(text("UPDATE resume_documents SET minhash = NULL"))
+    last_id, total = 0, 0
+    while True:
+        with engine.begin() as conn:
+            ids = [
+                r[0]
+                for r in conn.execute(
+                    text("SELECT id FROM resume_documents WHERE id > :last AND minhash IS NULL ORDER BY id LIMIT :n"),
+                    {"last": last_id, "n": chunk_size},
+                )
+            ]
+            if not ids:
+                break
+            rows = conn.execute(
+                ResumeDocument.__table__.select()
+                .with_only_columns(ResumeDocument.id, ResumeDocument.text)
+                .where(ResumeDocument.id.in_(ids))
+            ).all()
+            for doc_id, resume_text in rows:
+                _store_signature(conn, doc_id, _signature(resume_text or ""))
+        last_id = ids[-1]
+        total += len(ids)
+    if total:
+        logger.info("Indexed MinHash signatures of %s resumes in %.1fs", total, time.perf_counter() - start)
+    return total
+
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ResumeDocument
+from utils.pdf_reader import extract_pdf
+
+logger = logging.getLogger("skillpick.resume_documents")
+
+
+@dataclass(frozen=True)
+class ResumeExtract:
+    document_id: int
+    sha256: str
+    text: str
+    page_count: int | None
+    extract_ms: float | None
+
+
+class ResumeTextCache:
+    """
+    Per-worker LRU of extracted resumes keyed by file hash, bounded by the
+    total size of the cached text.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, ResumeExtract]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(entry: ResumeExtract) -> int:
+        return len(entry.text.encode("utf-8"))
+
+    def get(self, digest: str) -> ResumeExtract | None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+            return entry
+
+    def put(self, entry: ResumeExtract) -> None:
+        size = self._size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(entry.sha256, None)
+            if old is not None:
+                self._bytes -= self._size(old)
+            self._entries[entry.sha256] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
+
+
+_cache = ResumeTextCache(settings.RESUME_CACHE_MAX_BYTES)
+_stats_lock = threading.Lock()
+_stats = {"memory_hits": 0, "db_hits": 0, "extractions": 0}
+
+
+def _bump(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _to_extract(row: ResumeDocument) -> ResumeExtract:
+    return ResumeExtract(
+        document_id=row.id,
+        sha256=row.sha256,
+        text=row.text or "",
+        page_count=row.page_count,
+        extract_ms=row.extract_ms,
+    )
+
+
+def get_or_extract(db: Session, data: bytes) -> ResumeExtract:
+    """
+    Return the extracted resume for these file bytes: from this worker's
+    cache, then the resume_documents table, and only parse the PDF when the
+    file has never been seen. New documents are committed straight away so a
+    re-upload after a failed registration finds them.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    cached = _cache.get(digest)
+    if cached is not None:
+        _bump("memory_hits")
+        return cached
+
+    row = db.query(ResumeDocument).filter(ResumeDocument.sha256 == digest).first()
+    if row is not None:
+        _bump("db_hits")
+    else:
+        start = time.perf_counter()
+        text, page_count = extract_pdf(data)
+        extract_ms = (time.perf_counter() - start) * 1000.0
+        _bump("extractions")
+        logger.info(
+            "Extracted resume %s: %s pages, %s chars in %.0f ms", digest[:12], page_count, len(text), extract_ms
+        )
+        row = ResumeDocument(
+            sha256=digest,
+            size_bytes=len(data),
+            page_count=page_count,
+            text=text,
+            extract_ms=extract_ms,
+        )
+        db.add(row)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker stored the same file first
+            db.rollback()
+            row = db.query(ResumeDocument).filter(ResumeDocument.sha256 == digest).one()
+
+    extract = _to_extract(row)
+    _cache.put(extract)
+    return extract
+
+
+def get_cache_stats(db: Session) -> Dict[str, Any]:
+    with _stats_lock:
+        stats: Dict[str, Any] = dict(_stats)
+    lookups = stats["memory_hits"] + stats["db_hits"] + stats["extractions"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["db_hits"]) / lookups if lookups else 0.0
+    stats.update(_cache.stats())
+    stats["documents"] = db.query(ResumeDocument).count()
+    return stats
@@ -0,0 +1,260 @@
+import logging
+import time
+from typing import Any, Dict, Iterable, Mapping, Tuple
+
+from sqlalchemy import bindparam, case, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import Candidate, Evaluation, HiringProcess, ScoringProfile
+from services import leaderboard_service
+
+logger = logging.getLogger("skillpick.scoring")
+
+SCORE_SECTIONS = ("resume", "mcq", "coding", "theory")
+VERDICTS = ("strong_hire", "hire", "borderline", "reject")
+
+
+def default_weights() -> Dict[str, float]:
+    return {
+        "resume": settings.SCORE_WEIGHT_RESUME,
+        "mcq": settings.SCORE_WEIGHT_MCQ,
+        "coding": settings.SCORE_WEIGHT_CODING,
+        "theory": settings.SCORE_WEIGHT_THEORY,
+    }
+
+
+def default_thresholds() -> Dict[str, float]:
+    return {
+        "strong_hire": settings.VERDICT_STRONG_HIRE_MIN,
+        "hire": settings.VERDICT_HIRE_MIN,
+        "borderline": settings.VERDICT_BORDERLINE_MIN,
+    }
+
+
+def sections_for_process(process: HiringProcess) -> list[str]:
+    """
+    Sections that count towards the overall score: resume always, test
+    sections only when the process asks at least one question in them.
+    """
+    sections = ["resume"]
+    if process.num_mcq:
+        sections.append("mcq")
+    if process.num_coding:
+        sections.append("coding")
+    if process.num_theory:
+        sections.append("theory")
+    return sections
+
+
+def effective_weights(weights: Dict[str, float], sections: Iterable[str]) -> Dict[str, float]:
+    """
+    Keep only the given sections and rescale their weights to sum to 1.
+    """
+    kept = {s: max(float(weights.get(s, 0.0)), 0.0) for s in sections}
+    total = sum(kept.values())
+    if total <= 0:
+        return {s: 1.0 / len(kept) for s in kept} if kept else {}
+    return {s: w / total for s, w in kept.items()}
+
+
+def compute_overall_score(scores: Dict[str, float], weights: Mapping[str, float]) -> float:
+    return sum(weights[s] * float(scores.get(s) or 0.0) for s in weights)
+
+
+def verdict_for(score: float, thresholds: Mapping[str, float]) -> str:
+    if score >= thresholds["strong_hire"]:
+        return "strong_hire"
+    if score >= thresholds["hire"]:
+        return "hire"
+    if score >= thresholds["borderline"]:
+        return "borderline"
+    return "reject"
+
+
+def resolve_profile(process: HiringProcess) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Effective (weights, thresholds) for a process: the settings defaults,
+    overridden by the process scoring profile where it sets a value.
+    """
+    weights = default_weights()
+    thresholds = default_thresholds()
+    profile = process.scoring_profile
+    if profile is not None:
+        weights.update(profile.weights or {})
+        thresholds.update(profile.thresholds or {})
+    return effective_weights(weights, sections_for_process(process)), thresholds
+
+
+def score_candidate(
+    scores: Dict[str, float],
+    weights: Mapping[str, float],
+    thresholds: Mapping[str, float],
+) -> Dict[str, Any]:
+    """
+    Overall score and verdict for one candidate from their section scores,
+    under weights and thresholds from resolve_profile().
+    """
+    overall = compute_overall_score(scores, weights)
+    return {
+        "overall_score": overall,
+        "verdict": verdict_for(overall, thresholds),
+        "weights": dict(weights),
+    }
+
+
+def validate_profile(
+    weights: Dict[str, float] | None,
+    thresholds: Dict[str, float] | None,
+    current_thresholds: Dict[str, float] | None = None,
+) -> None:
+    """
+    Raises ValueError if a profile update has unknown keys, negative weights
+    or verdict cut-offs out of order.
+    """
+    if weights is not None:
+        unknown = set(weights) - set(SCORE_SECTIONS)
+        if unknown:
+            raise ValueError(f"Unknown score sections: {sorted(unknown)}")
+        if any(w < 0 for w in weights.values()):
+            raise ValueError("Section weights must not be negative")
+    if thresholds is not None:
+        unknown = set(thresholds) - set(VERDICTS[:-1])
+        if unknown:
+            raise ValueError(f"Unknown verdict thresholds: {sorted(unknown)}")
+        merged = {**(current_thresholds or default_thresholds()), **thresholds}
+        if not merged["strong_hire"] >= merged["hire"] >= merged["borderline"]:
+            raise ValueError("Thresholds must satisfy strong_hire >= hire >= borderline")
+
+
+def save_profile(
+    db: Session,
+    process: HiringProcess,
+    weights: Dict[str, float] | None,
+    thresholds: Dict[str, float] | None,
+) -> ScoringProfile:
+    validate_profile(weights, thresholds, resolve_profile(process)[1])
+    profile = process.scoring_profile
+    if profile is None:
+        profile = ScoringProfile(process_id=process.id, weights=weights, thresholds=thresholds, version=1)
+        process.scoring_profile = profile
+        db.add(profile)
+    else:
+        if weights is not None:
+            profile.weights = weights
+        if thresholds is not None:
+            profile.thresholds = thresholds
+        profile.version = (profile.version or 0) + 1
+    db.commit()
+    db.refresh(profile)
+    logger.info("Scoring profile for process_id=%s saved (version %s)", process.id, profile.version)
+    return profile
+
+
+def _score_expr(weights: Dict[str, float]):
+    columns = {
+        "resume": Evaluation.resume_match_score,
+        "mcq": Evaluation.mcq_score,
+        "coding": Evaluation.coding_score,
+        "theory": Evaluation.theory_score,
+    }
+    expr = literal(0.0)
+    for section, weight in weights.items():
+        expr = expr + literal(weight) * func.coalesce(columns[section], 0.0)
+    return expr
+
+
+def _verdict_expr(score, thresholds: Dict[str, float]):
+    return case(
+        (score >= thresholds["strong_hire"], "strong_hire"),
+        (score >= thresholds["hire"], "hire"),
+        (score >= thresholds["borderline"], "borderline"),
+        else_="reject",
+    )
+
+
+def _record_weights(db: Session, in_process, weights: Dict[str, float]) -> None:
+    # raw_agent_responses is compressed, so this one has to go through Python,
+    # in chunks and only for rows that were scored under other weights
+    stale = (
+        db.execute(select(Evaluation.id, Evaluation.raw_agent_responses).where(in_process))
+        .yield_per(settings.COMPRESSION_CHUNK_SIZE)
+        .partitions()
+    )
+    stmt = (
+        update(Evaluation.__table__)
+        .where(Evaluation.__table__.c.id == bindparam("evaluation_id"))
+        .values(raw_agent_responses=bindparam("raw"))
+    )
+    for chunk in stale:
+        params = [
+            {"evaluation_id": evaluation_id, "raw": {**raw, "scoring": {"weights": dict(weights)}}}
+            for evaluation_id, raw in chunk
+            if raw is not None and (raw.get("scoring") or {}).get("weights") != weights
+        ]
+        if params:
+            db.execute(stmt, params)
+
+
+def recompute_process_scores(db: Session, process: HiringProcess) -> Dict[str, Any]:
+    """
+    Re-apply the current scoring profile to every evaluation of a process.
+    Runs as one grouped SELECT (verdict transitions) and one UPDATE, both
+    computed in SQL from the stored section scores. Evaluations whose
+    verdict changes lose their narrative, which was written for the old
+    verdict, so generate_pending_narratives() writes a new one. The weights
+    recorded in raw_agent_responses and the process's score sketches are
+    then brought up to date.
+    """
+    start = time.perf_counter()
+    weights, thresholds = resolve_profile(process)
+    score = _score_expr(weights)
+    verdict = _verdict_expr(score, thresholds)
+    in_process = Evaluation.candidate_id.in_(
+        select(Candidate.id).where(Candidate.process_id == process.id)
+    )
+
+    rows = db.execute(
+        select(Evaluation.final_verdict, verdict.label("new_verdict"), func.count())
+        .where(in_process)
+        .group_by(Evaluation.final_verdict, verdict)
+    ).all()
+
+    # SET expressions see the row as it was, so final_verdict here is the old verdict
+    changed = func.coalesce(Evaluation.final_verdict, "") != verdict
+    result = db.execute(
+        update(Evaluation)
+        .where(in_process)
+        .values(
+            overall_score=score,
+            final_verdict=verdict,
+            summary=case((changed, None), else_=Evaluation.summary),
+            strengths=case((changed, None), else_=Evaluation.strengths),
+            weaknesses=case((changed, None), else_=Evaluation.weaknesses),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    _record_weights(db, in_process, weights)
+    leaderboard_service.rebuild_sketches(db.connection(), process.id)
+    db.commit()
+
+    transitions = [
+        {"from_verdict": old or "", "to_verdict": new, "count": count}
+        for old, new, count in rows
+        if old != new
+    ]
+    report = {
+        "process_id": process.id,
+        "profile_version": process.scoring_profile.version if process.scoring_profile else 0,
+        "weights": weights,
+        "thresholds": thresholds,
+        "updated": result.rowcount,
+        "changed": sum(t["count"] for t in transitions),
+        "transitions": sorted(transitions, key=lambda t: -t["count"]),
+        "duration_ms": (time.perf_counter() - start) * 1000.0,
+    }
+    logger.info(
+        "Recomputed %s evaluations for process_id=%s (%s verdicts changed) in %.0f ms",
+        report["updated"], process.id, report["changed"], report["duration_ms"],
+    )
+    return report
@@ -0,0 +1,198 @@
+import logging
+import time
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ScreeningDecision
+from gemini_client import MODEL_NAME, resume_agent_match
+from services import resume_dedup_service, similarity_service
+from services.process_context_service import ProcessContext
+
+logger = logging.getLogger("skillpick.screening")
+
+
+def _estimate_cost(prompt_chars: int, per_1k_tokens: float) -> float:
+    # Rough estimate: ~4 characters per token, prompt dominates the bill.
+    return (prompt_chars / 4.0) / 1000.0 * per_1k_tokens
+
+
+def _decision_for(score: float) -> str:
+    return "allow" if score >= settings.SCREENING_ALLOW_THRESHOLD else "reject"
+
+
+def _local_prescreen(resume_text: str, jd_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    skills = list(dict.fromkeys((jd_analysis.get("skills") or []) + (jd_analysis.get("tech_stack") or [])))
+    coverage, matched = similarity_service.score_resume_skills(resume_text, skills)
+    score = coverage * 100.0
+    return {
+        "match_score": score,
+        "skill_overlap": matched,
+        "experience_relevance": "not assessed (local pre-screen)",
+        "summary": f"Local pre-screen matched {len(matched)} of {len(skills)} JD skills.",
+        "decision": _decision_for(score),
+    }
+
+
+def _in_escalation_band(score: float) -> bool:
+    return abs(score - settings.SCREENING_ALLOW_THRESHOLD) <= settings.SCREENING_ESCALATION_BAND
+
+
+def _screen_with_agents(
+    ctx: ProcessContext,
+    resume_text: str,
+    record: ScreeningDecision,
+) -> Dict[str, Any]:
+    tier1_mode = settings.SCREENING_TIER1
+    jd_analysis = dict(ctx.jd_analysis)
+    prompt_chars = len(ctx.description or "") + len(resume_text or "") + 2000
+
+    result: Dict[str, Any] | None = None
+    if tier1_mode in ("model", "local"):
+        start = time.perf_counter()
+        try:
+            if tier1_mode == "local":
+                result = _local_prescreen(resume_text, jd_analysis)
+                record.tier1_model = "local"
+                record.tier1_cost = 0.0
+            else:
+                result = resume_agent_match(
+                    job_description=ctx.description,
+                    jd_analysis=jd_analysis,
+                    resume_text=resume_text,
+                    model_name=settings.GEMINI_SCREENING_MODEL,
+                )
+                record.tier1_model = settings.GEMINI_SCREENING_MODEL
+                record.tier1_cost = _estimate_cost(prompt_chars, settings.SCREENING_TIER1_COST_PER_1K_TOKENS)
+            result["match_score"] = float(result.get("match_score", 0.0))
+            record.tier1_score = result["match_score"]
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Tier-1 screening failed, escalating: %s", e)
+            result = None
+        record.tier1_latency_ms = (time.perf_counter() - start) * 1000.0
+
+    if result is None or _in_escalation_band(result["match_score"]):
+        record.escalated = True
+        start = time.perf_counter()
+        result = resume_agent_match(
+            job_description=ctx.description,
+            jd_analysis=jd_analysis,
+            resume_text=resume_text,
+        )
+        result["match_score"] = float(result.get("match_score", 0.0))
+        record.tier2_model = MODEL_NAME
+        record.tier2_score = result["match_score"]
+        record.tier2_latency_ms = (time.perf_counter() - start) * 1000.0
+        record.tier2_cost = _estimate_cost(prompt_chars, settings.SCREENING_TIER2_COST_PER_1K_TOKENS)
+
+    # The configured threshold decides, not the model's own accept/reject
+    result["decision"] = _decision_for(result["match_score"])
+    return result
+
+
+def _duplicate_result(db: Session, duplicate: resume_dedup_service.NearDuplicate) -> Dict[str, Any] | None:
+    """The result RESUME_DEDUP_POLICY dictates for a near-duplicate, or None to screen it."""
+    policy = settings.RESUME_DEDUP_POLICY
+    if policy == "reject":
+        return {
+            "match_score": 0.0,
+            "skill_overlap": [],
+            "experience_relevance": "",
+            "summary": "Near-duplicate of an earlier application.",
+            "decision": "reject",
+        }
+    if policy == "reuse" and duplicate.screening_id is not None:
+        prior = db.get(ScreeningDecision, duplicate.screening_id)
+        return dict(prior.result)
+    return None
+
+
+def screen_resume(
+    db: Session,
+    ctx: ProcessContext,
+    resume_text: str,
+    document_id: int | None = None,
+) -> Tuple[Dict[str, Any], ScreeningDecision]:
+    """
+    Screen a resume with the cheap tier first and escalate to the configured
+    GEMINI_MODEL only when the first score is near the allow threshold.
+    With a stored document_id, near-duplicates of earlier applications are
+    looked up first and handled per RESUME_DEDUP_POLICY; the result then
+    carries duplicate_of_candidate_id and duplicate_similarity.
+    The routing decision is stored for tuning; the caller should set
+    candidate_id on it once a candidate row exists.
+    """
+    record = ScreeningDecision(
+        process_id=ctx.process_id,
+        tier1_mode=settings.SCREENING_TIER1,
+        escalated=False,
+        resume_document_id=document_id,
+    )
+
+    duplicate = None
+    if document_id is not None:
+        duplicate = resume_dedup_service.find_near_duplicate(db, document_id, resume_text, ctx.process_id)
+    result = _duplicate_result(db, duplicate) if duplicate is not None else None
+    if result is not None:
+        record.tier1_mode = "duplicate"
+    else:
+        result = _screen_with_agents(ctx, resume_text, record)
+
+    record.final_score = result["match_score"]
+    record.final_decision = result["decision"]
+    record.result = dict(result)
+    if duplicate is not None:
+        record.duplicate_of_document_id = duplicate.document_id
+        record.duplicate_similarity = duplicate.similarity
+        result["duplicate_of_candidate_id"] = duplicate.candidate_id
+        result["duplicate_similarity"] = duplicate.similarity
+    db.add(record)
+    db.commit()
+
+    logger.info(
+        "Screened resume for process_id=%s tier1=%s escalated=%s score=%.1f",
+        ctx.process_id, record.tier1_mode, record.escalated, record.final_score,
+    )
+    return result, record
+
+
+def attach_candidate(db: Session, record: ScreeningDecision, candidate_id: int) -> None:
+    record.candidate_id = candidate_id
+    db.commit()
+
+
+def get_screening_stats(db: Session, process_id: int | None = None) -> Dict[str, Any]:
+    q = db.query(
+        func.count(ScreeningDecision.id),
+        func.sum(case((ScreeningDecision.escalated.is_(True), 1), else_=0)),
+        func.avg(ScreeningDecision.tier1_latency_ms),
+        func.avg(ScreeningDecision.tier2_latency_ms),
+        func.sum(ScreeningDecision.tier1_cost),
+        func.sum(ScreeningDecision.tier2_cost),
+        func.sum(case((ScreeningDecision.final_decision == "allow", 1), else_=0)),
+        func.count(ScreeningDecision.duplicate_of_document_id),
+        func.sum(case((ScreeningDecision.tier1_mode == "duplicate", 1), else_=0)),
+    )
+    if process_id is not None:
+        q = q.filter(ScreeningDecision.process_id == process_id)
+    total, escalated, t1_latency, t2_latency, t1_cost, t2_cost, allowed, duplicates, short_circuited = q.one()
+    total = total or 0
+    escalated = escalated or 0
+    return {
+        "process_id": process_id,
+        "total_screened": total,
+        "escalated": escalated,
+        "escalation_rate": escalated / total if total else 0.0,
+        "allowed": allowed or 0,
+        "avg_tier1_latency_ms": t1_latency or 0.0,
+        "avg_tier2_latency_ms": t2_latency or 0.0,
+        "tier1_cost": t1_cost or 0.0,
+        "tier2_cost": t2_cost or 0.0,
+        "allow_threshold": settings.SCREENING_ALLOW_THRESHOLD,
+        "escalation_band": settings.SCREENING_ESCALATION_BAND,
+        "duplicates": duplicates or 0,
+        "duplicates_unscreened": short_circuited or 0,
+        "dedup_policy": settings.RESUME_DEDUP_POLICY,
+    }
@@ -0,0 +1,286 @@
+import html
+import logging
+import re
+import time
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import bindparam, event, inspect as sa_inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+from models import Candidate, Evaluation, ResumeDocument
+
+logger = logging.getLogger("skillpick.search")
+
+# One row per candidate: the resume text, the screening summary and the
+# evaluation summary. SQLite uses an FTS5 table whose rowid is the
+# candidate id; PostgreSQL a plain table with a weighted tsvector and a GIN
+# index. Verdicts change in bulk (score recompute), so they are not copied
+# here but joined from the candidate's latest evaluation at query time.
+_TABLE = "candidate_search"
+
+# Relative weight of a match in each field: summaries are short and
+# deliberate, so a hit there says more than one in a long resume.
+_WEIGHTS = {"resume": 1.0, "resume_summary": 4.0, "evaluation_summary": 2.0}
+
+# Snippet highlight markers, swapped for <mark> after HTML-escaping the text
+_HL_START, _HL_END = "\x02", "\x03"
+
+_TERM_RE = re.compile(r"[\w][\w+#.-]*\*?")
+
+
+def _is_postgres(conn: Connection | None = None) -> bool:
+    return (conn.dialect if conn is not None else engine.dialect).name == "postgresql"
+
+
+def _key_column(conn: Connection) -> str:
+    return "candidate_id" if _is_postgres(conn) else "rowid"
+
+
+def ensure_search_index(force_rebuild: bool = False) -> None:
+    """
+    Create the search table if missing and rebuild it when it is out of
+    step with the candidates table (first run, or rows written in bulk),
+    or always with force_rebuild.
+    """
+    with engine.begin() as conn:
+        if _is_postgres(conn):
+            conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {_TABLE} ("
+                    "candidate_id INTEGER PRIMARY KEY REFERENCES candidates(id) ON DELETE CASCADE, "
+                    "process_id INTEGER NOT NULL, resume TEXT, resume_summary TEXT, "
+                    "evaluation_summary TEXT, document TSVECTOR NOT NULL)"
+                )
+            )
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{_TABLE}_document ON {_TABLE} USING GIN (document)"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{_TABLE}_process_id ON {_TABLE} (process_id)"))
+        else:
+            conn.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {_TABLE} USING fts5("
+                    "process_id UNINDEXED, resume, resume_summary, evaluation_summary, "
+                    "tokenize=\"porter unicode61 tokenchars '+#'\")"
+                )
+            )
+        indexed = conn.execute(text(f"SELECT COUNT(*) FROM {_TABLE}")).scalar()
+        candidates = conn.execute(text("SELECT COUNT(*) FROM candidates")).scalar()
+    if force_rebuild or indexed != candidates:
+        rebuild_index()
+
+
+def _documents(conn: Connection, candidate_ids: Iterable[int]) -> List[Any]:
+    stmt = (
+        select(
+            Candidate.id,
+            Candidate.process_id,
+            ResumeDocument.text,
+            Candidate.resume_summary,
+            Evaluation.summary,
+        )
+        .outerjoin(ResumeDocument, ResumeDocument.id == Candidate.resume_document_id)
+        .outerjoin(Evaluation, Evaluation.candidate_id == Candidate.id)
+        .where(Candidate.id.in_(list(candidate_ids)))
+        .order_by(Candidate.id, Evaluation.id)
+    )
+    # A resubmission leaves several evaluations; the latest one wins
+    return list({row[0]: row for row in conn.execute(stmt)}.values())
+
+
+def index_candidates(conn: Connection, candidate_ids: Iterable[int]) -> None:
+    """(Re)write the search rows of these candidates on the given connection."""
+    ids = list(candidate_ids)
+    if not ids:
+        return
+    rows = [
+        {"id": r[0], "process_id": r[1], "resume": r[2] or "", "resume_summary": r[3] or "", "evaluation_summary": r[4] or ""}
+        for r in _documents(conn, ids)
+    ]
+    remove_candidates(conn, ids)
+    if _is_postgres(conn):
+        insert = text(
+            f"INSERT INTO {_TABLE} (candidate_id, process_id, resume, resume_summary, evaluation_summary, document) "
+            "VALUES (:id, :process_id, :resume, :resume_summary, :evaluation_summary, "
+            "setweight(to_tsvector('english', :resume_summary), 'A') || "
+            "setweight(to_tsvector('english', :evaluation_summary), 'B') || "
+            "setweight(to_tsvector('english', :resume), 'C'))"
+        )
+    else:
+        insert = text(
+            f"INSERT INTO {_TABLE} (rowid, process_id, resume, resume_summary, evaluation_summary) "
+            "VALUES (:id, :process_id, :resume, :resume_summary, :evaluation_summary)"
+        )
+    if rows:
+        conn.execute(insert, rows)
+
+
+def remove_candidates(conn: Connection, candidate_ids: Iterable[int]) -> None:
+    stmt = text(f"DELETE FROM {_TABLE} WHERE {_key_column(conn)} IN :ids").bindparams(
+        bindparam("ids", expanding=True)
+    )
+    conn.execute(stmt, {"ids": list(candidate_ids)})
+
+
+def rebuild_index(chunk_size: int = 1000) -> int:
+    """Reindex every candidate, chunk_size per transaction. Returns the count."""
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {_TABLE}"))
+    last_id, total = 0, 0
+    while True:
+        with engine.begin() as conn:
+            ids = [
+                r[0]
+                for r in conn.execute(
+                    text("SELECT id FROM candidates WHERE id > :last ORDER BY id LIMIT :n"),
+                    {"last": last_id, "n": chunk_size},
+                )
+            ]
+            if not ids:
+                break
+            index_candidates(conn, ids)
+        last_id = ids[-1]
+        total += len(ids)
+    logger.info("Rebuilt candidate search index: %s candidates in %.1fs", total, time.perf_counter() - start)
+    return total
+
+
+# ---- keep the index in step with the ORM, inside the same transaction ----
+
+def _changed(target, *attrs: str) -> bool:
+    state = sa_inspect(target)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+@event.listens_for(Candidate, "after_insert")
+def _index_new_candidate(mapper, connection, target) -> None:
+    index_candidates(connection, [target.id])
+
+
+@event.listens_for(Candidate, "after_update")
+def _reindex_candidate(mapper, connection, target) -> None:
+    if _changed(target, "resume_document_id", "resume_summary"):
+        index_candidates(connection, [target.id])
+
+
+@event.listens_for(Candidate, "after_delete")
+def _unindex_candidate(mapper, connection, target) -> None:
+    remove_candidates(connection, [target.id])
+
+
+@event.listens_for(Evaluation, "after_insert")
+def _index_new_evaluation(mapper, connection, target) -> None:
+    index_candidates(connection, [target.candidate_id])
+
+
+@event.listens_for(Evaluation, "after_update")
+def _reindex_evaluation(mapper, connection, target) -> None:
+    if _changed(target, "summary"):
+        index_candidates(connection, [target.candidate_id])
+
+
+# ---- querying ----
+
+def _terms(query: str) -> List[str]:
+    return _TERM_RE.findall(query or "")[: settings.SEARCH_MAX_TERMS]
+
+
+def _fts5_query(terms: List[str], match_all: bool) -> str:
+    # Each term is quoted so user input can never be read as FTS5 syntax;
+    # a trailing * is kept as a prefix search.
+    parts = []
+    for term in terms:
+        prefix = term.endswith("*")
+        word = term.rstrip("*").replace('"', '""')
+        parts.append(f'"{word}"' + ("*" if prefix else ""))
+    return (" " if match_all else " OR ").join(parts)
+
+
+def _pg_query(terms: List[str], match_all: bool) -> str:
+    # websearch_to_tsquery accepts any input; "or" between words means OR
+    return (" " if match_all else " or ").join(t.rstrip("*") for t in terms)
+
+
+def _highlight(snippet: str | None) -> str:
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_HL_START, "<mark>").replace(_HL_END, "</mark>")
+
+
+def search_candidates(
+    db: Session,
+    query: str,
+    process_id: int | None = None,
+    verdict: str | None = None,
+    match_all: bool = True,
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """
+    Candidates whose resume, screening summary or evaluation summary match
+    the query terms, best first (BM25 on SQLite, ts_rank_cd on PostgreSQL),
+    each with an HTML-safe snippet where matches are wrapped in <mark>.
+    """
+    start = time.perf_counter()
+    terms = _terms(query)
+    if not terms:
+        return {"query": query, "hits": [], "took_ms": 0.0}
+
+    filters = ""
+    params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    if process_id is not None:
+        filters += " AND c.process_id = :process_id"
+        params["process_id"] = process_id
+    if verdict:
+        filters += " AND e.final_verdict = :verdict"
+        params["verdict"] = verdict
+
+    if _is_postgres(db.get_bind()):
+        params["q"] = _pg_query(terms, match_all)
+        sql = f"""
+            SELECT c.id, c.process_id, c.name, c.email, c.status, e.overall_score, e.final_verdict,
+                   ts_rank_cd(s.document, q) AS score,
+                   ts_headline('english', concat_ws(' … ', s.resume_summary, s.evaluation_summary, s.resume), q,
+                               'StartSel={_HL_START}, StopSel={_HL_END}, MaxFragments=2, MaxWords=20') AS snippet
+            FROM {_TABLE} s
+            CROSS JOIN websearch_to_tsquery('english', :q) q
+            JOIN candidates c ON c.id = s.candidate_id
+            LEFT JOIN evaluations e ON e.id = (SELECT MAX(id) FROM evaluations WHERE candidate_id = c.id)
+            WHERE s.document @@ q{filters}
+            ORDER BY score DESC, c.id
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        params["q"] = _fts5_query(terms, match_all)
+        weights = ", ".join(["0.0"] + [str(_WEIGHTS[c]) for c in ("resume", "resume_summary", "evaluation_summary")])
+        sql = f"""
+            SELECT c.id, c.process_id, c.name, c.email, c.status, e.overall_score, e.final_verdict,
+                   -bm25({_TABLE}, {weights}) AS score,
+                   snippet({_TABLE}, -1, char(2), char(3), '…', {settings.SEARCH_SNIPPET_TOKENS}) AS snippet
+            FROM {_TABLE}
+            JOIN candidates c ON c.id = {_TABLE}.rowid
+            LEFT JOIN evaluations e ON e.id = (SELECT MAX(id) FROM evaluations WHERE candidate_id = c.id)
+            WHERE {_TABLE} MATCH :q{filters}
+            ORDER BY bm25({_TABLE}, {weights}), c.id
+            LIMIT :limit OFFSET :offset
+        """
+
+    rows = db.execute(text(sql), params).all()
+    hits = [
+        {
+            "candidate_id": r[0],
+            "process_id": r[1],
+            "name": r[2],
+            "email": r[3],
+            "status": r[4],
+            "overall_score": r[5],
+            "final_verdict": r[6],
+            "score": float(r[7] or 0.0),
+            "snippet": _highlight(r[8]),
+        }
+        for r in rows
+    ]
+    took_ms = (time.perf_counter() - start) * 1000.0
+    logger.info("Search %r matched %s hits in %.1f ms", query, len(hits), took_ms)
+    return {"query": query, "hits": hits, "took_ms": took_ms}
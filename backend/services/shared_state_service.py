@@ -0,0 +1,254 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import settings
+from database import engine
+from models import SharedStateEntry
+
+logger = logging.getLogger("skillpick.shared_state")
+
+
+class MemoryBackend:
+    """Per-process state; only correct with a single worker."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+
+    def _live(self, key: str, now: float) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._live(key, time.time())
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._live(key, time.time()) or 0) + amount
+            self._data[key] = (value, None)
+            return value
+
+    def claim(self, key: str, owner: str, ttl: float) -> bool:
+        with self._lock:
+            now = time.time()
+            holder = self._live(key, now)
+            if holder is not None and holder != owner:
+                return False
+            self._data[key] = (owner, now + ttl)
+            return True
+
+    def release(self, key: str, owner: str) -> None:
+        with self._lock:
+            if self._live(key, time.time()) == owner:
+                del self._data[key]
+
+    def take_tokens(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> Tuple[bool, float]:
+        with self._lock:
+            now = time.time()
+            bucket = self._live(key, now) or {"tokens": capacity, "ts": now}
+            bucket, allowed, retry_after = _refill_and_take(bucket, now, rate, capacity, cost)
+            self._data[key] = (bucket, now + capacity / rate if rate > 0 else None)
+            return allowed, retry_after
+
+    def sweep(self, now: float) -> int:
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            return len(expired)
+
+
+class DatabaseBackend:
+    """
+    State in the shared_state table of the app database, so every worker
+    process sees the same values. Writes that read first take the write lock
+    with an upsert before reading.
+    """
+
+    def __init__(self) -> None:
+        self._table = SharedStateEntry.__table__
+        self._insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+
+    def _read(self, conn, key: str, now: float, for_update: bool = False) -> Any:
+        stmt = select(self._table.c.value, self._table.c.expires_at).where(self._table.c.key == key)
+        if for_update:
+            stmt = stmt.with_for_update()
+        row = conn.execute(stmt).first()
+        if row is None or (row.expires_at is not None and row.expires_at <= now):
+            return None
+        return json.loads(row.value) if row.value is not None else None
+
+    def _write(self, conn, key: str, value: Any, expires_at: float | None) -> None:
+        stmt = self._insert(self._table).values(key=key, value=json.dumps(value), expires_at=expires_at)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[self._table.c.key],
+                set_={"value": stmt.excluded.value, "expires_at": stmt.excluded.expires_at},
+            )
+        )
+
+    def _lock_row(self, conn, key: str) -> None:
+        # Creates the row if missing; on SQLite this also takes the write lock
+        # so the following read-modify-write cannot interleave with another worker.
+        stmt = self._insert(self._table).values(key=key, value=None, expires_at=None)
+        conn.execute(stmt.on_conflict_do_nothing(index_elements=[self._table.c.key]))
+
+    def get(self, key: str) -> Any:
+        with engine.connect() as conn:
+            return self._read(conn, key, time.time())
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        with engine.begin() as conn:
+            self._write(conn, key, value, time.time() + ttl if ttl else None)
+
+    def delete(self, key: str) -> None:
+        with engine.begin() as conn:
+            conn.execute(self._table.delete().where(self._table.c.key == key))
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with engine.begin() as conn:
+            self._lock_row(conn, key)
+            value = int(self._read(conn, key, time.time(), for_update=True) or 0) + amount
+            self._write(conn, key, value, None)
+            return value
+
+    def claim(self, key: str, owner: str, ttl: float) -> bool:
+        with engine.begin() as conn:
+            now = time.time()
+            self._lock_row(conn, key)
+            holder = self._read(conn, key, now, for_update=True)
+            if holder is not None and holder != owner:
+                return False
+            self._write(conn, key, owner, now + ttl)
+            return True
+
+    def release(self, key: str, owner: str) -> None:
+        with engine.begin() as conn:
+            self._lock_row(conn, key)
+            if self._read(conn, key, time.time(), for_update=True) == owner:
+                conn.execute(self._table.delete().where(self._table.c.key == key))
+
+    def take_tokens(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> Tuple[bool, float]:
+        with engine.begin() as conn:
+            now = time.time()
+            self._lock_row(conn, key)
+            bucket = self._read(conn, key, now, for_update=True) or {"tokens": capacity, "ts": now}
+            bucket, allowed, retry_after = _refill_and_take(bucket, now, rate, capacity, cost)
+            self._write(conn, key, bucket, now + capacity / rate if rate > 0 else None)
+            return allowed, retry_after
+
+    def sweep(self, now: float) -> int:
+        with engine.begin() as conn:
+            return conn.execute(
+                self._table.delete().where(self._table.c.expires_at.isnot(None), self._table.c.expires_at <= now)
+            ).rowcount
+
+
+def _refill_and_take(
+    bucket: Dict[str, float], now: float, rate: float, capacity: float, cost: float
+) -> Tuple[Dict[str, float], bool, float]:
+    tokens = min(capacity, bucket["tokens"] + max(0.0, now - bucket["ts"]) * rate)
+    if tokens >= cost:
+        return {"tokens": tokens - cost, "ts": now}, True, 0.0
+    retry_after = (cost - tokens) / rate if rate > 0 else float("inf")
+    return {"tokens": tokens, "ts": now}, False, retry_after
+
+
+_backend: MemoryBackend | DatabaseBackend | None = None
+_backend_lock = threading.Lock()
+_next_sweep = 0.0
+
+
+def _get_backend() -> MemoryBackend | DatabaseBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.SHARED_STATE_BACKEND == "database":
+                    _backend = DatabaseBackend()
+                else:
+                    _backend = MemoryBackend()
+                logger.info("Shared state backend: %s", type(_backend).__name__)
+    return _backend
+
+
+def get(key: str) -> Any:
+    return _get_backend().get(key)
+
+
+def put(key: str, value: Any, ttl: float | None = None) -> None:
+    _get_backend().set(key, value, ttl)
+
+
+def delete(key: str) -> None:
+    _get_backend().delete(key)
+
+
+def incr(key: str, amount: int = 1) -> int:
+    return _get_backend().incr(key, amount)
+
+
+def get_int(key: str) -> int:
+    return int(_get_backend().get(key) or 0)
+
+
+def claim(key: str, owner: str, ttl: float) -> bool:
+    """
+    Take an exclusive, expiring claim on key. True if owner now holds it
+    (including when it already did).
+    """
+    return _get_backend().claim(key, owner, ttl)
+
+
+def release(key: str, owner: str) -> None:
+    _get_backend().release(key, owner)
+
+
+def take_tokens(key: str, rate: float, capacity: float, cost: float = 1.0) -> Tuple[bool, float]:
+    """
+    Token bucket refilled at rate tokens/second up to capacity. Returns
+    (allowed, retry_after_seconds).
+    """
+    _maybe_sweep()
+    return _get_backend().take_tokens(key, rate, capacity, cost)
+
+
+def sweep_expired() -> int:
+    """Delete expired keys; reads already ignore them. Returns the number deleted."""
+    deleted = _get_backend().sweep(time.time())
+    if deleted:
+        logger.info("Swept %s expired shared state keys", deleted)
+    return deleted
+
+
+def _maybe_sweep() -> None:
+    # Rate-limit buckets are keyed by client address and never read again
+    # once a client goes away, so without this they accumulate forever
+    global _next_sweep
+    now = time.time()
+    with _backend_lock:
+        if now < _next_sweep:
+            return
+        _next_sweep = now + settings.SHARED_STATE_SWEEP_SECONDS
+    sweep_expired()
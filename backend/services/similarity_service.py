@@ -0,0 +1,301 @@
+import logging
+import threading
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import Candidate, HiringProcess, ResumeDocument
+from services import shared_state_service
+from utils.embeddings import chunk_text, get_embedder, tokenize
+
+logger = logging.getLogger("skillpick.similarity")
+
+# A JD skill counts as "matched" when its words appear in the resume as a
+# phrase. Embedding similarity of a one- or two-word skill to a resume chunk
+# is no test: with the hashing vectorizer it sits at collision noise, and
+# unrelated resumes "matched" a third of a JD's skills.
+_SKILL_PHRASE_TOKENS = 3
+
+
+def _phrases(text: str) -> FrozenSet[str]:
+    """Every run of up to _SKILL_PHRASE_TOKENS tokens in the text."""
+    tokens = tokenize(text)
+    return frozenset(
+        " ".join(tokens[i : i + n]) for n in range(1, _SKILL_PHRASE_TOKENS + 1) for i in range(len(tokens) - n + 1)
+    )
+
+
+def _skill_present(skill: str, phrases: FrozenSet[str]) -> bool:
+    # Longer skills match when every run of _SKILL_PHRASE_TOKENS of their words does
+    tokens = tokenize(skill)
+    if not tokens:
+        return False
+    n = min(len(tokens), _SKILL_PHRASE_TOKENS)
+    return all(" ".join(tokens[i : i + n]) in phrases for i in range(len(tokens) - n + 1))
+
+
+def matched_skills(resume_text: str, skills: List[str]) -> List[str]:
+    phrases = _phrases(resume_text)
+    return [s for s in skills if s and _skill_present(s, phrases)]
+
+
+class VectorIndex:
+    """
+    Numpy-backed vector index over unit-normalized rows, each tagged with an
+    owner id. "brute" keeps float32 rows and scans them all; "ivf" keeps int8
+    quantized rows, clusters them with k-means once large enough, and only
+    scans the closest lists for each query.
+    """
+
+    def __init__(self, dim: int, mode: str = "brute", n_lists: int = 64, n_probes: int = 8) -> None:
+        self.dim = dim
+        self.mode = mode
+        self.n_lists = n_lists
+        self.n_probes = n_probes
+        self._size = 0
+        self._owners = np.zeros(0, dtype=np.int64)
+        if mode == "ivf":
+            self._codes = np.zeros((0, dim), dtype=np.int8)
+            self._scales = np.zeros(0, dtype=np.float32)
+        else:
+            self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._centroids: np.ndarray | None = None
+        self._assign = np.zeros(0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._owners)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+
+        def _resize(arr: np.ndarray) -> np.ndarray:
+            out = np.zeros((new_capacity,) + arr.shape[1:], dtype=arr.dtype)
+            out[: self._size] = arr[: self._size]
+            return out
+
+        self._owners = _resize(self._owners)
+        self._assign = _resize(self._assign)
+        if self.mode == "ivf":
+            self._codes = _resize(self._codes)
+            self._scales = _resize(self._scales)
+        else:
+            self._vectors = _resize(self._vectors)
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _rows(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        end = self._size if end is None else end
+        if self.mode == "ivf":
+            return self._codes[start:end].astype(np.float32) * self._scales[start:end, None]
+        return self._vectors[start:end]
+
+    def add(self, owner: int, vectors: np.ndarray) -> None:
+        n = len(vectors)
+        if n == 0:
+            return
+        self._grow(n)
+        start, end = self._size, self._size + n
+        self._owners[start:end] = owner
+        if self.mode == "ivf":
+            codes, scales = self._quantize(vectors)
+            self._codes[start:end] = codes
+            self._scales[start:end] = scales
+        else:
+            self._vectors[start:end] = vectors
+        self._size = end
+
+        if self.mode == "ivf":
+            if self._centroids is not None:
+                self._assign[start:end] = np.argmax(vectors @ self._centroids.T, axis=1)
+            elif self._size >= self.n_lists * 16:
+                self._train()
+
+    def _train(self, iterations: int = 8) -> None:
+        rows = self._rows()
+        rng = np.random.default_rng(0)
+        centroids = rows[rng.choice(len(rows), self.n_lists, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(rows @ centroids.T, axis=1)
+            for k in range(self.n_lists):
+                members = rows[assign == k]
+                if len(members):
+                    c = members.mean(axis=0)
+                    centroids[k] = c / (np.linalg.norm(c) or 1.0)
+        self._centroids = centroids.astype(np.float32)
+        self._assign[: self._size] = np.argmax(rows @ self._centroids.T, axis=1)
+        logger.info("Trained IVF index with %s lists over %s vectors", self.n_lists, self._size)
+
+    def similarities(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (row_owners, sims) where sims[i, j] is the similarity of
+        scanned row i to query j. In IVF mode only probed lists are scanned.
+        """
+        if self._size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, len(queries)), dtype=np.float32)
+
+        if self.mode == "ivf" and self._centroids is not None:
+            probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, : self.n_probes]
+            mask = np.isin(self._assign[: self._size], np.unique(probes))
+            idx = np.nonzero(mask)[0]
+            rows = self._codes[idx].astype(np.float32) * self._scales[idx, None]
+            return self._owners[idx], rows @ queries.T
+
+        return self._owners[: self._size], self._rows() @ queries.T
+
+
+class CandidateSimilarityIndex:
+    """
+    Process-wide index of resume chunks for all candidates, built lazily from
+    the DB and updated incrementally as candidates register. Candidates added
+    by other workers are loaded when the shared "similarity_index" epoch moves.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._epoch: int | None = None
+        self._max_id = 0
+        self._index: VectorIndex | None = None
+        self._process_of: Dict[int, int] = {}
+
+    def _new_index(self) -> VectorIndex:
+        return VectorIndex(
+            dim=get_embedder().dim,
+            mode=settings.SIMILARITY_INDEX_MODE,
+            n_lists=settings.SIMILARITY_IVF_LISTS,
+            n_probes=settings.SIMILARITY_IVF_PROBES,
+        )
+
+    def _add_locked(self, candidate_id: int, process_id: int, resume_text: str | None) -> None:
+        chunks = chunk_text(resume_text or "")
+        if not chunks:
+            return
+        self._index.add(candidate_id, get_embedder().embed(chunks))
+        self._process_of[candidate_id] = process_id
+
+    def ensure_loaded(self, db: Session) -> None:
+        epoch = shared_state_service.get_int(_EPOCH_KEY)
+        if self._epoch == epoch:
+            return
+        with self._lock:
+            if self._epoch == epoch:
+                return
+            if self._index is None:
+                self._index = self._new_index()
+            rows = (
+                db.query(Candidate.id, Candidate.process_id, ResumeDocument.text)
+                .join(ResumeDocument, Candidate.resume_document_id == ResumeDocument.id)
+                .filter(Candidate.id > self._max_id)
+                .order_by(Candidate.id)
+                .yield_per(500)
+            )
+            for candidate_id, process_id, resume_text in rows:
+                if candidate_id not in self._process_of:
+                    self._add_locked(candidate_id, process_id, resume_text)
+                self._max_id = max(self._max_id, candidate_id)
+            self._loaded = True
+            self._epoch = epoch
+            logger.info("Similarity index holds %s chunks", len(self._index))
+
+    def add_candidate(self, candidate_id: int, process_id: int, resume_text: str | None) -> None:
+        # Before the first load the DB scan will pick the candidate up anyway.
+        if self._loaded:
+            with self._lock:
+                if candidate_id not in self._process_of:
+                    self._add_locked(candidate_id, process_id, resume_text)
+        shared_state_service.incr(_EPOCH_KEY)
+
+    def rank(
+        self,
+        skills: List[str],
+        limit: int,
+        process_id: int | None = None,
+    ) -> List[Dict[str, Any]]:
+        if not skills or self._index is None:
+            return []
+        queries = get_embedder().embed(skills)
+        # Registrations add to both the index and _process_of under the lock
+        with self._lock:
+            owners, sims = self._index.similarities(queries)
+            process_of = dict(self._process_of)
+        if process_id is not None and len(owners):
+            allowed = [cid for cid, pid in process_of.items() if pid == process_id]
+            keep = np.isin(owners, np.array(allowed, dtype=np.int64))
+            owners, sims = owners[keep], sims[keep]
+        if len(owners) == 0:
+            return []
+
+        unique_owners, inverse = np.unique(owners, return_inverse=True)
+        best = np.zeros((len(unique_owners), len(skills)), dtype=np.float32)
+        np.maximum.at(best, inverse, sims)
+        scores = best.mean(axis=1)
+
+        top = np.argsort(-scores)[:limit]
+        return [
+            {
+                "candidate_id": int(unique_owners[i]),
+                "process_id": process_of.get(int(unique_owners[i])),
+                "similarity": float(scores[i]),
+            }
+            for i in top
+        ]
+
+
+_EPOCH_KEY = "similarity_index"
+_index = CandidateSimilarityIndex()
+
+
+def add_candidate(candidate_id: int, process_id: int, resume_text: str | None) -> None:
+    _index.add_candidate(candidate_id, process_id, resume_text)
+
+
+def rank_candidates_for_process(
+    db: Session,
+    process: HiringProcess,
+    limit: int = 50,
+    same_process_only: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Rank candidates in the DB by resume similarity to the process JD skills.
+    """
+    _index.ensure_loaded(db)
+    skills = list(dict.fromkeys((process.jd_skills or []) + (process.jd_tech_stack or [])))
+    ranked = _index.rank(skills, limit, process.id if same_process_only else None)
+
+    ids = [r["candidate_id"] for r in ranked]
+    people = {
+        c.id: c
+        for c in db.query(Candidate.id, Candidate.name, Candidate.email, Candidate.status, ResumeDocument.text)
+        .outerjoin(ResumeDocument, Candidate.resume_document_id == ResumeDocument.id)
+        .filter(Candidate.id.in_(ids))
+        .all()
+    }
+    for r in ranked:
+        c = people.get(r["candidate_id"])
+        r["name"] = c.name if c else ""
+        r["email"] = c.email if c else ""
+        r["status"] = c.status if c else ""
+        r["matched_skills"] = matched_skills(c.text or "", skills) if c else []
+    return ranked
+
+
+def score_resume_skills(resume_text: str, skills: List[str]) -> Tuple[float, List[str]]:
+    """
+    Local, index-free pre-score: share of JD skills named in the resume,
+    plus the matched skills.
+    """
+    skills = [s for s in skills if s]
+    if not skills:
+        return 0.0, []
+    matched = matched_skills(resume_text, skills)
+    return len(matched) / len(skills), matched
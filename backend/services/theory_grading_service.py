@@ -0,0 +1,157 @@
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from utils.embeddings import get_embedder, tokenize
+
+logger = logging.getLogger("skillpick.theory_grading")
+
+_stats_lock = threading.Lock()
+_stats = {"local_pass": 0, "local_fail": 0, "escalated": 0, "no_reference": 0}
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be been being but by can could do does for from had has have how i if in into is it
+    its it's may might more most must no not of on or our should so such than that the their them then there
+    these they this those to too use used uses using very was we were what when where which while who why
+    will with would you your also just like one other same some only each both any all about because
+    """.split()
+)
+_SUFFIXES = ("ing", "ion", "ies", "ed", "es", "ly", "s", "e")
+
+
+def _bump(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+def _stem(token: str) -> str:
+    # Crude, but enough for "caching"/"cache"/"caches" to meet
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[: -len(suffix)]
+    return token
+
+
+def _content_terms(text: str) -> List[str]:
+    return [_stem(t) for t in tokenize(text) if t not in _STOPWORDS]
+
+
+def key_points(question: Dict[str, Any]) -> List[str]:
+    points = question.get("key_points")
+    if not isinstance(points, list):
+        return []
+    return [str(p).strip() for p in points if str(p).strip()]
+
+
+def has_reference(question: Dict[str, Any]) -> bool:
+    return bool(str(question.get("reference_answer") or "").strip()) and bool(key_points(question))
+
+
+@dataclass(frozen=True)
+class LocalGrade:
+    score: float
+    # "pass" or "fail" when the score is clear enough to skip the LLM, else None
+    decision: Optional[str]
+    covered: List[str]
+    missing: List[str]
+    reference_similarity: float
+
+
+def grade(question: Dict[str, Any], answer: str) -> LocalGrade:
+    """
+    Score an answer on key-point coverage and similarity to the reference
+    answer. A key point counts as covered when most of its content words
+    appear in the answer, or when one answer sentence embeds close to it.
+    """
+    points = key_points(question)
+    reference = str(question.get("reference_answer") or "")
+    sentences = [s for s in _SENTENCE_RE.split(answer or "") if _content_terms(s)]
+
+    # One embedding pass over stopword-free text: answer, reference, key points, sentences
+    texts = [" ".join(_content_terms(t)) for t in [answer, reference, *points, *sentences]]
+    vectors = get_embedder().embed(texts)
+    answer_vec, reference_vec = vectors[0], vectors[1]
+    point_vecs = vectors[2 : 2 + len(points)]
+    sentence_vecs = vectors[2 + len(points) :]
+    reference_similarity = max(float(answer_vec @ reference_vec), 0.0)
+
+    answer_terms = set(_content_terms(answer))
+    match = settings.THEORY_LOCAL_KEY_POINT_MATCH
+    covered, missing, credit = [], [], []
+    for point, point_vec in zip(points, point_vecs):
+        terms = set(_content_terms(point))
+        recall = len(terms & answer_terms) / len(terms) if terms else 0.0
+        closest = float(np.max(sentence_vecs @ point_vec)) if len(sentence_vecs) else 0.0
+        strength = max(recall, closest)
+        credit.append(min(strength / match, 1.0))
+        (covered if strength >= match else missing).append(point)
+
+    coverage = sum(credit) / len(credit) if credit else 0.0
+    weight = settings.THEORY_LOCAL_KEY_POINT_WEIGHT
+    similarity_credit = min(reference_similarity / settings.THEORY_LOCAL_REFERENCE_MATCH, 1.0)
+    score = 100.0 * (weight * coverage + (1 - weight) * similarity_credit)
+
+    words = len(tokenize(answer))
+    decision = None
+    if (
+        score <= settings.THEORY_LOCAL_FAIL_BELOW
+        # A longer answer may be right in other words than the reference
+        and words < settings.THEORY_LOCAL_FAIL_MAX_WORDS
+    ):
+        decision = "fail"
+    elif (
+        score >= settings.THEORY_LOCAL_PASS_ABOVE
+        # A bare list of key phrases is not an explanation
+        and words >= settings.THEORY_LOCAL_PASS_MIN_WORDS
+    ):
+        decision = "pass"
+    return LocalGrade(
+        score=score, decision=decision, covered=covered, missing=missing, reference_similarity=reference_similarity
+    )
+
+
+def _feedback(result: LocalGrade) -> str:
+    total = len(result.covered) + len(result.missing)
+    feedback = f"Covers {len(result.covered)} of {total} key points."
+    if result.missing:
+        feedback += " Missing: " + "; ".join(result.missing) + "."
+    return feedback
+
+
+def grade_or_escalate(question: Dict[str, Any], answer: str) -> Optional[Dict[str, Any]]:
+    """
+    Grading for a clear pass or clear fail, or None when the answer should
+    go to the LLM: the local score falls in the uncertain band, or the
+    question has no reference answer (questions generated before they had one).
+    """
+    if not settings.THEORY_LOCAL_GRADING:
+        return None
+    if not has_reference(question):
+        _bump("no_reference")
+        return None
+    result = grade(question, answer)
+    if result.decision is None:
+        _bump("escalated")
+        return None
+    _bump(f"local_{result.decision}")
+    return {
+        "question_id": question.get("id"),
+        "score": round(result.score, 1),
+        "feedback": _feedback(result),
+        "local": result.decision,
+    }
+
+
+def get_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    graded = stats["local_pass"] + stats["local_fail"] + stats["escalated"]
+    stats["local_rate"] = (stats["local_pass"] + stats["local_fail"]) / graded if graded else 0.0
+    return stats
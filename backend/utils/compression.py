@@ -0,0 +1,207 @@
+"""
+Transparent compression for large text and JSON columns.
+
+Stored values start with a NUL byte, which never occurs in the plain text
+or JSON written before compression was introduced, so legacy rows are read
+as-is until the recompress migration rewrites them:
+
+    \\x00\\x00 <bytes>                  stored uncompressed (too small to gain)
+    \\x00\\x01 <zlib>                   zlib
+    \\x00\\x02 <dict id: u16> <zlib>    zlib with a preset dictionary
+
+Preset dictionaries are trained from stored rows (train_dictionary) and kept
+in the compression_dictionaries table. Writes use the newest dictionary for
+the column's dictionary name; reads look the blob's dictionary up by id, so
+retraining never breaks existing rows.
+"""
+import logging
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import orjson
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from config import settings
+
+logger = logging.getLogger("skillpick.compression")
+
+_STORED = b"\x00\x00"
+_ZLIB = b"\x00\x01"
+_ZLIB_DICT = b"\x00\x02"
+
+# zlib only looks back 32 KiB, so a longer preset dictionary is wasted.
+MAX_DICTIONARY_BYTES = 32 * 1024
+
+
+class DictionaryRegistry:
+    """
+    Preset dictionaries by id, loaded lazily from the database. An unknown
+    id triggers a reload, so dictionaries trained by another process are
+    picked up on first read.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_id: Dict[int, bytes] = {}
+        self._active: Dict[str, Tuple[int, bytes]] = {}
+
+    def _load(self) -> None:
+        from database import engine
+        from sqlalchemy import text
+
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    text("SELECT id, name, data FROM compression_dictionaries ORDER BY id")
+                ).all()
+        except Exception:  # noqa: BLE001 - table not created yet
+            rows = []
+        self._by_id = {row[0]: bytes(row[2]) for row in rows}
+        self._active = {row[1]: (row[0], bytes(row[2])) for row in rows}
+        self._loaded = True
+
+    def reload(self) -> None:
+        with self._lock:
+            self._load()
+
+    def get(self, dict_id: int) -> bytes:
+        with self._lock:
+            if not self._loaded or dict_id not in self._by_id:
+                self._load()
+            if dict_id not in self._by_id:
+                raise ValueError(f"Unknown compression dictionary id {dict_id}")
+            return self._by_id[dict_id]
+
+    def active(self, name: str) -> Optional[Tuple[int, bytes]]:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return self._active.get(name)
+
+
+registry = DictionaryRegistry()
+
+
+def compress(data: bytes, dictionary: Optional[str] = None) -> bytes:
+    if len(data) < settings.COMPRESSION_MIN_BYTES:
+        return _STORED + data
+    active = registry.active(dictionary) if dictionary else None
+    if active is not None:
+        dict_id, zdict = active
+        co = zlib.compressobj(settings.COMPRESSION_LEVEL, zdict=zdict)
+        body = _ZLIB_DICT + dict_id.to_bytes(2, "big") + co.compress(data) + co.flush()
+    else:
+        body = _ZLIB + zlib.compress(data, settings.COMPRESSION_LEVEL)
+    return body if len(body) < len(data) + 2 else _STORED + data
+
+
+def decompress(blob: bytes) -> bytes:
+    header = blob[:2]
+    if header == _STORED:
+        return blob[2:]
+    if header == _ZLIB:
+        return zlib.decompress(blob[2:])
+    if header == _ZLIB_DICT:
+        zdict = registry.get(int.from_bytes(blob[2:4], "big"))
+        do = zlib.decompressobj(zdict=zdict)
+        return do.decompress(blob[4:]) + do.flush()
+    raise ValueError("Unknown compressed value header")
+
+
+def is_compressed(value: Any) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:1]) == b"\x00"
+
+
+def serialize_json(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _legacy_bytes(value: Any) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else bytes(value)
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored compressed; reads plain-text legacy rows too."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dictionary: Optional[str] = None) -> None:
+        super().__init__()
+        self.dictionary = dictionary
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress(value.encode("utf-8"), self.dictionary)
+
+    def process_result_value(self, value: Any, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        if not is_compressed(value):
+            return _legacy_bytes(value).decode("utf-8")
+        return decompress(bytes(value)).decode("utf-8")
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON column stored compressed; reads plain JSON legacy rows too."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dictionary: Optional[str] = None) -> None:
+        super().__init__()
+        self.dictionary = dictionary
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress(serialize_json(value), self.dictionary)
+
+    def process_result_value(self, value: Any, dialect) -> Any:
+        if value is None:
+            return None
+        if isinstance(value, (dict, list)):  # legacy JSON column already decoded by the driver
+            return value
+        if not is_compressed(value):
+            return orjson.loads(_legacy_bytes(value))
+        return orjson.loads(decompress(bytes(value)))
+
+
+_DICT_TOKEN_RE = re.compile(r'"[^"\\]{1,64}"\s*:\s*|"[^"\\]{1,32}"|[A-Za-z][\w\'-]{3,}[ ,.]?')
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = MAX_DICTIONARY_BYTES) -> bytes:
+    """
+    Build a zlib preset dictionary from sample values: the substrings (JSON
+    keys, short string values, words) that appear in the most samples,
+    weighted by length. The most valuable ones go last, closest to the data,
+    where back-references are cheapest.
+    """
+    doc_freq: Counter = Counter()
+    n = 0
+    for sample in samples:
+        n += 1
+        doc_freq.update(set(_DICT_TOKEN_RE.findall(sample.decode("utf-8", errors="ignore"))))
+    if not n:
+        return b""
+
+    # Ignore one-offs: a substring must recur to be worth dictionary space
+    scored = sorted(
+        ((count * len(token.encode("utf-8")), token) for token, count in doc_freq.items() if count > 1),
+        reverse=True,
+    )
+    picked = []
+    used = 0
+    for _, token in scored:
+        encoded = token.encode("utf-8")
+        if used + len(encoded) > size:
+            continue
+        picked.append(encoded)
+        used += len(encoded)
+    return b"".join(reversed(picked))
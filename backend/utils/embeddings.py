@@ -0,0 +1,89 @@
+import logging
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Protocol
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger("skillpick.embeddings")
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t.rstrip(".") for t in _TOKEN_RE.findall((text or "").lower())]
+
+
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder:
+    """
+    Signed feature-hashing vectorizer over word unigrams and bigrams.
+    Fully local and deterministic across processes (crc32, not hash()).
+    """
+
+    def __init__(self, dim: int = 512) -> None:
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        bigrams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return tokens + bigrams
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                out[row, h % self.dim] += sign
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class SentenceTransformerEmbedder:
+    """
+    Wraps a locally stored sentence-transformers model. Never downloads.
+    """
+
+    def __init__(self, model_path: str) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_path, local_files_only=True)
+        self.dim = int(self._model.get_sentence_embedding_dimension())
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self._model.encode(texts, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+@lru_cache(maxsize=1)
+def get_embedder() -> Embedder:
+    if settings.EMBEDDING_BACKEND == "sentence_transformers" and settings.EMBEDDING_MODEL:
+        try:
+            return SentenceTransformerEmbedder(settings.EMBEDDING_MODEL)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Local embedding model unavailable, using hashing vectorizer: %s", e)
+    return HashingEmbedder(settings.EMBEDDING_DIM)
+
+
+def chunk_text(text: str, words_per_chunk: int = 80, overlap: int = 20) -> List[str]:
+    words = (text or "").split()
+    if not words:
+        return []
+    step = max(words_per_chunk - overlap, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start : start + words_per_chunk]))
+        if start + words_per_chunk >= len(words):
+            break
+    return chunks
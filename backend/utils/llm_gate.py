@@ -0,0 +1,405 @@
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger("skillpick.llm_gate")
+
+# Lower rank is served first.
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+class LLMOverloaded(Exception):
+    """Raised when an LLM call cannot get a slot before its deadline; maps to HTTP 503."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Scope:
+    """Who an LLM call is made for and how urgently; set per request or job."""
+
+    process_id: Optional[int] = None
+    weight: float = 1.0
+    priority: str = "batch"
+    max_wait: Optional[float] = None  # seconds each call may wait for a slot; None waits indefinitely
+
+
+_scope: contextvars.ContextVar[Scope] = contextvars.ContextVar("llm_scope", default=Scope())
+
+
+@contextmanager
+def llm_scope(
+    process_id: int | None,
+    weight: float = 1.0,
+    priority: str = "batch",
+    deadline_seconds: float | None = None,
+):
+    """
+    Every LLM call made inside the block is scheduled for this process at
+    this priority, and must get a slot within deadline_seconds of asking for
+    one. The deadline is per call: a request that fans out into many calls
+    is not cut short by the time its earlier calls took.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    token = _scope.set(
+        Scope(process_id=process_id, weight=max(weight, 0.01), priority=priority, max_wait=deadline_seconds)
+    )
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def bind_scope(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Carry the caller's scope into a worker thread. Thread pools do not
+    propagate context variables on their own.
+    """
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+@dataclass
+class _Waiter:
+    scope: Scope
+    enqueued_at: float
+    deadline: Optional[float]  # time.monotonic() value
+    granted: bool = False
+
+
+@dataclass
+class _ClassStats:
+    admitted: int = 0
+    queued: int = 0
+    deadline_misses: int = 0
+    shed: int = 0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    def percentile(self, q: float) -> float:
+        if not self.waits:
+            return 0.0
+        ordered = sorted(self.waits)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# Provider errors that mean "slow down", matched by name so the Gemini SDK
+# does not have to be imported here.
+_THROTTLE_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+_TIMEOUT_ERRORS = {"DeadlineExceeded", "ServiceUnavailable", "GatewayTimeout", "TimeoutError", "ReadTimeout"}
+
+
+def classify_error(exc: BaseException) -> Optional[str]:
+    """Return "throttled" or "timeout" for provider back-pressure errors, else None."""
+    for cls in type(exc).__mro__:
+        if cls.__name__ in _THROTTLE_ERRORS:
+            return "throttled"
+        if cls.__name__ in _TIMEOUT_ERRORS:
+            return "timeout"
+    if getattr(exc, "code", None) == 429 or getattr(exc, "status_code", None) == 429:
+        return "throttled"
+    return None
+
+
+@dataclass
+class _LimitChange:
+    at: float  # time.time()
+    old: int
+    new: int
+    reason: str
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit for calls to the LLM provider.
+
+    While the limit is actually in use, every successful call raises it by
+    1/limit (about +1 per round of calls). It is cut by LLM_ADAPTIVE_BACKOFF
+    when the provider throttles or times out, or when recent latency rises
+    above LLM_ADAPTIVE_LATENCY_TOLERANCE times the no-load baseline. Cuts are
+    at most one per LLM_ADAPTIVE_COOLDOWN_SECONDS, so a burst of 429s from a
+    single overload only backs off once. Not thread-safe; the gate calls it
+    under its lock.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.value = float(min(max(initial, self.minimum), self.maximum))
+        self._baseline_s: float | None = None
+        self._recent_s: float | None = None
+        self._last_cut = 0.0
+        self.changes: Dict[str, int] = {}
+        self.history: Deque[_LimitChange] = deque(maxlen=50)
+
+    @property
+    def current(self) -> int:
+        return int(self.value)
+
+    def _set(self, value: float, reason: str) -> None:
+        old = self.current
+        self.value = min(max(value, float(self.minimum)), float(self.maximum))
+        if self.current != old:
+            self.changes[reason] = self.changes.get(reason, 0) + 1
+            self.history.append(_LimitChange(at=time.time(), old=old, new=self.current, reason=reason))
+            logger.info("LLM concurrency limit %s -> %s (%s)", old, self.current, reason)
+
+    def _cut(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_cut < settings.LLM_ADAPTIVE_COOLDOWN_SECONDS:
+            return
+        self._last_cut = now
+        self._set(self.value * settings.LLM_ADAPTIVE_BACKOFF, reason)
+
+    def on_success(self, latency_s: float, saturated: bool) -> None:
+        # Baseline follows drops immediately and rises only slowly, so it
+        # approximates the provider's latency when it is not overloaded.
+        if self._baseline_s is None or latency_s < self._baseline_s:
+            self._baseline_s = latency_s
+        else:
+            self._baseline_s += 0.01 * (latency_s - self._baseline_s)
+        self._recent_s = latency_s if self._recent_s is None else 0.7 * self._recent_s + 0.3 * latency_s
+
+        if self._recent_s > settings.LLM_ADAPTIVE_LATENCY_TOLERANCE * self._baseline_s:
+            self._cut("latency")
+        elif saturated:
+            self._set(self.value + 1.0 / self.value, "probe")
+
+    def on_error(self, kind: str) -> None:
+        self._cut(kind)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.current,
+            "limit_min": self.minimum,
+            "limit_max": self.maximum,
+            "baseline_latency_ms": (self._baseline_s or 0.0) * 1000.0,
+            "recent_latency_ms": (self._recent_s or 0.0) * 1000.0,
+            "limit_changes": dict(self.changes),
+            "recent_limit_changes": [vars(c) for c in self.history],
+        }
+
+
+class LLMGate:
+    """
+    Schedules this worker's LLM calls onto its share of LLM_MAX_CONCURRENCY.
+
+    When a slot frees up it goes to the waiter with, in order: the best
+    priority class after aging (a waiter moves up one class for every
+    LLM_AGING_SECONDS it has waited, so batch work cannot starve), the fewest
+    in-flight calls for its hiring process per unit of weight, the earliest
+    deadline, then the longest wait. Batch calls never take the last
+    LLM_INTERACTIVE_RESERVE slots, so interactive calls find one free quickly.
+    Waiters whose deadline passes are dropped with LLMOverloaded.
+
+    With an AdaptiveLimit the number of slots follows the provider's
+    latency and throttling instead of staying at a fixed capacity.
+
+    Each worker has its own gate: the ordering above (including the fair
+    share between hiring processes) and the adaptive limit only see that
+    worker's calls.
+    """
+
+    def __init__(self, capacity: int, limiter: AdaptiveLimit | None = None) -> None:
+        self._capacity = capacity
+        self.limiter = limiter
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._in_flight_by_class: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._in_flight_by_process: Dict[Any, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._classes: Dict[str, _ClassStats] = {p: _ClassStats() for p in PRIORITIES}
+        self._latency_ewma_s = 2.0
+
+    @property
+    def capacity(self) -> int:
+        return self.limiter.current if self.limiter is not None else self._capacity
+
+    @capacity.setter
+    def capacity(self, value: int) -> None:
+        self._capacity = value
+        self.limiter = None
+
+    # -- scheduling ------------------------------------------------------
+
+    def _effective_rank(self, waiter: _Waiter, now: float) -> int:
+        aged = int((now - waiter.enqueued_at) / settings.LLM_AGING_SECONDS) if settings.LLM_AGING_SECONDS > 0 else 0
+        return max(0, PRIORITIES[waiter.scope.priority] - aged)
+
+    def _limit_for(self, waiter: _Waiter, now: float) -> int:
+        if self._effective_rank(waiter, now) == 0:
+            return self.capacity
+        return max(1, self.capacity - settings.LLM_INTERACTIVE_RESERVE)
+
+    def _order_key(self, waiter: _Waiter, now: float):
+        scope = waiter.scope
+        return (
+            self._effective_rank(waiter, now),
+            self._in_flight_by_process.get(scope.process_id, 0) / scope.weight,
+            waiter.deadline if waiter.deadline is not None else math.inf,
+            waiter.enqueued_at,
+        )
+
+    def _grant_next(self) -> None:
+        now = time.monotonic()
+        for waiter in sorted(self._waiters, key=lambda w: self._order_key(w, now)):
+            if self._in_flight >= self.capacity:
+                break
+            if self._in_flight >= self._limit_for(waiter, now):
+                continue
+            self._waiters.remove(waiter)
+            self._take(waiter.scope, now - waiter.enqueued_at)
+            waiter.granted = True
+        self._cond.notify_all()
+
+    def _take(self, scope: Scope, waited_s: float) -> None:
+        self._in_flight += 1
+        self._in_flight_by_class[scope.priority] += 1
+        self._in_flight_by_process[scope.process_id] = self._in_flight_by_process.get(scope.process_id, 0) + 1
+        stats = self._classes[scope.priority]
+        stats.admitted += 1
+        stats.waits.append(waited_s)
+
+    def _waiting_ahead(self, priority: str) -> int:
+        rank = PRIORITIES[priority]
+        return sum(1 for w in self._waiters if PRIORITIES[w.scope.priority] <= rank)
+
+    def retry_after(self, priority: str = "interactive") -> float:
+        # Expected time for the work queued at or above this priority to drain.
+        backlog = (self._waiting_ahead(priority) + 1) / max(self.capacity, 1)
+        return max(1.0, math.ceil(backlog * self._latency_ewma_s))
+
+    # -- public API ------------------------------------------------------
+
+    def check_admission(self, priority: str = "interactive") -> None:
+        """Shed new work up front when its priority class is already backed up."""
+        with self._cond:
+            if self._waiting_ahead(priority) >= settings.LLM_MAX_WAITING:
+                self._classes[priority].shed += 1
+                raise LLMOverloaded("LLM capacity exhausted", self.retry_after(priority))
+
+    def _missed(self, waiter: _Waiter) -> LLMOverloaded:
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        self._classes[waiter.scope.priority].deadline_misses += 1
+        return LLMOverloaded("Deadline passed waiting for LLM capacity", self.retry_after(waiter.scope.priority))
+
+    def acquire(self, scope: Scope) -> None:
+        with self._cond:
+            now = time.monotonic()
+            deadline = None if scope.max_wait is None else now + scope.max_wait
+            waiter = _Waiter(scope=scope, enqueued_at=now, deadline=deadline)
+            if deadline is not None and deadline <= now:
+                raise self._missed(waiter)
+            if not self._waiters and self._in_flight < self._limit_for(waiter, now):
+                self._take(scope, 0.0)
+                return
+            self._waiters.append(waiter)
+            self._classes[scope.priority].queued += 1
+            self._grant_next()
+            while not waiter.granted:
+                # Wake up periodically so aging can promote waiting batch work.
+                timeout = settings.LLM_AGING_SECONDS or None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._missed(waiter)
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                self._cond.wait(timeout)
+                if not waiter.granted:
+                    self._grant_next()
+
+    def release(self, scope: Scope, latency_s: float, error: BaseException | None = None) -> None:
+        with self._cond:
+            if self.limiter is not None:
+                kind = classify_error(error) if error is not None else None
+                if kind is not None:
+                    self.limiter.on_error(kind)
+                elif error is None:
+                    # Only probe upwards when the current limit is the bottleneck
+                    saturated = self._in_flight + len(self._waiters) >= self.limiter.current
+                    self.limiter.on_success(latency_s, saturated)
+            self._in_flight -= 1
+            self._in_flight_by_class[scope.priority] -= 1
+            self._in_flight_by_process[scope.process_id] -= 1
+            if not self._in_flight_by_process[scope.process_id]:
+                del self._in_flight_by_process[scope.process_id]
+            if error is None:
+                self._latency_ewma_s = 0.8 * self._latency_ewma_s + 0.2 * latency_s
+            self._grant_next()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = {
+                "capacity": self.capacity,
+                "workers": settings.WEB_WORKERS,
+                "adaptive": self.limiter is not None,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "latency_ewma_ms": self._latency_ewma_s * 1000.0,
+                "classes": {
+                    name: {
+                        "in_flight": self._in_flight_by_class[name],
+                        "waiting": sum(1 for w in self._waiters if w.scope.priority == name),
+                        "admitted": c.admitted,
+                        "queued": c.queued,
+                        "deadline_misses": c.deadline_misses,
+                        "shed": c.shed,
+                        "wait_p50_ms": c.percentile(0.50) * 1000.0,
+                        "wait_p95_ms": c.percentile(0.95) * 1000.0,
+                    }
+                    for name, c in self._classes.items()
+                },
+                "in_flight_by_process": {str(k): v for k, v in self._in_flight_by_process.items()},
+            }
+            if self.limiter is not None:
+                stats.update(self.limiter.stats())
+            return stats
+
+
+def worker_share(limit: int) -> int:
+    """This worker's part of a deployment-wide concurrency limit."""
+    return max(1, limit // max(settings.WEB_WORKERS, 1))
+
+
+if settings.WEB_WORKERS > settings.LLM_MAX_CONCURRENCY:
+    logger.warning(
+        "%s workers share LLM_MAX_CONCURRENCY=%s; each still gets one slot",
+        settings.WEB_WORKERS, settings.LLM_MAX_CONCURRENCY,
+    )
+
+gate = LLMGate(
+    worker_share(settings.LLM_MAX_CONCURRENCY),
+    limiter=AdaptiveLimit(
+        initial=worker_share(settings.LLM_INITIAL_CONCURRENCY),
+        minimum=worker_share(settings.LLM_MIN_CONCURRENCY),
+        maximum=worker_share(settings.LLM_MAX_CONCURRENCY),
+    )
+    if settings.LLM_ADAPTIVE_CONCURRENCY
+    else None,
+)
+
+
+def call(fn: Callable[[], Any]) -> Any:
+    """Run one LLM call once the scheduler grants it a slot, in the current scope."""
+    scope = _scope.get()
+    gate.acquire(scope)
+    start = time.monotonic()
+    error: BaseException | None = None
+    try:
+        return fn()
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        gate.release(scope, time.monotonic() - start, error)
@@ -1,4 +1,4 @@
-from typing import IO
+from typing import IO, Tuple
 from pypdf import PdfReader
 import io
 import logging
@@ -6,9 +6,9 @@ import logging
 logger = logging.getLogger("skillpick.pdf")
 
 
-def extract_text_from_pdf_bytes(data: bytes) -> str:
+def extract_pdf(data: bytes) -> Tuple[str, int]:
     """
-    Extract text from a PDF given as bytes.
+    Extract text from a PDF given as bytes. Returns (text, page count).
     """
     try:
         pdf_stream: IO[bytes] = io.BytesIO(data)
@@ -19,7 +19,14 @@ def extract_text_from_pdf_bytes(data: bytes) -> str:
                 texts.append(page.extract_text() or "")
             except Exception as e:  # noqa: BLE001
                 logger.warning("Failed to extract text from page: %s", e)
-        return "\n".join(texts).strip()
+        return "\n".join(texts).strip(), len(reader.pages)
     except Exception as e:  # noqa: BLE001
         logger.error("PDF parsing failed: %s", e)
-        return ""
+        return "", 0
+
+
+def extract_text_from_pdf_bytes(data: bytes) -> str:
+    """
+    Extract text from a PDF given as bytes.
+    """
+    return extract_pdf(data)[0]
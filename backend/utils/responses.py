@@ -0,0 +1,24 @@
+from typing import Any, Dict
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (FastAPI's own class is deprecated)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_with_raw_fields(fields: Dict[str, Any], **raw: bytes) -> Response:
+    """
+    JSON response from plain fields plus already-serialized JSON values,
+    spliced in as bytes without being parsed or re-encoded.
+    """
+    body = orjson.dumps(fields)
+    if raw:
+        spliced = b",".join(orjson.dumps(key) + b":" + value for key, value in raw.items())
+        body = body[:-1] + (b"," if fields else b"") + spliced + b"}"
+    return Response(content=body, media_type="application/json")
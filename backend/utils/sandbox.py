@@ -0,0 +1,434 @@
+import builtins
+import json
+import logging
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts
+    fcntl = None
+
+from config import settings
+
+logger = logging.getLogger("skillpick.sandbox")
+
+# Runs inside the sandboxed interpreter. Reads the job spec from stdin and
+# writes a single result line, prefixed with a per-run marker, to stdout.
+# Only return values and exception class names are reported; expected
+# outputs never enter the sandbox and are compared by the parent.
+_HARNESS = r"""
+import io, json, sys, time
+
+spec = json.loads(sys.stdin.read())
+out = sys.stdout
+sys.stdout = io.StringIO()
+sys.stderr = io.StringIO()
+
+def emit(payload):
+    out.write(spec["marker"] + json.dumps(payload) + "\n")
+    out.flush()
+
+namespace = {"__name__": "__submission__"}
+try:
+    exec(compile(spec["code"], "<submission>", "exec"), namespace)
+except BaseException as e:
+    emit({"load_error": type(e).__name__})
+    sys.exit(0)
+
+fn = namespace.get(spec["function"])
+if not callable(fn):
+    emit({"missing_function": True})
+    sys.exit(0)
+
+results = []
+for args in spec["inputs"]:
+    if not isinstance(args, list):
+        args = [args]
+    start = time.perf_counter()
+    try:
+        results.append({"value": json.loads(json.dumps(fn(*args))), "error": None})
+    except BaseException as e:
+        results.append({"value": None, "error": type(e).__name__})
+    results[-1]["runtime_ms"] = (time.perf_counter() - start) * 1000.0
+emit({"results": results})
+"""
+
+# Runs as root right after exec, so nothing happens between fork and exec
+# in the (multi-threaded) server. Applies the limits, namespaces and mounts
+# described by argv[1], then forks the harness as init of a new pid
+# namespace: it drops to the leased uid and execs with stdin still unread,
+# and when it exits the kernel kills and reaps everything it left behind.
+# Setup errors are written to the status fd, which is close-on-exec, so it
+# only ever carries launcher failures and never anything the submission writes.
+_LAUNCHER = r"""
+import ctypes, json, os, resource, sys
+
+CLONE_NEWNS, CLONE_NEWIPC, CLONE_NEWPID, CLONE_NEWNET = 0x00020000, 0x08000000, 0x20000000, 0x40000000
+MS_NOSUID, MS_NODEV, MS_NOEXEC = 0x2, 0x4, 0x8
+MS_BIND, MS_REC, MS_PRIVATE = 0x1000, 0x4000, 0x40000
+
+cfg = json.loads(sys.argv[1])
+status = int(sys.argv[2])
+
+try:
+    os.set_inheritable(status, False)
+    libc = ctypes.CDLL(None, use_errno=True)
+
+    def check(ret, what):
+        if ret != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, what + ": " + os.strerror(err))
+
+    def tmpfs(path, options):
+        flags = MS_NOSUID | MS_NODEV | MS_NOEXEC
+        check(libc.mount(b"tmpfs", path.encode(), b"tmpfs", flags, options.encode()), "mount tmpfs on " + path)
+
+    for name, limit in cfg["rlimits"].items():
+        resource.setrlimit(getattr(resource, name), (limit, limit))
+
+    # No network interfaces but a downed loopback, and a private mount table
+    check(libc.unshare(CLONE_NEWNET | CLONE_NEWNS | CLONE_NEWIPC | CLONE_NEWPID), "unshare")
+    check(libc.mount(b"none", b"/", None, MS_REC | MS_PRIVATE, None), "make mounts private")
+    for path in cfg["hidden"]:
+        if os.path.isdir(path):
+            tmpfs(path, "size=4k,mode=000")
+        elif os.path.exists(path):
+            check(libc.mount(b"/dev/null", path.encode(), None, MS_BIND, None), "hide " + path)
+    for path in cfg["scratch"]:
+        if os.path.isdir(path):
+            tmpfs(path, "size=%d,mode=1777" % cfg["scratch_bytes"])
+
+    pid = os.fork()
+    if pid == 0:
+        os.chdir("/tmp")
+        os.setgroups([])
+        os.setgid(cfg["uid"])
+        os.setuid(cfg["uid"])
+        os.execv(sys.executable, [sys.executable, "-I", "-S", "-c", cfg["harness"]])
+except BaseException as e:
+    os.write(status, ("%s: %s" % (type(e).__name__, e)).encode("utf-8", "replace")[:1000])
+    os._exit(125)
+
+os.close(status)
+code = os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+os._exit(code if code >= 0 else 128 - code)
+"""
+
+# The repository (code, .env, SQLite database) is always hidden
+_APP_DIR = Path(__file__).resolve().parents[2]
+# World-writable directories replaced by empty, size-capped ones
+_SCRATCH_DIRS = ("/tmp", "/var/tmp", "/dev/shm")
+_MAX_OUTPUT_BYTES = 1024 * 1024
+
+_BUILTIN_EXCEPTIONS = frozenset(
+    name for name, obj in vars(builtins).items() if isinstance(obj, type) and issubclass(obj, BaseException)
+)
+
+
+class SandboxUnavailable(RuntimeError):
+    pass
+
+
+def _hidden_paths() -> List[str]:
+    extra = [p.strip() for p in settings.CODE_EXEC_HIDDEN_PATHS.split(",") if p.strip()]
+    return [str(_APP_DIR), *extra]
+
+
+def _python() -> str:
+    return settings.CODE_EXEC_PYTHON or getattr(sys, "_base_executable", None) or sys.executable
+
+
+def _launcher_config(uid: int) -> str:
+    cpu = int(settings.CODE_EXEC_TIMEOUT_SECONDS) + 1
+    memory = settings.CODE_EXEC_MEMORY_MB * 1024 * 1024
+    return json.dumps(
+        {
+            "uid": uid,
+            "rlimits": {
+                "RLIMIT_CPU": cpu,
+                "RLIMIT_AS": memory,
+                "RLIMIT_FSIZE": _MAX_OUTPUT_BYTES,
+                "RLIMIT_NOFILE": 64,
+                "RLIMIT_CORE": 0,
+                # Counted per uid; every run has a uid of its own
+                "RLIMIT_NPROC": settings.CODE_EXEC_MAX_PROCESSES,
+            },
+            "hidden": _hidden_paths(),
+            "scratch": list(_SCRATCH_DIRS),
+            "scratch_bytes": _MAX_OUTPUT_BYTES,
+            "harness": _HARNESS,
+        }
+    )
+
+
+@contextmanager
+def _leased_uid() -> Iterator[int]:
+    """
+    Hold one uid of the CODE_EXEC_UID_BASE pool for the duration of a run.
+    Leases are flock()s on per-uid files, so they are shared by every
+    worker on the host and released by the kernel if a worker dies.
+    """
+    lock_dir = Path(settings.CODE_EXEC_LOCK_DIR or tempfile.gettempdir()) / "skillpick-sandbox"
+    lock_dir.mkdir(mode=0o700, exist_ok=True)
+    count = max(settings.CODE_EXEC_UID_COUNT, 1)
+    offset = secrets.randbelow(count)
+    deadline = time.monotonic() + settings.CODE_EXEC_TIMEOUT_SECONDS
+    while True:
+        for i in range(count):
+            uid = settings.CODE_EXEC_UID_BASE + (offset + i) % count
+            fd = os.open(lock_dir / f"uid-{uid}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            try:
+                yield uid
+            finally:
+                os.close(fd)
+            return
+        if time.monotonic() >= deadline:
+            raise SandboxUnavailable(f"all {count} sandbox uids are in use")
+        time.sleep(0.05)
+
+
+def _kill_uid(uid: int) -> None:
+    """
+    Kill every live process running as the leased uid. Killing the harness
+    tears down its pid namespace; the scan also catches anything that got
+    out of it before the uid goes back to the pool.
+    """
+    for _ in range(20):
+        found = False
+        for entry in os.scandir("/proc"):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry.name}/status", "rb") as f:
+                    fields = dict(line.split(b":", 1) for line in f if b":" in line)
+                if fields.get(b"State", b"").strip().startswith(b"Z"):
+                    continue
+                if uid in (int(v) for v in fields.get(b"Uid", b"").split()):
+                    os.kill(int(entry.name), signal.SIGKILL)
+                    found = True
+            except (OSError, ValueError):
+                continue
+        if not found:
+            return
+        time.sleep(0.01)
+    logger.warning("Processes running as sandbox uid %s survived SIGKILL", uid)
+
+
+def _reap_launcher(proc: subprocess.Popen) -> None:
+    # The launcher exits once its pid namespace is gone; only kill it if it
+    # does not, since killing it first would orphan the namespace's init
+    try:
+        proc.wait(timeout=1.0)
+        return
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    proc.wait()
+
+
+def _describe(exception_name: Any, when: str) -> str:
+    # Only builtin exception names are echoed; anything else the submission
+    # produced (messages, custom class names) could carry arbitrary text
+    if isinstance(exception_name, str) and exception_name in _BUILTIN_EXCEPTIONS:
+        return f"{exception_name} {when}"
+    return f"Exception {when}"
+
+
+def run_python_tests(code: str, function_name: str, tests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run a Python submission against test cases in an isolated, resource-
+    limited subprocess: no network, the application directory hidden, as
+    a uid leased for this run alone. Returns pass counts, per-test
+    runtimes and a sanitized error. Raises SandboxUnavailable when the
+    isolation cannot be set up.
+    """
+    if fcntl is None or not sys.platform.startswith("linux") or os.geteuid() != 0:
+        raise SandboxUnavailable("the sandbox needs root on Linux to isolate submissions")
+
+    marker = f"@@{secrets.token_hex(8)}@@"
+    spec = json.dumps(
+        {"code": code, "function": function_name, "inputs": [t.get("input", []) for t in tests], "marker": marker}
+    )
+    result: Dict[str, Any] = {"passed": 0, "total": len(tests), "pass_rate": 0.0, "runtime_ms": 0.0, "error": None}
+
+    start = time.perf_counter()
+    with _leased_uid() as uid, tempfile.TemporaryFile() as output:
+        status_r, status_w = os.pipe()
+        try:
+            try:
+                proc = subprocess.Popen(
+                    [_python(), "-I", "-S", "-c", _LAUNCHER, _launcher_config(uid), str(status_w)],
+                    stdin=subprocess.PIPE,
+                    stdout=output,
+                    stderr=subprocess.DEVNULL,
+                    env={"PYTHONHASHSEED": "0"},
+                    start_new_session=True,
+                    pass_fds=(status_w,),
+                )
+            except (OSError, subprocess.SubprocessError) as e:
+                raise SandboxUnavailable(f"could not start the sandbox launcher: {e}") from e
+            finally:
+                os.close(status_w)
+            try:
+                proc.communicate(spec.encode("utf-8"), timeout=settings.CODE_EXEC_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                result["error"] = "Time limit exceeded"
+            finally:
+                _kill_uid(uid)
+                _reap_launcher(proc)
+            # Empty once the harness was exec'd; otherwise why isolation failed
+            setup_error = os.read(status_r, 1024).decode("utf-8", errors="replace")
+        finally:
+            os.close(status_r)
+        if setup_error:
+            raise SandboxUnavailable(f"could not isolate the submission: {setup_error}")
+        output.seek(0)
+        stdout = output.read(_MAX_OUTPUT_BYTES).decode("utf-8", errors="replace")
+    result["runtime_ms"] = (time.perf_counter() - start) * 1000.0
+    if result["error"]:
+        return result
+
+    line = next((l for l in stdout.splitlines() if l.startswith(marker)), None)
+    payload = None
+    if line is not None:
+        try:
+            payload = json.loads(line[len(marker):])
+        except ValueError:
+            pass
+    if not isinstance(payload, dict):
+        result["error"] = "Sandbox crashed or exceeded resource limits (exit code %s)" % proc.returncode
+        return result
+    if "load_error" in payload:
+        result["error"] = _describe(payload["load_error"], "while loading the submission")
+        return result
+    if payload.get("missing_function"):
+        result["error"] = "function %r not defined" % function_name
+        return result
+
+    cases = []
+    runs = payload.get("results")
+    runs = runs if isinstance(runs, list) else []
+    for test, run in zip(tests, runs + [None] * (len(tests) - len(runs))):
+        run = run if isinstance(run, dict) else {"error": "missing"}
+        error = _describe(run["error"], "raised") if run.get("error") else None
+        try:
+            runtime = float(run.get("runtime_ms", 0.0))
+        except (TypeError, ValueError):
+            runtime = 0.0
+        cases.append(
+            {
+                "passed": error is None and run.get("value") == test.get("expected"),
+                "runtime_ms": runtime,
+                "error": error,
+            }
+        )
+    result["passed"] = sum(1 for c in cases if c["passed"])
+    result["pass_rate"] = result["passed"] / max(len(tests), 1)
+    result["cases"] = cases
+    return result
+
+
+_available: bool | None = None
+_available_lock = threading.Lock()
+
+
+def sandbox_available() -> bool:
+    """
+    Whether submissions can be executed with full isolation, checked once
+    per worker by running a probe through the sandbox.
+    """
+    global _available
+    with _available_lock:
+        if _available is None:
+            try:
+                probe = run_python_tests("def probe():\n    return 1\n", "probe", [{"input": [], "expected": 1}])
+                _available = probe["passed"] == 1
+                if not _available:
+                    logger.error(
+                        "Sandbox probe failed (%s); is %s readable by uids %s+?",
+                        probe["error"], _python(), settings.CODE_EXEC_UID_BASE,
+                    )
+            except SandboxUnavailable as e:
+                logger.error("Code execution disabled: %s", e)
+                _available = False
+            if not _available:
+                logger.error("Coding answers will be graded by the agent alone")
+    return _available
+
+
+_pool: ThreadPoolExecutor | None = None
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=settings.CODE_EXEC_WORKERS, thread_name_prefix="sandbox"
+        )
+    return _pool
+
+
+def _not_run(tests: List[Dict[str, Any]], reason: str) -> Dict[str, Any]:
+    return {
+        "passed": 0, "total": len(tests), "pass_rate": 0.0, "runtime_ms": 0.0,
+        "error": f"Tests not run: {reason}", "sandbox_failed": True,
+    }
+
+
+def run_coding_tests(
+    coding_questions: List[Dict[str, Any]],
+    coding_answers: Dict[str, str],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Execute the answers to every coding question that has generated test
+    cases, concurrently on the sandbox worker pool. Keyed by question id.
+    Questions that could not be run safely are recorded with
+    sandbox_failed set; they carry no test score and the agent grades them
+    alone.
+    """
+    available = sandbox_available()
+    futures = {}
+    results: Dict[str, Dict[str, Any]] = {}
+    for q in coding_questions:
+        qid = q.get("id")
+        code = coding_answers.get(qid) or ""
+        tests = q.get("test_cases") or []
+        if not tests or not q.get("function_name"):
+            continue
+        if not code.strip():
+            results[qid] = {
+                "passed": 0, "total": len(tests), "pass_rate": 0.0, "runtime_ms": 0.0,
+                "error": "No submission",
+            }
+            continue
+        if not available:
+            results[qid] = _not_run(tests, "code execution is unavailable on this server")
+            continue
+        futures[qid] = (tests, _get_pool().submit(run_python_tests, code, q["function_name"], tests))
+
+    for qid, (tests, fut) in futures.items():
+        try:
+            results[qid] = fut.result()
+        except Exception as e:  # noqa: BLE001
+            logger.error("Sandbox run failed for question %s: %s", qid, e)
+            results[qid] = _not_run(tests, "the sandbox failed")
+    return results
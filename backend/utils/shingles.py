@@ -0,0 +1,99 @@
+import hashlib
+import re
+import zlib
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase, drop punctuation and collapse whitespace.
+    """
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def word_shingles(text: str, k: int = 3) -> List[str]:
+    words = normalize_text(text).split()
+    if len(words) < k:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i : i + k]) for i in range(len(words) - k + 1)]
+
+
+def hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash64(text: str, k: int = 3) -> int:
+    """
+    64-bit simhash over word k-shingles. Near-identical texts differ in few bits.
+    """
+    weights = [0] * 64
+    for shingle in word_shingles(text, k):
+        h = hash64(shingle)
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    value = 0
+    for bit, w in enumerate(weights):
+        if w > 0:
+            value |= 1 << bit
+    return value
+
+
+def split_bands(value: int, bands: int = 4) -> List[int]:
+    width = 64 // bands
+    mask = (1 << width) - 1
+    return [(value >> (i * width)) & mask for i in range(bands)]
+
+
+def hamming64(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# MinHash permutations are multiply-shift hashes of 32-bit shingle hashes:
+# ((a*h + b) mod 2**64) >> 32 with odd 64-bit a, which numpy's wrapping
+# uint64 arithmetic computes without a modulo.
+_SHIFT = np.uint64(32)
+
+
+@lru_cache(maxsize=8)
+def _permutations(num_perm: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash(text: str, num_perm: int = 128, k: int = 3, seed: int = 1) -> np.ndarray | None:
+    """
+    MinHash signature (num_perm uint32 values) over word k-shingles. The
+    share of equal positions in two signatures estimates the Jaccard
+    similarity of the shingle sets. None for text without words.
+    """
+    shingles = set(word_shingles(text, k))
+    if not shingles:
+        return None
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    a, b = _permutations(num_perm, seed)
+    permuted = (np.outer(hashes, a) + b) >> _SHIFT
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def minhash_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def lsh_bands(signature: np.ndarray, bands: int) -> List[int]:
+    """
+    One 63-bit bucket key per band of rows = len(signature) // bands values.
+    Two signatures with Jaccard s share at least one bucket with probability
+    1 - (1 - s**rows)**bands.
+    """
+    rows = len(signature) // bands
+    return [
+        hash64(signature[i * rows : (i + 1) * rows].tobytes().hex()) & ((1 << 63) - 1)
+        for i in range(bands)
+    ]
@@ -0,0 +1,114 @@
+"""
+Merging t-digest (Dunning & Ertl, 2019) for streaming quantiles and ranks.
+
+Values are kept as weighted centroids whose size is bounded by the k1 scale
+function, so clusters stay small near both tails (where rank questions are
+usually asked) and the whole digest stays at roughly `compression` centroids
+however many values it has seen. While fewer values than that have been
+added, every value is its own centroid and ranks are exact.
+"""
+import math
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+_HEADER = struct.Struct("<dqdd")  # compression, count, min, max
+
+
+class TDigest:
+    def __init__(self, compression: float = 100.0) -> None:
+        self.compression = float(compression)
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[float] = []
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k: float) -> float:
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def add(self, value: float) -> None:
+        value = float(value)
+        self._buffer.append(value)
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression:
+            self._compress()
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means, np.asarray(self._buffer, dtype=np.float64)])
+        weights = np.concatenate([self.weights, np.ones(len(self._buffer), dtype=np.float64)])
+        self._buffer = []
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        total = float(weights.sum())
+        out_means, out_weights = [float(means[0])], [float(weights[0])]
+        q_start = 0.0
+        q_limit = self._k_inverse(self._k(q_start) + 1)
+        for mean, weight in zip(means[1:].tolist(), weights[1:].tolist()):
+            if q_start + (out_weights[-1] + weight) / total <= q_limit:
+                merged = out_weights[-1] + weight
+                out_means[-1] += (mean - out_means[-1]) * weight / merged
+                out_weights[-1] = merged
+            else:
+                q_start += out_weights[-1] / total
+                q_limit = self._k_inverse(self._k(q_start) + 1)
+                out_means.append(mean)
+                out_weights.append(weight)
+        self.means = np.asarray(out_means, dtype=np.float64)
+        self.weights = np.asarray(out_weights, dtype=np.float64)
+
+    def cdf(self, value: float) -> Optional[float]:
+        """
+        Share of values below `value`, counting values equal to it as half
+        (mid-rank), so a score shared by everyone sits at 0.5. None when empty.
+        """
+        self._compress()
+        if not self.count:
+            return None
+        if value < self.min:
+            return 0.0
+        if value > self.max:
+            return 1.0
+        means, weights, n = self.means, self.weights, float(self.count)
+        equal = means == value
+        if equal.any():
+            return float(weights[means < value].sum() + weights[equal].sum() / 2) / n
+        # Interpolate between centroid centres, anchored at min and max
+        centres = np.cumsum(weights) - weights / 2
+        xs = np.concatenate([[self.min], means, [self.max]])
+        ys = np.concatenate([[0.0], centres, [n]])
+        return float(np.interp(value, xs, ys)) / n
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        if not self.count:
+            return None
+        centres = np.cumsum(self.weights) - self.weights / 2
+        xs = np.concatenate([[0.0], centres, [float(self.count)]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(min(max(q, 0.0), 1.0) * self.count, xs, ys))
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        header = _HEADER.pack(self.compression, self.count, self.min, self.max)
+        return header + self.means.tobytes() + self.weights.tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TDigest":
+        compression, count, low, high = _HEADER.unpack_from(blob)
+        centroids = np.frombuffer(bytes(blob[_HEADER.size :]), dtype=np.float64)
+        half = len(centroids) // 2
+        digest = cls(compression)
+        digest.means, digest.weights = centroids[:half].copy(), centroids[half:].copy()
+        digest.count, digest.min, digest.max = count, low, high
+        return digest
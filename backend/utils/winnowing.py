@@ -0,0 +1,92 @@
+"""
+Winnowing fingerprints of source code (Schleimer, Wilkerson & Aiken, 2003).
+
+Code is tokenized and normalized first, so renaming variables, reformatting
+or editing comments and literals leaves the fingerprints unchanged. Every
+window of `window` consecutive k-gram hashes contributes its minimum, which
+guarantees that any shared run of at least k + window - 1 normalized tokens
+shows up as a shared fingerprint.
+"""
+import builtins
+import io
+import keyword
+import re
+import tokenize
+from typing import List, Set
+
+from utils.shingles import hash64
+
+_KEEP_NAMES = frozenset(keyword.kwlist) | frozenset(dir(builtins))
+
+_SKIP = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER, tokenize.TYPE_COMMENT}
+_STRUCTURE = {tokenize.NEWLINE: ";", tokenize.INDENT: "{", tokenize.DEDENT: "}"}
+
+# Fallback for code the Python tokenizer rejects (unterminated strings,
+# bad indentation, other languages)
+_FALLBACK_RE = re.compile(
+    r"#[^\n]*|//[^\n]*|/\*.*?\*/"  # comments, dropped
+    r"|(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')"  # strings
+    r"|(\d[\w.]*)"  # numbers
+    r"|([A-Za-z_]\w*)"  # names
+    r"|(\S)",  # operators and punctuation
+    re.S,
+)
+
+
+def _normalize_name(name: str, after_dot: bool) -> str:
+    # Attribute names (x.append) and builtins say what the code does;
+    # local identifiers are free to rename.
+    return name if after_dot or name in _KEEP_NAMES else "v"
+
+
+def _fallback_tokens(code: str) -> List[str]:
+    tokens: List[str] = []
+    for string, number, name, other in _FALLBACK_RE.findall(code):
+        if string:
+            tokens.append("s")
+        elif number:
+            tokens.append("n")
+        elif name:
+            tokens.append(_normalize_name(name, bool(tokens) and tokens[-1] == "."))
+        elif other:
+            tokens.append(other)
+    return tokens
+
+
+def normalize_code(code: str) -> List[str]:
+    """Identifier-, literal-, comment- and layout-insensitive token stream."""
+    tokens: List[str] = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code or "").readline):
+            if tok.type in _SKIP:
+                continue
+            if tok.type in _STRUCTURE:
+                tokens.append(_STRUCTURE[tok.type])
+            elif tok.type == tokenize.NAME:
+                tokens.append(_normalize_name(tok.string, bool(tokens) and tokens[-1] == "."))
+            elif tok.type == tokenize.STRING or tok.type in getattr(tokenize, "FSTRING_TYPES", ()):
+                tokens.append("s")
+            elif tok.type == tokenize.NUMBER:
+                tokens.append("n")
+            else:
+                tokens.append(tok.string)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return _fallback_tokens(code or "")
+    return tokens
+
+
+def winnow(tokens: List[str], k: int = 5, window: int = 4) -> Set[int]:
+    """Fingerprints (63-bit k-gram hashes) selected by winnowing."""
+    if len(tokens) < k:
+        return set()
+    hashes = [hash64(" ".join(tokens[i : i + k])) & ((1 << 63) - 1) for i in range(len(tokens) - k + 1)]
+    if len(hashes) <= window:
+        return {min(hashes)}
+    picked: Set[int] = set()
+    for start in range(len(hashes) - window + 1):
+        picked.add(min(hashes[start : start + window]))
+    return picked
+
+
+def fingerprint_code(code: str, k: int = 5, window: int = 4) -> Set[int]:
+    return winnow(normalize_code(code), k, window)
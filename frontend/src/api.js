@@ -87,3 +87,8 @@ export async function getProcessAnalytics(processId) {
   );
   return handleResponse(res);
 }
+
+// Streamed download; used as a plain link so the browser saves the file
+export function getProcessExportUrl(processId, format = "csv") {
+  return `${API_BASE_URL}/api/analytics/process/${processId}/export?format=${format}`;
+}
@@ -12,9 +12,11 @@ export default function CandidateResultPage() {
   const [error, setError] = useState("");
 
   useEffect(() => {
-    if (!result) {
+    // Scores arrive with the submission; the written summary is generated
+    // on the first result fetch.
+    if (!result || result.narrative_ready === false) {
       (async () => {
-        setLoading(true);
+        setLoading(!result);
         setError("");
         try {
           const data = await getCandidateResult(candidateId);
@@ -150,10 +150,23 @@ export default function CandidateTestPage() {
                 <p className="text-[11px] text-slate-300 whitespace-pre-wrap">
                   {q.description}
                 </p>
+                {q.function_name && (
+                  <p className="text-[11px] text-slate-400">
+                    Implement a Python function named{" "}
+                    <code className="font-mono text-brand-300">
+                      {q.function_name}
+                    </code>
+                    . It will be run against hidden test cases.
+                  </p>
+                )}
                 <textarea
                   rows={8}
                   className="w-full rounded-xl bg-slate-950 border border-slate-700 px-3 py-2 text-xs focus:outline-none focus:border-brand-500 font-mono"
-                  placeholder="// Write your solution here (any language)"
+                  placeholder={
+                    q.function_name
+                      ? `def ${q.function_name}(...):`
+                      : "// Write your solution here (any language)"
+                  }
                   value={answers.coding_answers[q.id] || ""}
                   onChange={(e) => handleCodingChange(q.id, e.target.value)}
                 />
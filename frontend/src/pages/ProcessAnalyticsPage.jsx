@@ -8,7 +8,7 @@ import TrendLineChart from "../components/charts/TrendLineChart.jsx";
 import SkillGauge from "../components/charts/SkillGuage.jsx";
 import ScoreBadge from "../components/ScoreBadge.jsx";
 
-import { getProcessAnalytics } from "../api.js";
+import { getProcessAnalytics, getProcessExportUrl } from "../api.js";
 
 export default function ProcessAnalyticsPage() {
   const { processId } = useParams();
@@ -67,12 +67,20 @@ export default function ProcessAnalyticsPage() {
             {new Date(overview.created_at).toLocaleString()}
           </p>
         </div>
-        <Link
-          to={`/recruiter/process/${overview.process_id}`}
-          className="px-3 py-1.5 rounded-xl border border-slate-700 hover:border-brand-500 text-xs"
-        >
-          Back to Process
-        </Link>
+        <div className="flex gap-2">
+          <a
+            href={getProcessExportUrl(overview.process_id, "csv")}
+            className="px-3 py-1.5 rounded-xl border border-slate-700 hover:border-brand-500 text-xs"
+          >
+            Export CSV
+          </a>
+          <Link
+            to={`/recruiter/process/${overview.process_id}`}
+            className="px-3 py-1.5 rounded-xl border border-slate-700 hover:border-brand-500 text-xs"
+          >
+            Back to Process
+          </Link>
+        </div>
       </div>
 
       <section className="grid lg:grid-cols-4 gap-4">
@@ -28,6 +28,19 @@ export default function ProcessDashboardPage() {
     }
   }, [processId, process]);
 
+  // Question generation runs in the background; poll until it settles.
+  useEffect(() => {
+    if (process?.status !== "generating") return undefined;
+    const timer = setTimeout(async () => {
+      try {
+        setProcess(await getProcess(processId));
+      } catch (err) {
+        setError(err.message || "Failed to load process");
+      }
+    }, 3000);
+    return () => clearTimeout(timer);
+  }, [processId, process]);
+
   if (loading) {
     return (
       <div className="flex justify-center pt-10">
@@ -60,6 +73,17 @@ export default function ProcessDashboardPage() {
           <p className="text-xs text-slate-400">
             Process ID: {process.id} • Token: {process.public_token}
           </p>
+          {process.status && process.status !== "ready" && (
+            <p
+              className={`text-xs mt-1 ${
+                process.status === "failed" ? "text-rose-300" : "text-amber-300"
+              }`}
+            >
+              {process.status === "failed"
+                ? `Question generation failed: ${process.status_detail || "unknown error"}`
+                : "Analysing the JD and generating questions…"}
+            </p>
+          )}
         </div>
         <Link
           to={`/recruiter/process/${process.id}/analytics`}